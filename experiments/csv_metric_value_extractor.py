@@ -1,6 +1,7 @@
 import pandas as pd
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Union
 from utils import warning_output as wout
 
@@ -44,6 +45,87 @@ def extract_metric_from_csv(
         print(f"错误: 处理文件 {file_path} 时发生异常: {e}")
         return pd.DataFrame()
 
+def read_metrics_from_csv(
+    file_path: str,
+    metric_names: List[str],
+    metric_column: str = 'Metric Name',
+    value_column: str = 'Metric Value',
+    id_column: str = 'ID'
+) -> pd.DataFrame:
+    """
+    读取单个CSV文件一次，同时提取多个指标
+
+    Args:
+        file_path: CSV文件路径
+        metric_names: 要提取的指标名称列表
+        metric_column: 指标名称所在的列名
+        value_column: 指标值所在的列名
+        id_column: kernel ID 所在的列名
+
+    Returns:
+        长格式的DataFrame，列为 ID、metric、value
+    """
+    try:
+        # 只读取需要的三列，ncu 的数值带有千位分隔符
+        df = pd.read_csv(file_path, usecols=[id_column, metric_column, value_column], thousands=',')
+    except Exception as e:
+        print(f"错误: 处理文件 {file_path} 时发生异常: {e}")
+        return pd.DataFrame(columns=['ID', 'metric', 'value'])
+
+    df = df[df[metric_column].isin(metric_names)]
+    df = df.rename(columns={id_column: 'ID', metric_column: 'metric', value_column: 'value'})
+
+    missing = set(metric_names) - set(df['metric'].unique())
+    for metric_name in sorted(missing):
+        print(f"警告: 文件 {file_path} 中未找到指标 '{metric_name}'")
+
+    return df.dropna(subset=['value'])
+
+def extract_metrics(
+    file_configs: List[Dict[str, str]],
+    metric_names: List[str],
+    metric_column: str = 'Metric Name',
+    value_column: str = 'Metric Value',
+    max_workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    并行读取所有CSV文件（每个文件只读一次），一次性提取所有指标并拼接
+
+    Args:
+        file_configs: 配置列表，每个配置包含文件路径和目标列名
+        metric_names: 要提取的指标名称列表
+        metric_column: 指标名称所在的列名
+        value_column: 指标值所在的列名
+        max_workers: 读取文件的线程数，默认为文件数
+
+    Returns:
+        长格式的DataFrame，列为 model、ID、metric、value，model 为配置中的列名
+    """
+    if not file_configs:
+        return pd.DataFrame(columns=['model', 'ID', 'metric', 'value'])
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(file_configs)) as executor:
+        frames = list(executor.map(
+            lambda config: read_metrics_from_csv(config['file_path'], metric_names, metric_column, value_column),
+            file_configs
+        ))
+
+    # 一次拼接，避免逐个 merge
+    long_df = pd.concat(frames, keys=[config['column_name'] for config in file_configs], names=['model', None])
+    return long_df.reset_index(level='model').reset_index(drop=True)[['model', 'ID', 'metric', 'value']]
+
+def build_metric_table(long_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    将长格式数据一次透视为 (model × kernel) 行、metric 列的宽表
+
+    Args:
+        long_df: extract_metrics 的返回值
+
+    Returns:
+        以 (model, ID) 为索引、各指标为列的DataFrame
+    """
+    return long_df.pivot_table(index=['model', 'ID'], columns='metric', values='value', aggfunc='first', sort=False)
+
 def save_to_json(data: Dict[str, List[Union[int, float]]], output_path: str) -> None:
     """
     将提取的数据保存为JSON格式
@@ -80,20 +162,12 @@ def main(
         fill_value: 用于填充缺失值的值，仅在保存为CSV时有效
     """
     # 提取数据
-    extracted_data = {}
-    for config in file_configs:
-        file_path = config['file_path']
-        column_name = config['column_name']
-        df = extract_metric_from_csv(
-            file_path, 
-            metric_name, 
-            column_name,
-            metric_column=metric_column,
-            value_column=value_column
-        )
-        if not df.empty:
-            # 转换为列表保存（保留原始索引信息）
-            extracted_data[column_name] = df[column_name].tolist()
+    long_df = extract_metrics(file_configs, [metric_name], metric_column=metric_column, value_column=value_column)
+    extracted_data = {
+        config['column_name']: long_df.loc[long_df['model'] == config['column_name'], 'value'].tolist()
+        for config in file_configs
+    }
+    extracted_data = {column_name: values for column_name, values in extracted_data.items() if values}
     
     # 根据输出文件扩展名选择保存方式
     if not extracted_data:
@@ -104,17 +178,57 @@ def main(
     if output_ext == '.json':
         save_to_json(extracted_data, output_path)
     elif output_ext == '.csv':
-        dfs = [pd.DataFrame(data=values, columns=[col_name]) 
-               for col_name, values in extracted_data.items()]
-        # 使用outer join保留所有数据点
-        if dfs:
-            merged_df = dfs[0]
-            for df in dfs[1:]:
-                merged_df = merged_df.merge(df, left_index=True, right_index=True, how='outer')
-            if fill_value is not None:
-                merged_df = merged_df.fillna(fill_value)
-            merged_df.to_csv(output_path, index=False)
-            print(f"成功保存整合数据到: {output_path}")
+        # 一次透视得到以 kernel 为行、模型为列的表，保留所有数据点
+        merged_df = long_df.pivot_table(index='ID', columns='model', values='value', aggfunc='first')
+        merged_df = merged_df[list(extracted_data.keys())]
+        if fill_value is not None:
+            merged_df = merged_df.fillna(fill_value)
+        merged_df.to_csv(output_path, index=False)
+        print(f"成功保存整合数据到: {output_path}")
+    else:
+        wout.error(f"不支持的输出格式: {output_ext}，请使用.csv或.json")
+
+def main_multi(
+    metric_names: List[str],
+    file_configs: List[Dict[str, str]],
+    output_path: str,
+    metric_column: str = 'Metric Name',
+    value_column: str = 'Metric Value',
+    max_workers: Optional[int] = None
+) -> None:
+    """
+    一次提取多个指标，生成 (model × metric × kernel) 的整合表
+
+    参数:
+        metric_names: 要提取的指标名称列表
+        file_configs: 配置列表，每个配置包含文件路径和目标列名
+        output_path: 输出文件路径。CSV 为以 (model, ID) 为行、指标为列的宽表；
+                     JSON 为 {指标: {列名: [值1, 值2, ...]}}，与 main 输出的 JSON 按指标嵌套后一致
+        metric_column: 指标名称所在的列名
+        value_column: 指标值所在的列名
+        max_workers: 读取文件的线程数
+    """
+    long_df = extract_metrics(file_configs, metric_names, metric_column=metric_column, value_column=value_column, max_workers=max_workers)
+    if long_df.empty:
+        wout.error("没有提取到任何数据，无法生成输出文件")
+        return
+
+    output_ext = os.path.splitext(output_path)[1].lower()
+    if output_ext == '.json':
+        data = {
+            metric_name: {
+                model: group['value'].tolist()
+                for model, group in metric_df.groupby('model', sort=False)
+            }
+            for metric_name, metric_df in long_df.groupby('metric', sort=False)
+        }
+        save_to_json(data, output_path)
+    elif output_ext == '.csv':
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        build_metric_table(long_df).reset_index().to_csv(output_path, index=False)
+        print(f"成功保存整合数据到: {output_path}")
     else:
         wout.error(f"不支持的输出格式: {output_ext}，请使用.csv或.json")
 
@@ -156,6 +270,13 @@ if __name__ == "__main__":
 
 
 
+    # 一次提取多个指标（每个文件只读取一次）
+    # main_multi(
+    #     metric_names=["Registers Per Thread", "Compute (SM) Throughput", "Memory Throughput", "SM Active Cycles"],
+    #     file_configs=FILE_CONFIGS,
+    #     output_path="results/ncu-value-extract/yolov8-metrics.csv",
+    # )
+
     # 执行主函数
     main(
         metric_name=METRIC_NAME,
@@ -1,89 +1,197 @@
+import csv
 import os
-import pandas as pd
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from utils import trace_file_parser as tfp
 
-def is_csv_valid(file_path):
-    """检查CSV文件是否可以正常读取并包含特定数据"""
+"""
+修复 ncu 输出的 CSV 文件：去除表头之前被分析程序与 ncu 自身的输出。
+只扫描文件开头定位表头，通过临时文件与原子重命名原地改写，内存占用与文件大小无关；目录中的文件由进程池并行处理。
+同时报告被截断的文件，以及 kernel 数量与跟踪文件不一致的文件。
+"""
+
+# ncu CSV 表头行的开头
+HEADER_PREFIX = b'"ID",'
+
+# 复制时的缓冲区大小
+COPY_BUFFER_SIZE = 1 << 20
+
+
+def find_header_offset(file_path, scan_bytes=1024):
+    """
+    在文件开头 `scan_bytes` 字节内查找表头行的起始位置。
+
+    Args:
+        `file_path` (str): CSV 文件路径。
+        `scan_bytes` (int): 扫描的字节数。
+
+    Returns:
+        int: 表头行的字节偏移，未找到时为 None。
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(scan_bytes)
+
+    if head.startswith(HEADER_PREFIX):
+        return 0
+    pos = head.find(b'\n' + HEADER_PREFIX)
+    return pos + 1 if pos >= 0 else None
+
+
+def repair_csv(file_path, scan_bytes=1024):
+    """
+    去除表头之前的内容，先写入同目录下的临时文件，再原子重命名覆盖原文件。
+
+    Returns:
+        str: "ok"（无需修复）、"repaired"（已修复）或 "no_header"（开头未找到表头）。
+    """
+    offset = find_header_offset(file_path, scan_bytes)
+    if offset is None:
+        return "no_header"
+    if offset == 0:
+        return "ok"
+
+    tmp_path = f"{file_path}.tmp"
     try:
-        # 读取前20行来检查文件结构
-        with open(file_path, 'r', encoding='utf-8') as f:
-            first_20_lines = [f.readline() for _ in range(20)]
-        
-        # 检查常见表头模式
-        header_patterns = ['"ID"', '"Process ID"', 'ID,', 'Process ID,']
-        has_header = any(pattern in line for line in first_20_lines for pattern in header_patterns)
-        
-        if not has_header:
-            return False
-            
-        # 尝试读取CSV文件
-        df = pd.read_csv(file_path)
-        
-        # 检查DataFrame是否有有效数据
-        if len(df.columns) < 3 or df.empty:
-            return False
-            
-        # 检查是否存在特定行：ID=1且Metric Name="Compute (SM) Throughput"
-        target_row = df[(df['ID'] == 1) & (df['Metric Name'] == 'Compute (SM) Throughput')]
-        
-        if target_row.empty:
-            print(f"警告: 文件 {file_path} 中未找到目标行")
-            return False
-            
-        # 尝试获取Metric Value
-        metric_value = target_row['Metric Value'].values[0]
-        print(f"找到目标行，Metric Value: {metric_value}")
-        return True
-        
-    except Exception as e:
-        print(f"读取文件失败: {e}")
-        return False
-
-def remove_first_seven_lines(file_path):
-    """删除文件的前7行"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    if len(lines) <= 7:
-        print(f"文件 {file_path} 行数不足7行，跳过处理")
-        return
-    
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.writelines(lines[7:])
-    print(f"已处理文件: {file_path}")
-
-def main(directory):
-    """主函数：处理目录下所有CSV文件"""
+        with open(file_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return "repaired"
+
+
+def inspect_csv(file_path):
+    """
+    逐行扫描已修复的 CSV，统计 kernel 数量并检查是否被截断。
+    同一 kernel 的指标行连续出现，每个 kernel 的行数应一致；文件不以换行结尾、最后一行字段数不足，
+    或最后一个 kernel 的行数少于第一个 kernel 时，认为文件被截断。
+
+    Returns:
+        dict: 包含 "kernels"、"max_id"、"rows"、"truncated"、"reason"。
+    """
+    kernels = 0
+    rows = 0
+    max_id = -1
+    first_kernel_rows = None
+    current_rows = 0
+    last_id = None
+    last_line = ''
+    field_count = None
+
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        header = f.readline()
+        field_count = len(next(csv.reader([header]))) if header else 0
+        for line in f:
+            last_line = line
+            if not line.startswith('"'):
+                continue
+            rows += 1
+            kernel_id = line[1:line.find('"', 1)]
+            if kernel_id != last_id:
+                if last_id is not None and first_kernel_rows is None:
+                    first_kernel_rows = current_rows
+                kernels += 1
+                current_rows = 0
+                last_id = kernel_id
+                if kernel_id.isdigit():
+                    max_id = max(max_id, int(kernel_id))
+            current_rows += 1
+
+    reason = None
+    if rows == 0:
+        reason = "没有数据行"
+    elif not last_line.endswith('\n'):
+        reason = "文件不以换行结尾"
+    elif len(next(csv.reader([last_line]))) != field_count:
+        reason = "最后一行字段数与表头不一致"
+    elif first_kernel_rows is not None and current_rows < first_kernel_rows:
+        reason = f"最后一个 kernel 只有 {current_rows} 行，少于第一个 kernel 的 {first_kernel_rows} 行"
+
+    return {"kernels": kernels, "max_id": max_id, "rows": rows, "truncated": reason is not None, "reason": reason}
+
+
+def get_trace_kernel_count(trace_file_path):
+    """
+    获取跟踪文件中不计 Memcpy 的 kernel 数量，与 ncu 中的 kernel 数量对应。
+    """
+    node_kernel_pairs = tfp.get_pairs_from_trace_file(trace_file_path, typed=True)
+    return sum(1 for pair in node_kernel_pairs for kernel in pair.kernels if kernel.index >= 0)
+
+
+def process_file(file_path, expected_kernels=None, scan_bytes=1024):
+    """
+    修复并检查单个文件。
+
+    Args:
+        `file_path` (str): CSV 文件路径。
+        `expected_kernels` (int): 期望的 kernel 数量，None 表示不检查。
+        `scan_bytes` (int): 查找表头时扫描的字节数。
+
+    Returns:
+        dict: 处理报告，包含 "file"、"status"、"problems" 以及 `inspect_csv` 的统计。
+    """
+    report = {"file": file_path, "status": repair_csv(file_path, scan_bytes), "problems": []}
+    if report["status"] == "no_header":
+        report["problems"].append(f"前 {scan_bytes} 字节内未找到表头")
+        return report
+
+    report.update(inspect_csv(file_path))
+    if report["truncated"]:
+        report["problems"].append(f"文件被截断：{report['reason']}")
+    if expected_kernels is not None and report["kernels"] != expected_kernels:
+        report["problems"].append(f"kernel 数量 {report['kernels']} 与跟踪文件中的 {expected_kernels} 不一致")
+    return report
+
+
+def main(directory, trace_file_path=None, workers=None, scan_bytes=1024):
+    """
+    主函数：并行处理目录下所有 CSV 文件，输出有问题的文件。
+
+    Args:
+        `directory` (str): CSV 所在目录。
+        `trace_file_path` (str): 同一模型的跟踪文件，用于检查 kernel 数量，None 表示不检查。
+        `workers` (int): 进程数，默认为 CPU 核数。
+        `scan_bytes` (int): 查找表头时扫描的字节数。
+
+    Returns:
+        list: 所有文件的处理报告。
+    """
     directory_path = Path(directory)
     if not directory_path.exists() or not directory_path.is_dir():
         print(f"错误：目录 '{directory}' 不存在或不是有效目录")
-        return
-    
+        return []
+
     # 获取目录下所有CSV文件
-    csv_files = list(directory_path.glob('*.csv'))
+    csv_files = sorted(str(csv_file) for csv_file in directory_path.glob('*.csv'))
     if not csv_files:
         print(f"目录 '{directory}' 下未找到CSV文件")
-        return
-    
+        return []
+
     print(f"找到 {len(csv_files)} 个CSV文件")
-    
-    # 处理每个CSV文件
-    for csv_file in csv_files:
-        file_path = str(csv_file)
-        print(f"正在检查文件: {file_path}")
-        
-        if is_csv_valid(file_path):
-            print(f"文件格式正常，跳过: {file_path}")
-            continue
-        
-        print(f"文件格式异常，尝试修复: {file_path}")
-        remove_first_seven_lines(file_path)
-        
-        # 再次检查文件是否修复成功
-        if is_csv_valid(file_path):
-            print(f"修复成功: {file_path}")
-        else:
-            print(f"修复失败，文件仍无法正常读取: {file_path}")
+
+    expected_kernels = get_trace_kernel_count(trace_file_path) if trace_file_path is not None else None
+    if expected_kernels is not None:
+        print(f"跟踪文件 {trace_file_path} 中的 kernel 数量: {expected_kernels}")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        reports = list(executor.map(process_file, csv_files, [expected_kernels] * len(csv_files), [scan_bytes] * len(csv_files)))
+
+    repaired = [report for report in reports if report["status"] == "repaired"]
+    problems = [report for report in reports if report["problems"]]
+    print(f"检查 {len(reports)} 个文件，修复 {len(repaired)} 个，存在问题 {len(problems)} 个")
+    for report in repaired:
+        print(f"已修复: {report['file']}")
+    for report in problems:
+        print(f"存在问题: {report['file']}")
+        for problem in report["problems"]:
+            print(f"    {problem}")
+
+    return reports
+
 
 if __name__ == "__main__":
     """
@@ -91,4 +199,6 @@ if __name__ == "__main__":
     """
     # 在这里设置要处理的目录路径
     target_directory = "./results/ncu/yolov8n-multi-runs"  # 修改为实际目录路径
-    main(target_directory)    
\ No newline at end of file
+    # 同一模型的跟踪文件，用于检查 kernel 数量，设为 None 则不检查
+    trace_file_path = None  # "./results/trace/yolov8-orto0/yolov8n-orto0.json"
+    main(target_directory, trace_file_path)
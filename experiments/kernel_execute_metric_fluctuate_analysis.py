@@ -1,42 +1,311 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
-import pandas as pd
+import re
+import numpy as np
 from pathlib import Path
 from utils import warning_output as wout
+from experiments import csv_metric_value_extractor as cmve
 
-def get_kernel_metric_value(id_df, metric_name):
-    target_row = id_df[id_df['Metric Name'] == metric_name]
+def _run_sort_key(file_name):
+    # 按文件名中的运行编号排序，run10 排在 run9 之后
+    match = re.search(r'run(\d+)', file_name)
+    return (int(match.group(1)) if match else -1, file_name)
 
-    if len(target_row) == 0:
-        wout.error(f"[kernel_execute_metric_fluctuate_analysis] Metric {metric_name} not found in the dataframe.")
-    if len(target_row) > 1:
-        wout.error(f"[kernel_execute_metric_fluctuate_analysis] Multiple rows found for metric {metric_name}.")
+def build_metric_cube(file_dir, metric_list, max_workers=None):
+    """
+    将目录下所有运行的 ncu CSV 一次性读入，堆叠为 (run × kernel × metric) 的浮点数组。
+    每个文件只读取一次，缺失的值为 NaN。
+
+    Args:
+        `file_dir` (str): 多次运行的 CSV 所在目录。
+        `metric_list` (list): 需要的指标名称。
+        `max_workers` (int): 并行读取文件的线程数。
 
-    return target_row.iloc[0]['Metric Value']
+    Returns:
+        dict: 包含：
+            - "cube": np.ndarray，形状为 (run, kernel, metric)。
+            - "runs": 运行（文件名）列表。
+            - "kernel_ids": kernel ID 数组。
+            - "metrics": 指标名称列表。
+    """
+    file_names = sorted((f for f in os.listdir(file_dir) if f.endswith('.csv')), key=_run_sort_key)
+    if not file_names:
+        wout.error(f"[kernel_execute_metric_fluctuate_analysis] 目录 {file_dir} 中没有 CSV 文件。")
 
-def get_kernels_metrics_table(kernel_id_list, file_dir, metric_list):
-    # 遍历目录下所有 csv 文件
-    kernel_metrics_tables = defaultdict(lambda: defaultdict(list))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(
+            lambda file_name: cmve.read_metrics_from_csv(os.path.join(file_dir, file_name), metric_list),
+            file_names
+        ))
 
-    for file_name in os.listdir(file_dir):
-        if file_name.endswith('.csv'):
-            file_path = os.path.join(file_dir, file_name)
-            # 读取 csv 文件
-            df = pd.read_csv(file_path)
+    # 每次运行透视为 kernel × metric，再按 kernel ID 的并集对齐
+    tables = [
+        frame.pivot_table(index='ID', columns='metric', values='value', aggfunc='first').reindex(columns=metric_list)
+        for frame in frames
+    ]
+    kernel_ids = np.array(sorted(set().union(*(table.index for table in tables))), dtype=np.int64)
+    cube = np.stack([table.reindex(kernel_ids).to_numpy(dtype=np.float64) for table in tables])
 
-            for kernel_id in kernel_id_list:
-                # 获取 kernel_id 对应的行
-                id_df = df[df['ID'] == kernel_id]
-                if id_df.empty:
-                    wout.error(f"[kernel_execute_metric_fluctuate_analysis] No data found for kernel ID {kernel_id} in file {file_path}.")
-                
-                # 获取指定指标的值
-                for metric_name in metric_list:
-                    metric_value = get_kernel_metric_value(id_df, metric_name)
-                    kernel_metrics_tables[metric_name][kernel_id].append(metric_value)
-    
-    return kernel_metrics_tables
+    return {"cube": cube, "runs": file_names, "kernel_ids": kernel_ids, "metrics": list(metric_list)}
+
+def compute_fluctuation_stats(cube, percentiles=(5, 25, 50, 75, 95), outlier_k=1.5):
+    """
+    对所有 kernel、所有指标同时计算跨运行的波动统计量。
+
+    Args:
+        `cube` (np.ndarray): (run, kernel, metric) 数组。
+        `percentiles` (tuple): 需要的百分位数。
+        `outlier_k` (float): 离群判定系数，超出 [Q1 - k·IQR, Q3 + k·IQR] 的值视为离群。
+
+    Returns:
+        dict: 各统计量，"mean"、"std"、"cv"、"min"、"max"、"count" 的形状为 (kernel, metric)，
+              "percentiles" 的形状为 (len(percentiles), kernel, metric)，"outliers" 为与 cube 同形状的布尔数组。
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(cube, axis=0)
+        std = np.nanstd(cube, axis=0, ddof=1) if cube.shape[0] > 1 else np.zeros_like(mean)
+        cv = np.where(mean != 0, std / np.abs(mean), np.nan)
+        q1, q3 = np.nanpercentile(cube, [25, 75], axis=0)
+        iqr = q3 - q1
+        outliers = (cube < q1 - outlier_k * iqr) | (cube > q3 + outlier_k * iqr)
+
+        return {
+            "mean": mean,
+            "std": std,
+            "cv": cv,
+            "min": np.nanmin(cube, axis=0),
+            "max": np.nanmax(cube, axis=0),
+            "count": np.sum(~np.isnan(cube), axis=0),
+            "percentiles": np.nanpercentile(cube, percentiles, axis=0),
+            "percentile_levels": np.array(percentiles),
+            "outliers": outliers,
+        }
+
+def save_cube(cube_data, output_path, stats=None):
+    """
+    将数据立方体（以及可选的统计量）保存为 .npz，之后可直接加载而无需重新解析 CSV。
+    """
+    arrays = {
+        "cube": cube_data["cube"],
+        "runs": np.array(cube_data["runs"]),
+        "kernel_ids": cube_data["kernel_ids"],
+        "metrics": np.array(cube_data["metrics"]),
+    }
+    if stats is not None:
+        arrays.update({f"stats_{key}": value for key, value in stats.items()})
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    np.savez_compressed(output_path, **arrays)
+    print(f"[kernel_execute_metric_fluctuate_analysis] Cube saved to {output_path}")
+
+def load_cube(input_path):
+    """
+    加载 `save_cube` 保存的文件。
+
+    Returns:
+        tuple: (cube_data, stats)，未保存统计量时 stats 为 None。
+    """
+    with np.load(input_path) as npz:
+        cube_data = {
+            "cube": npz["cube"],
+            "runs": npz["runs"].tolist(),
+            "kernel_ids": npz["kernel_ids"],
+            "metrics": npz["metrics"].tolist(),
+        }
+        stats = {key[len("stats_"):]: npz[key] for key in npz.files if key.startswith("stats_")} or None
+    return cube_data, stats
+
+def cube_to_metrics_table(cube_data, kernel_id_list):
+    """
+    从数据立方体中取出指定 kernel 的原始值。
+
+    Args:
+        `cube_data` (dict): `build_metric_cube` 或 `load_cube` 返回的数据立方体。
+        `kernel_id_list` (list): kernel ID 列表。
+
+    Returns:
+        dict: {指标名称: {kernel ID: [各次运行的值, ...]}}，值按运行顺序排列，缺失的运行被跳过。
+    """
+    id_2_pos = {int(kernel_id): pos for pos, kernel_id in enumerate(cube_data["kernel_ids"])}
+    table = defaultdict(dict)
+    for kernel_id in kernel_id_list:
+        if kernel_id not in id_2_pos:
+            wout.error(f"[kernel_execute_metric_fluctuate_analysis] No data found for kernel ID {kernel_id}.")
+        for metric_pos, metric_name in enumerate(cube_data["metrics"]):
+            values = cube_data["cube"][:, id_2_pos[kernel_id], metric_pos]
+            table[metric_name][kernel_id] = values[~np.isnan(values)].tolist()
+    return table
+
+def print_unstable_kernels(cube_data, stats, top_n=10):
+    """
+    按变异系数输出每个指标最不稳定的若干 kernel。
+    """
+    for metric_pos, metric_name in enumerate(cube_data["metrics"]):
+        cv = stats["cv"][:, metric_pos]
+        order = np.argsort(np.nan_to_num(cv, nan=-1.0))[::-1][:top_n]
+        print(f"[kernel_execute_metric_fluctuate_analysis] {metric_name} CV 最大的 {len(order)} 个 kernel:")
+        for pos in order:
+            # 在线统计不保留原始值，没有离群标记
+            outlier_count = int(stats["outliers"][:, pos, metric_pos].sum()) if "outliers" in stats else "-"
+            print(f"    ID {int(cube_data['kernel_ids'][pos]):>5}  mean {stats['mean'][pos, metric_pos]:>12.3f}  "
+                  f"cv {cv[pos]:>7.2%}  min {stats['min'][pos, metric_pos]:>12.3f}  max {stats['max'][pos, metric_pos]:>12.3f}  "
+                  f"outliers {outlier_count}")
+
+class StreamingMetricStats:
+    """
+    逐次运行累积的在线统计，每个 (kernel, metric) 只保存 Welford 均值/方差、最值与固定大小的分位数样本，
+    不保留全部原始值。状态可以保存后继续追加新的运行（例如在 1–30 次的基础上追加 31–50 次），无需重新读取之前的 CSV。
+
+    分位数样本为容量固定的蓄水池抽样，运行次数不超过容量时分位数是精确的。
+    """
+
+    def __init__(self, metric_list, sketch_size=64, seed=0):
+        """
+        Args:
+            `metric_list` (list): 需要统计的指标名称。
+            `sketch_size` (int): 每个 (kernel, metric) 保存的样本数。
+            `seed` (int): 蓄水池抽样的随机种子，相同的种子与运行顺序得到相同的结果。
+        """
+        self.metrics = list(metric_list)
+        self.sketch_size = sketch_size
+        self.seed = seed
+        self.runs = []
+        self.kernel_ids = np.zeros(0, dtype=np.int64)
+        self._id_2_pos = {}
+        metric_count = len(self.metrics)
+        self.count = np.zeros((0, metric_count), dtype=np.int64)
+        self.mean = np.zeros((0, metric_count))
+        self.m2 = np.zeros((0, metric_count))
+        self.min = np.zeros((0, metric_count))
+        self.max = np.zeros((0, metric_count))
+        self.sketch = np.zeros((0, metric_count, sketch_size))
+
+    def _grow(self, new_ids):
+        # 新出现的 kernel 追加到末尾
+        for kernel_id in new_ids:
+            self._id_2_pos[int(kernel_id)] = len(self._id_2_pos)
+        extra = len(new_ids)
+        metric_count = len(self.metrics)
+        self.kernel_ids = np.concatenate([self.kernel_ids, np.asarray(new_ids, dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros((extra, metric_count), dtype=np.int64)])
+        self.mean = np.concatenate([self.mean, np.zeros((extra, metric_count))])
+        self.m2 = np.concatenate([self.m2, np.zeros((extra, metric_count))])
+        self.min = np.concatenate([self.min, np.full((extra, metric_count), np.inf)])
+        self.max = np.concatenate([self.max, np.full((extra, metric_count), -np.inf)])
+        self.sketch = np.concatenate([self.sketch, np.full((extra, metric_count, self.sketch_size), np.nan)])
+
+    def update(self, kernel_ids, values):
+        """
+        加入一次运行的数据。
+
+        Args:
+            `kernel_ids` (np.ndarray): 该次运行中的 kernel ID。
+            `values` (np.ndarray): 形状为 (len(kernel_ids), len(metrics)) 的值，缺失为 NaN。
+        """
+        new_ids = [kernel_id for kernel_id in kernel_ids if int(kernel_id) not in self._id_2_pos]
+        if new_ids:
+            self._grow(new_ids)
+
+        pos = np.array([self._id_2_pos[int(kernel_id)] for kernel_id in kernel_ids], dtype=np.int64)
+        valid = ~np.isnan(values)
+        rows, cols = np.nonzero(valid)
+        rows_pos = pos[rows]
+        x = values[rows, cols]
+
+        # Welford 更新
+        self.count[rows_pos, cols] += 1
+        n = self.count[rows_pos, cols]
+        delta = x - self.mean[rows_pos, cols]
+        self.mean[rows_pos, cols] += delta / n
+        self.m2[rows_pos, cols] += delta * (x - self.mean[rows_pos, cols])
+        self.min[rows_pos, cols] = np.minimum(self.min[rows_pos, cols], x)
+        self.max[rows_pos, cols] = np.maximum(self.max[rows_pos, cols], x)
+
+        # 蓄水池抽样：前 sketch_size 个值直接保存，之后以 sketch_size / n 的概率替换随机位置
+        rng = np.random.default_rng([self.seed, len(self.runs)])
+        slot = np.where(n <= self.sketch_size, n - 1, rng.integers(0, np.maximum(n, 1)))
+        keep = slot < self.sketch_size
+        self.sketch[rows_pos[keep], cols[keep], slot[keep]] = x[keep]
+
+    def add_run(self, run_name, csv_path):
+        """
+        读取一次运行的 CSV 并加入统计，已加入过的运行会被跳过。
+
+        Returns:
+            bool: 是否加入。
+        """
+        if run_name in self.runs:
+            return False
+        frame = cmve.read_metrics_from_csv(csv_path, self.metrics)
+        table = frame.pivot_table(index='ID', columns='metric', values='value', aggfunc='first').reindex(columns=self.metrics)
+        self.update(table.index.to_numpy(dtype=np.int64), table.to_numpy(dtype=np.float64))
+        self.runs.append(run_name)
+        return True
+
+    def add_dir(self, file_dir):
+        """
+        将目录下尚未加入的运行按编号顺序加入统计。
+
+        Returns:
+            int: 本次加入的运行数。
+        """
+        added = 0
+        for file_name in sorted((f for f in os.listdir(file_dir) if f.endswith('.csv')), key=_run_sort_key):
+            if self.add_run(file_name, os.path.join(file_dir, file_name)):
+                added += 1
+        print(f"[kernel_execute_metric_fluctuate_analysis] 新加入 {added} 次运行，共 {len(self.runs)} 次")
+        return added
+
+    def summary(self, percentiles=(5, 25, 50, 75, 95)):
+        """
+        输出当前统计量，按 kernel ID 排序，键与 `compute_fluctuation_stats` 一致（不含离群标记）。
+
+        Returns:
+            tuple: (kernel_ids, stats)
+        """
+        order = np.argsort(self.kernel_ids)
+        count = self.count[order]
+        mean = np.where(count > 0, self.mean[order], np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(count > 1, np.sqrt(self.m2[order] / np.maximum(count - 1, 1)), np.nan)
+            cv = np.where(mean != 0, std / np.abs(mean), np.nan)
+        stats = {
+            "mean": mean,
+            "std": std,
+            "cv": cv,
+            "min": np.where(count > 0, self.min[order], np.nan),
+            "max": np.where(count > 0, self.max[order], np.nan),
+            "count": count,
+            "percentiles": np.nanpercentile(self.sketch[order], percentiles, axis=-1),
+            "percentile_levels": np.array(percentiles),
+        }
+        return self.kernel_ids[order], stats
+
+    def save(self, output_path):
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        np.savez_compressed(
+            output_path,
+            metrics=np.array(self.metrics), runs=np.array(self.runs), kernel_ids=self.kernel_ids,
+            count=self.count, mean=self.mean, m2=self.m2, min=self.min, max=self.max, sketch=self.sketch,
+            sketch_size=self.sketch_size, seed=self.seed,
+        )
+        print(f"[kernel_execute_metric_fluctuate_analysis] Streaming stats saved to {output_path}")
+
+    @classmethod
+    def load(cls, input_path):
+        with np.load(input_path) as npz:
+            stats = cls(npz["metrics"].tolist(), sketch_size=int(npz["sketch_size"]), seed=int(npz["seed"]))
+            stats.runs = npz["runs"].tolist()
+            stats.kernel_ids = npz["kernel_ids"]
+            stats._id_2_pos = {int(kernel_id): pos for pos, kernel_id in enumerate(stats.kernel_ids)}
+            for key in ("count", "mean", "m2", "min", "max", "sketch"):
+                setattr(stats, key, npz[key])
+        return stats
 
 def save_table_to_json_file(table, output_path):
     with open(output_path, 'w') as f:
@@ -49,12 +318,36 @@ def main():
     metric_list = ["Compute (SM) Throughput", "Memory Throughput", "SM Active Cycles", "SM Frequency", "Duration", "Achieved Occupancy"]
     csv_file_dir = './results/ncu/yolov8n-multi-runs'
     output_json_path = './results/fluctuate/yolov8n_50times_kernels0_3_303_326.json'
+    output_cube_path = './results/fluctuate/yolov8n_50times_cube.npz'
 
-    kernel_metrics_tables = get_kernels_metrics_table(kernel_id_list, csv_file_dir, metric_list)
+    # 所有 kernel 一次构建，统计量随数据一起保存，之后分析其他 kernel 不必重新解析 CSV
+    cube_data = build_metric_cube(csv_file_dir, metric_list)
+    stats = compute_fluctuation_stats(cube_data["cube"])
+    save_cube(cube_data, output_cube_path, stats)
+    print_unstable_kernels(cube_data, stats)
+
+    kernel_metrics_tables = cube_to_metrics_table(cube_data, kernel_id_list)
     save_table_to_json_file(kernel_metrics_tables, output_json_path)
 
+def streaming_main():
+    metric_list = ["Compute (SM) Throughput", "Memory Throughput", "SM Active Cycles", "SM Frequency", "Duration", "Achieved Occupancy"]
+    csv_file_dir = './results/ncu/yolov8n-multi-runs'
+    state_path = './results/fluctuate/yolov8n_streaming_stats.npz'
+
+    # 已有状态时继续追加新的运行
+    if os.path.exists(state_path):
+        streaming_stats = StreamingMetricStats.load(state_path)
+    else:
+        streaming_stats = StreamingMetricStats(metric_list)
+    streaming_stats.add_dir(csv_file_dir)
+    streaming_stats.save(state_path)
+
+    kernel_ids, stats = streaming_stats.summary()
+    print_unstable_kernels({"kernel_ids": kernel_ids, "metrics": streaming_stats.metrics}, stats)
+
 if __name__ == '__main__':
     """
     Usage: python3 ./experiments/kernel_execute_metric_fluctuate_analysis.py
     """
-    main()
\ No newline at end of file
+    main()
+    # streaming_main()
\ No newline at end of file
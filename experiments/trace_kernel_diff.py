@@ -0,0 +1,221 @@
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from utils import warning_output as wout
+from utils.trace_index import TraceIndex
+from experiments import trace_kernel_reporter as tkr
+"""
+比较多个跟踪文件（如 yolov8n/s/m/l/x、yolo11、yolo12）中同类算子对应的 kernel 序列。
+各跟踪文件的 (op_name, provider, kernel_sequence) 关联关系由进程池并行统计，再合并为（关联关系 × 模型）的出现次数矩阵，
+据此给出各模型独有的、所有模型共有的以及部分模型共有的 kernel 序列。结果可输出为 Markdown、CSV 或 JSON。
+"""
+
+
+def get_model_name(trace_file_path):
+    return os.path.splitext(os.path.basename(trace_file_path))[0]
+
+
+def build_relation_table(trace_file_path, ignore_memcpy=False):
+    """
+    统计单个跟踪文件中各关联关系的出现次数，在子进程中运行，只返回可序列化的计数。
+
+    Returns:
+        dict: 键为 `(op_name, provider, kernel_sequence)`，值为出现次数；解析失败时为 None。
+    """
+    trace_index = TraceIndex.from_trace_file(trace_file_path)
+    if trace_index is None:
+        return None
+    result, _, _ = tkr.collect_relations(trace_index, ignore_memcpy)
+    return {key: info["count"] for key, info in result.items()}
+
+
+def build_count_matrix(trace_file_paths, ignore_memcpy=False, workers=None):
+    """
+    并行统计各跟踪文件，合并为出现次数矩阵。
+
+    Args:
+        `trace_file_paths` (list): 跟踪文件路径，模型名称取自文件名。
+        `ignore_memcpy` (bool): 是否忽略 kernel 序列中的 Memcpy。
+        `workers` (int): 进程数，默认为 CPU 核数。
+
+    Returns:
+        dict: 包含
+            - "relations": 关联关系列表，按 (op_name, provider) 排序，同组内按总出现次数降序；
+            - "models": 模型名称列表；
+            - "counts": 形状为 (关联关系数, 模型数) 的 int 矩阵。
+    """
+    models = [get_model_name(path) for path in trace_file_paths]
+    if len(set(models)) != len(models):
+        wout.error(f"[trace_kernel_diff] 跟踪文件的模型名称重复: {models}")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tables = list(executor.map(build_relation_table, trace_file_paths, [ignore_memcpy] * len(trace_file_paths)))
+
+    for path, table in zip(trace_file_paths, tables):
+        if table is None:
+            wout.error(f"[trace_kernel_diff] 无法解析跟踪文件 {path}")
+
+    totals = {}
+    for table in tables:
+        for key, count in table.items():
+            totals[key] = totals.get(key, 0) + count
+    relations = sorted(totals, key=lambda key: (key[0], key[1], -totals[key], key[2]))
+    row_of = {key: row for row, key in enumerate(relations)}
+
+    counts = np.zeros((len(relations), len(models)), dtype=np.int64)
+    for column, table in enumerate(tables):
+        rows = [row_of[key] for key in table]
+        counts[rows, column] = list(table.values())
+
+    return {"relations": relations, "models": models, "counts": counts}
+
+
+def classify_relations(matrix):
+    """
+    根据出现次数矩阵对关联关系分类。
+
+    Returns:
+        dict: 包含
+            - "shared": 所有模型中都出现的关联关系下标；
+            - "unique": {模型名称: 只在该模型中出现的关联关系下标}；
+            - "partial": 出现在多个但不是全部模型中的关联关系下标；
+            - "present": 每个关联关系出现的模型数。
+    """
+    present = (matrix["counts"] > 0).sum(axis=1)
+    model_count = len(matrix["models"])
+    owner = (matrix["counts"] > 0).argmax(axis=1)
+
+    unique = {model: [] for model in matrix["models"]}
+    for row in np.flatnonzero(present == 1):
+        unique[matrix["models"][owner[row]]].append(int(row))
+
+    return {
+        "shared": np.flatnonzero(present == model_count).tolist(),
+        "unique": unique,
+        "partial": np.flatnonzero((present > 1) & (present < model_count)).tolist(),
+        "present": present.tolist(),
+    }
+
+
+def _status(row, classes, models):
+    present = classes["present"][row]
+    if present == len(models):
+        return "shared"
+    if present == 1:
+        return "unique"
+    return "partial"
+
+
+def write_csv(matrix, classes, output_path):
+    """
+    输出 CSV，每行一个关联关系，kernel 序列以 " | " 连接，每个模型一列出现次数。
+    """
+    models = matrix["models"]
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["op_name", "provider", "kernel_sequence", "sequence_length", "status", "models_present"] + models)
+        for row, (op_name, provider, kernel_sequence) in enumerate(matrix["relations"]):
+            writer.writerow([op_name, provider, " | ".join(kernel_sequence), len(kernel_sequence),
+                             _status(row, classes, models), classes["present"][row]] + matrix["counts"][row].tolist())
+    print(f"[trace_kernel_diff] CSV 已保存到 {output_path}")
+
+
+def write_json(matrix, classes, output_path):
+    """
+    输出 JSON，包含模型列表、各关联关系的出现次数与分类结果。
+    """
+    models = matrix["models"]
+    data = {
+        "models": models,
+        "relations": [
+            {
+                "op_name": op_name,
+                "provider": provider,
+                "kernel_sequence": list(kernel_sequence),
+                "status": _status(row, classes, models),
+                "counts": dict(zip(models, matrix["counts"][row].tolist())),
+            }
+            for row, (op_name, provider, kernel_sequence) in enumerate(matrix["relations"])
+        ],
+        "summary": {
+            "shared": len(classes["shared"]),
+            "partial": len(classes["partial"]),
+            "unique": {model: len(rows) for model, rows in classes["unique"].items()},
+        },
+    }
+    with open(output_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    print(f"[trace_kernel_diff] JSON 已保存到 {output_path}")
+
+
+def print_markdown(matrix, classes, include_cpu=False):
+    """
+    以 Markdown 格式输出：先输出分类汇总，再按算子输出各 kernel 序列在各模型中的出现次数。
+    """
+    models = matrix["models"]
+    simplify_provider = lambda provider: provider.replace('ExecutionProvider', '')
+
+    print("## 汇总")
+    print(f"| 分类 | 关联关系数 |")
+    print("| ---- | ---- |")
+    print(f"| 所有模型共有 | {len(classes['shared'])} |")
+    print(f"| 部分模型共有 | {len(classes['partial'])} |")
+    for model, rows in classes["unique"].items():
+        print(f"| {model} 独有 | {len(rows)} |")
+    print()
+
+    current = None
+    for row, (op_name, provider, kernel_sequence) in enumerate(matrix["relations"]):
+        if provider == 'CPUExecutionProvider' and not include_cpu:
+            continue
+        if (op_name, provider) != current:
+            current = (op_name, provider)
+            sequence_index = 0
+            print(f"## {op_name} - {simplify_provider(provider)}")
+            print("| 序列 | 长度 | 分类 | " + " | ".join(models) + " |")
+            print("| ---- | ---- | ---- | " + " | ".join("----" for _ in models) + " |")
+        sequence_index += 1
+        counts = " | ".join(str(count) for count in matrix["counts"][row])
+        print(f"| S{sequence_index} | {len(kernel_sequence)} | {_status(row, classes, models)} | {counts} |")
+        print(f"|  | {'<br>'.join(f'`{kernel}`' for kernel in kernel_sequence) or '无对应 Kernel'} |  | " + " | ".join("" for _ in models) + " |")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare operator - kernel mappings across multiple trace files.')
+    parser.add_argument('--inputs', nargs='+', default=None, help='Paths to trace JSON files')
+    parser.add_argument('--dir', default=None, help='Directory containing trace JSON files')
+    parser.add_argument('--imem', action='store_true', help='Ignore kernels containing memcpy (case - insensitive)')
+    parser.add_argument('--cpu', action='store_true', help='Include CPUExecutionProvider operators in Markdown output')
+    parser.add_argument('--csv', default=None, help='Write the (relation x model) count matrix to this CSV file')
+    parser.add_argument('--json', default=None, help='Write the comparison result to this JSON file')
+    parser.add_argument('--no-md', action='store_true', help='Do not print Markdown report')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    args = parser.parse_args()
+
+    trace_file_paths = list(args.inputs or [])
+    if args.dir is not None:
+        trace_file_paths += sorted(str(path) for path in Path(args.dir).glob('*.json'))
+    if len(trace_file_paths) < 2:
+        wout.error("[trace_kernel_diff] 至少需要两个跟踪文件")
+
+    matrix = build_count_matrix(trace_file_paths, args.imem, args.workers)
+    classes = classify_relations(matrix)
+
+    if not args.no_md:
+        print_markdown(matrix, classes, args.cpu)
+    if args.csv is not None:
+        write_csv(matrix, classes, args.csv)
+    if args.json is not None:
+        write_json(matrix, classes, args.json)
+
+
+if __name__ == "__main__":
+    """
+    Usage: python3 ./experiments/trace_kernel_diff.py --inputs ./results/trace/yolov8n.json ./results/trace/yolov8s.json --imem --csv diff.csv
+    """
+    main()
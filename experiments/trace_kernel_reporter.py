@@ -1,6 +1,46 @@
 import argparse
 from collections import defaultdict
-from utils import trace_file_parser as tfp
+from utils.trace_index import TraceIndex
+from utils.trace_sampler import IterationSampler, OpTypeSampler
+
+
+def collect_relations(node_kernel_pairs, ignore_memcpy=False):
+    """
+    统计 (op_name, provider, kernel_sequence) 对应关系及各 (op_name, provider) 的出现次数。
+
+    Args:
+        `node_kernel_pairs` (list | TraceIndex): 由 trace_file_parser.get_pairs_from_trace_file 返回的列表，
+            或已建立的 `TraceIndex`（复用其中缓存的关联关系分组）。
+        `ignore_memcpy` (bool): 是否忽略名称中包含 memcpy（不区分大小写）的 kernel。
+
+    Returns:
+        tuple: 三个字典：
+            - `result`: 键为 `(op_name, provider, kernel_sequence)`，值为包含 "count" 与 "nodes"（节点名称列表）的字典；
+            - `op_provider_count`: 每个 `(op_name, provider)` 的总出现次数；
+            - `op_provider_non_empty_kernel_count`: 每个 `(op_name, provider)` 有非空 kernel 序列对应的次数。
+    """
+    result = defaultdict(lambda: {'count': 0, 'nodes': []})
+    # 用于记录每个 (op_name, provider) 出现的总次数
+    op_provider_count = defaultdict(int)
+    # 用于记录每个 (op_name, provider) 有非空 kernel 序列对应的次数
+    op_provider_non_empty_kernel_count = defaultdict(int)
+
+    if not isinstance(node_kernel_pairs, TraceIndex):
+        node_kernel_pairs = TraceIndex(node_kernel_pairs)
+
+    # 按关联关系分组统计，每组只处理一次
+    for (op_name, provider, kernel_sequence), pairs in node_kernel_pairs.by_relation.items():
+        if ignore_memcpy:
+            kernel_sequence = tuple(k for k in kernel_sequence if 'memcpy' not in k.lower())
+
+        key = (op_name, provider, kernel_sequence)
+        result[key]['count'] += len(pairs)
+        result[key]['nodes'].extend(pair["Node"]["name"] for pair in pairs)
+        op_provider_count[(op_name, provider)] += len(pairs)
+        if kernel_sequence:
+            op_provider_non_empty_kernel_count[(op_name, provider)] += len(pairs)
+
+    return result, op_provider_count, op_provider_non_empty_kernel_count
 
 
 def main():
@@ -12,36 +52,28 @@ def main():
                         help='Ignore kernels containing memcpy (case - insensitive)')
     parser.add_argument('--md', action='store_true',
                         help='Output analysis results in Markdown format。')
+    parser.add_argument('--sample-iterations', type=int, default=None,
+                        help='Only analyze this many randomly chosen whole iterations')
+    parser.add_argument('--sample-fraction', type=float, default=None,
+                        help='Only analyze this fraction of nodes of each operator type')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for sampling')
     args = parser.parse_args()
 
-    result = defaultdict(lambda: {'count': 0, 'nodes': []})
-    # 用于记录每个 (op_name, provider) 出现的总次数
-    op_provider_count = defaultdict(int)
-    # 用于记录每个 (op_name, provider) 有非空 kernel 序列对应的次数
-    op_provider_non_empty_kernel_count = defaultdict(int)
+    sampler = None
+    if args.sample_iterations is not None:
+        sampler = IterationSampler(args.sample_iterations, args.seed)
+    elif args.sample_fraction is not None:
+        sampler = OpTypeSampler(args.sample_fraction, args.seed)
 
-    node_kernel_pairs = tfp.get_pairs_from_trace_file(args.input)
-    if node_kernel_pairs is None:
+    trace_index = TraceIndex.from_trace_file(args.input, sampler=sampler)
+    if trace_index is None:
         return
+    if trace_index.sample_info is not None:
+        # 采样时出现次数为样本中的次数，乘以权重可估计全量次数
+        print(f"采样信息: {trace_index.sample_info}")
+        print()
 
-    for pair in node_kernel_pairs:
-        current_node = pair["Node"]
-        current_kernels = pair["Kernels"]
-
-        op_name = current_node['args']['op_name']
-        provider = current_node['args']['provider']
-        node_name = current_node['name']
-        kernel_sequence = [kernel['name'] for kernel in current_kernels]
-
-        if args.imem:
-            kernel_sequence = [k for k in kernel_sequence if 'memcpy' not in k.lower()]
-
-        key = (op_name, provider, tuple(kernel_sequence))
-        result[key]['count'] += 1
-        result[key]['nodes'].append(node_name)
-        op_provider_count[(op_name, provider)] += 1
-        if kernel_sequence:
-            op_provider_non_empty_kernel_count[(op_name, provider)] += 1
+    result, op_provider_count, op_provider_non_empty_kernel_count = collect_relations(trace_index, args.imem)
 
     # 按 (op_name, provider) 分组
     grouped_result = defaultdict(list)
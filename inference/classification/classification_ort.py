@@ -1,40 +1,94 @@
 # for resnet, vgg, mobilenet, squeezenet
 
 import argparse
-import onnx
+import os
+import time
 import numpy as np
 import onnxruntime as ort
 from PIL import Image
 import cv2
 import matplotlib.pyplot as plt
+from utils import image_pipeline as ip
+from utils import warning_output as wout
+
+"""
+分类模型推理，可作为模块导入使用 `ImageClassifier`，也可以直接运行。
+
+Usage:
+    单张图片（开启 profiling、关闭图优化，与原有 trace 采集方式一致）：
+        python3 ./inference/classification/classification_ort.py --model ./models/classification/resnet/resnet50-v1-7.onnx
+
+    目录批量推理，对比 orto0 与完全优化的吞吐：
+        python3 ./inference/classification/classification_ort.py --img-dir ./images --batch-size 8 --opt-level disable --no-profiling
+        python3 ./inference/classification/classification_ort.py --img-dir ./images --batch-size 8 --opt-level all --no-profiling
+"""
+
+DEFAULT_LABELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synset.txt')
+DEFAULT_IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kitten.jpg')
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+# 会话缓存，键为 (模型路径, providers, 优化等级, 是否 profiling, intra 线程数, inter 线程数)
+_session_cache = {}
+
+
+def get_session(model_path, providers=("CUDAExecutionProvider",), optimization_level="disable", enable_profiling=False,
+                intra_op_num_threads=0, inter_op_num_threads=0):
+    """
+    获取推理会话，相同配置的会话只创建一次。
+
+    Args:
+        `model_path` (str): ONNX 模型路径。
+        `providers` (tuple): 执行提供者，按优先级排列。
+        `optimization_level` (str): 图优化等级，取值为 `GRAPH_OPTIMIZATION_LEVELS` 的键。
+        `enable_profiling` (bool): 是否开启 ONNX Runtime Profiler。
+        `intra_op_num_threads` (int): 算子内并行线程数，0 表示由 ORT 决定。
+        `inter_op_num_threads` (int): 算子间并行线程数，0 表示由 ORT 决定。
+
+    Returns:
+        onnxruntime.InferenceSession: 推理会话。
+    """
+    if optimization_level not in GRAPH_OPTIMIZATION_LEVELS:
+        wout.error(f"[classification_ort] 未知的图优化等级 {optimization_level}，可选 {list(GRAPH_OPTIMIZATION_LEVELS)}")
+
+    key = (os.path.abspath(model_path), tuple(providers), optimization_level, enable_profiling,
+           intra_op_num_threads, inter_op_num_threads)
+    if key in _session_cache:
+        return _session_cache[key]
+
+    # Start from ORT 1.10, ORT requires explicitly setting the providers parameter if you want to use execution providers
+    # other than the default CPU provider (as opposed to the previous behavior of providers getting set/registered by default
+    # based on the build flags) when instantiating InferenceSession.
+    so = ort.SessionOptions()
+    if enable_profiling:
+        so.enable_profiling = True
+        so.log_severity_level = 0
+    so.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[optimization_level]
+    so.intra_op_num_threads = intra_op_num_threads
+    so.inter_op_num_threads = inter_op_num_threads
+    session = ort.InferenceSession(model_path, providers=list(providers), sess_options=so)
+    # session = ort.InferenceSession(model_path, providers=[
+    #     ("CUDAExecutionProvider", {
+    #         "cudnn_conv_algo_search": "DEFAULT"
+    #     })
+    # ], sess_options=so)
+
+    _session_cache[key] = session
+    return session
+
+
+def release_session(session):
+    """
+    将会话移出缓存，profiling 结束后的会话不能再产生跟踪数据，不应被复用。
+    """
+    for key in [key for key, value in _session_cache.items() if value is session]:
+        del _session_cache[key]
 
-# 从参数中获取 model_path
-parser = argparse.ArgumentParser(description='Classification Inference.')
-parser.add_argument('--model', type=str, help='Path to the input ONNX file', default='./models/classification/resnet/resnet50-v1-7.onnx')
-args = parser.parse_args()
-
-with open('./inference/classification/synset.txt', 'r') as f:
-    labels = [l.rstrip() for l in f]
-
-model_path = args.model
-# model = onnx.load(model_path)
-
-# Start from ORT 1.10, ORT requires explicitly setting the providers parameter if you want to use execution providers
-# other than the default CPU provider (as opposed to the previous behavior of providers getting set/registered by default
-# based on the build flags) when instantiating InferenceSession.
-# For example, if NVIDIA GPU is available and ORT Python package is built with CUDA, then call API as following:
-# onnxruntime.InferenceSession(path/to/model, providers=['CUDAExecutionProvider']).
-so = ort.SessionOptions()
-so.enable_profiling = True
-so.log_severity_level = 0
-so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
-session = ort.InferenceSession(model_path, providers=["CUDAExecutionProvider"], sess_options=so)
-# session = ort.InferenceSession(model_path, providers=[
-#     ("CUDAExecutionProvider", {
-#         "cudnn_conv_algo_search": "DEFAULT"
-#     })
-# ], sess_options=so)
-# session = ort.InferenceSession(model.SerializeToString(), providers=["CUDAExecutionProvider"], sess_options=so)
 
 def get_image(path, show=False):
     with Image.open(path) as img:
@@ -43,6 +97,7 @@ def get_image(path, show=False):
         plt.imshow(img)
         plt.axis('off')
     return img
+
 def preprocess(img):
     img = img / 255.
     img = cv2.resize(img, (256, 256))
@@ -56,17 +111,162 @@ def preprocess(img):
     img = np.expand_dims(img, axis=0)
     return img
 
-def predict(path):
-    img = get_image(path, show=True)
-    img = preprocess(img)
-    ort_inputs = {session.get_inputs()[0].name: img}
-    preds = session.run(None, ort_inputs)[0]
-    preds = np.squeeze(preds)
-    session.end_profiling()
-    a = np.argsort(preds)[::-1]
-    print('class=%s ; probability=%f' %(labels[a[0]],preds[a[0]]))
-
-# Enter path to the inference image below
-img_path = './inference/classification/kitten.jpg'
-predict(img_path)
+
+class ImageClassifier:
+    """
+    分类模型推理，会话来自 `get_session` 的缓存，同一配置的多个实例共享会话。
+    """
+
+    def __init__(self, model_path, providers=("CUDAExecutionProvider",), optimization_level="disable",
+                 enable_profiling=False, intra_op_num_threads=0, inter_op_num_threads=0, labels_path=DEFAULT_LABELS_PATH):
+        """
+        Args:
+            `model_path` (str): ONNX 模型路径。
+            `providers` (tuple): 执行提供者。
+            `optimization_level` (str): 图优化等级，"disable"、"basic"、"extended" 或 "all"。
+            `enable_profiling` (bool): 是否开启 ONNX Runtime Profiler，跟踪文件在 `end_profiling` 时写出。
+            `intra_op_num_threads` (int): 算子内并行线程数。
+            `inter_op_num_threads` (int): 算子间并行线程数。
+            `labels_path` (str): 类别标签文件路径。
+        """
+        self.session = get_session(model_path, providers, optimization_level, enable_profiling,
+                                   intra_op_num_threads, inter_op_num_threads)
+        self.enable_profiling = enable_profiling
+        self.input_name = self.session.get_inputs()[0].name
+
+        # 输入的 batch 维度为整数时，模型只接受固定的 batch 大小
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.fixed_batch_size = batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else None
+
+        with open(labels_path, 'r') as f:
+            self.labels = [l.rstrip() for l in f]
+
+    def load_image(self, path):
+        return preprocess(get_image(path))
+
+    def _run(self, batch):
+        preds = self.session.run(None, {self.input_name: batch})[0]
+        return preds.reshape(batch.shape[0], -1)
+
+    def _top1(self, path, pred):
+        class_idx = int(np.argmax(pred))
+        return {"path": path, "class": self.labels[class_idx], "probability": float(pred[class_idx])}
+
+    def predict(self, path, show=False):
+        """
+        对单张图片进行推理。
+
+        Returns:
+            dict: 包含 "path"、"class"、"probability"。
+        """
+        img = preprocess(get_image(path, show=show))
+        return self._top1(path, self._run(img)[0])
+
+    def predict_batch(self, image_paths, batch_size=1, num_workers=4, queue_size=16):
+        """
+        对图片列表进行批量推理，图片的读取与预处理在线程池中进行。
+
+        Args:
+            `image_paths` (iterable): 图片路径。
+            `batch_size` (int): 每次 `session.run` 的图片数，模型 batch 维度固定时使用模型的值。
+            `num_workers` (int): 预处理线程数。
+            `queue_size` (int): 预处理队列容量。
+
+        Returns:
+            (list, dict): 每张图片的 top-1 结果，以及吞吐统计。
+        """
+        if self.fixed_batch_size is not None and batch_size != self.fixed_batch_size:
+            wout.simple(f"[classification_ort] 模型 batch 维度固定为 {self.fixed_batch_size}，忽略 batch_size={batch_size}")
+            batch_size = self.fixed_batch_size
+
+        results = []
+        batch_paths = []
+        batch_imgs = []
+        inference_time = 0.0
+
+        def flush():
+            nonlocal inference_time
+            batch = np.concatenate(batch_imgs, axis=0)
+            run_start = time.perf_counter()
+            preds = self._run(batch)
+            inference_time += time.perf_counter() - run_start
+            results.extend(self._top1(path, pred) for path, pred in zip(batch_paths, preds))
+            batch_paths.clear()
+            batch_imgs.clear()
+
+        start_time = time.perf_counter()
+        for path, img in ip.ImagePrefetcher(image_paths, self.load_image, num_workers=num_workers, queue_size=queue_size):
+            batch_paths.append(path)
+            batch_imgs.append(img)
+            if len(batch_imgs) == batch_size:
+                flush()
+        if batch_imgs:
+            if self.fixed_batch_size is not None:
+                # 固定 batch 的模型无法运行不完整的 batch，逐张补齐
+                pad = batch_size - len(batch_imgs)
+                batch_imgs.extend([batch_imgs[-1]] * pad)
+                batch_paths.extend([None] * pad)
+                flush()
+                del results[len(results) - pad:]
+            else:
+                flush()
+        elapsed_time = time.perf_counter() - start_time
+
+        stats = {
+            "images": len(results),
+            "batch_size": batch_size,
+            "elapsed": elapsed_time,
+            "inference": inference_time,
+            "throughput": len(results) / elapsed_time if elapsed_time > 0 else 0.0,
+        }
+        return results, stats
+
+    def end_profiling(self):
+        """
+        结束 profiling 并写出跟踪文件，会话随即移出缓存。
+
+        Returns:
+            str: 跟踪文件路径，未开启 profiling 时为 None。
+        """
+        if not self.enable_profiling:
+            return None
+        release_session(self.session)
+        return self.session.end_profiling()
+
+
+if __name__ == "__main__":
+    # 从参数中获取 model_path
+    parser = argparse.ArgumentParser(description='Classification Inference.')
+    parser.add_argument('--model', type=str, help='Path to the input ONNX file', default='./models/classification/resnet/resnet50-v1-7.onnx')
+    parser.add_argument('--img', type=str, help='Path to the inference image', default=DEFAULT_IMAGE_PATH)
+    parser.add_argument('--img-dir', type=str, help='Directory of images for batch inference', default=None)
+    parser.add_argument('--batch-size', type=int, help='Batch size of batch inference', default=1)
+    parser.add_argument('--workers', type=int, help='Number of preprocessing threads', default=4)
+    parser.add_argument('--opt-level', type=str, help='Graph optimization level', choices=list(GRAPH_OPTIMIZATION_LEVELS), default='disable')
+    parser.add_argument('--intra-threads', type=int, help='intra_op_num_threads, 0 for ORT default', default=0)
+    parser.add_argument('--inter-threads', type=int, help='inter_op_num_threads, 0 for ORT default', default=0)
+    parser.add_argument('--no-profiling', action='store_true', help='Disable ONNX Runtime profiling')
+    args = parser.parse_args()
+
+    classifier = ImageClassifier(
+        args.model,
+        optimization_level=args.opt_level,
+        enable_profiling=not args.no_profiling,
+        intra_op_num_threads=args.intra_threads,
+        inter_op_num_threads=args.inter_threads,
+    )
+
+    if args.img_dir is not None:
+        results, stats = classifier.predict_batch(ip.list_images(args.img_dir), batch_size=args.batch_size, num_workers=args.workers)
+        for result in results:
+            print('%s: class=%s ; probability=%f' % (result["path"], result["class"], result["probability"]))
+        print(f"[classification_ort] {stats['images']} images, batch size {stats['batch_size']}, "
+              f"{stats['elapsed']:.3f} s ({stats['throughput']:.2f} img/s), session.run {stats['inference']:.3f} s")
+    else:
+        result = classifier.predict(args.img, show=True)
+        print('class=%s ; probability=%f' % (result["class"], result["probability"]))
+
+    profile_file = classifier.end_profiling()
+    if profile_file:
+        print(f"[classification_ort] Profiling data saved to {profile_file}")
 
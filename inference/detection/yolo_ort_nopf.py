@@ -1,6 +1,8 @@
 # Ultralytics 🚀 AGPL-3.0 License - https://ultralytics.com/license
 
 import argparse
+import os
+import time
 
 import cv2
 import numpy as np
@@ -10,6 +12,8 @@ import torch
 from ultralytics.utils import ASSETS, yaml_load
 from ultralytics.utils.checks import check_requirements, check_yaml
 
+from utils import image_pipeline as ip
+
 """
 关闭 ONNX Runtime Profiler，使用 NVIDIA Nsight 分析工具进行分析
 
@@ -112,8 +116,20 @@ class YOLOv8:
         # Get the height and width of the input image
         self.img_height, self.img_width = self.img.shape[:2]
 
+        return self.preprocess_image(self.img)
+
+    def preprocess_image(self, img):
+        """
+        Preprocesses a decoded BGR image. Does not touch instance state, so it can run on worker threads.
+
+        Args:
+            img (numpy.ndarray): The decoded BGR image.
+
+        Returns:
+            image_data: Preprocessed image data ready for inference.
+        """
         # Convert the image color space from BGR to RGB
-        img = cv2.cvtColor(self.img, cv2.COLOR_BGR2RGB)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
         # Resize the image to match the input shape
         img = cv2.resize(img, (self.input_width, self.input_height))
@@ -130,6 +146,21 @@ class YOLOv8:
         # Return the preprocessed image data
         return image_data
 
+    def load_image(self, path):
+        """
+        Reads and preprocesses one image, used by the prefetch thread pool in stream mode.
+
+        Args:
+            path (str): Path to the image.
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): The decoded image and the preprocessed image data.
+        """
+        img = cv2.imread(path)
+        if img is None:
+            raise ValueError(f"cv2 cannot read {path}")
+        return img, self.preprocess_image(img)
+
     def postprocess(self, input_image, output):
         """
         Performs post-processing on the model's output to extract bounding boxes, scores, and class IDs.
@@ -153,8 +184,9 @@ class YOLOv8:
         class_ids = []
 
         # Calculate the scaling factors for the bounding box coordinates
-        x_factor = self.img_width / self.input_width
-        y_factor = self.img_height / self.input_height
+        img_height, img_width = input_image.shape[:2]
+        x_factor = img_width / self.input_width
+        y_factor = img_height / self.input_height
 
         # Iterate over each row in the outputs array
         for i in range(rows):
@@ -199,12 +231,12 @@ class YOLOv8:
         # Return the modified input image
         return input_image
 
-    def main(self):
+    def create_session(self):
         """
-        Performs inference using an ONNX model and returns the output image with drawn detections.
+        Creates the inference session and records the model input size.
 
         Returns:
-            output_img: The output image with drawn detections.
+            session: The ONNX Runtime inference session.
         """
 
         # Profiling options
@@ -220,16 +252,26 @@ class YOLOv8:
         #     })
         # ], sess_options=so)
         session = ort.InferenceSession(self.onnx_model, providers=["CUDAExecutionProvider"], sess_options=so)
-        
-
-        # Get the model inputs
-        model_inputs = session.get_inputs()
 
         # Store the shape of the input for later use
-        input_shape = model_inputs[0].shape
+        input_shape = session.get_inputs()[0].shape
         self.input_width = input_shape[2]
         self.input_height = input_shape[3]
 
+        return session
+
+    def main(self):
+        """
+        Performs inference using an ONNX model and returns the output image with drawn detections.
+
+        Returns:
+            output_img: The output image with drawn detections.
+        """
+        session = self.create_session()
+
+        # Get the model inputs
+        model_inputs = session.get_inputs()
+
         # Preprocess the image data
         img_data = self.preprocess()
 
@@ -239,6 +281,58 @@ class YOLOv8:
         # Perform post-processing on the outputs to obtain output image.
         return self.postprocess(self.img, outputs), session.end_profiling()  # output image
 
+    def stream(self, image_paths, output_dir=None, num_workers=4, queue_size=8):
+        """
+        Runs inference over a stream of images. Decoding and preprocessing run in a thread pool feeding a bounded
+        queue ahead of the inference loop, drawing and saving run on a separate writer thread.
+
+        Args:
+            image_paths (iterable): Paths of the input images, a list or a generator.
+            output_dir (str): Directory for the output images, None to skip drawing and saving.
+            num_workers (int): Number of preprocessing threads.
+            queue_size (int): Capacity of the prefetch and writer queues.
+
+        Returns:
+            (dict, str): Throughput statistics and the profiling file (None if profiling is disabled).
+        """
+        session = self.create_session()
+        input_name = session.get_inputs()[0].name
+
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+        def write_output(path, img, outputs):
+            output_img = self.postprocess(img, outputs)
+            cv2.imwrite(os.path.join(output_dir, os.path.basename(path)), output_img)
+
+        prefetcher = ip.ImagePrefetcher(image_paths, self.load_image, num_workers=num_workers, queue_size=queue_size)
+        writer = ip.AsyncImageWriter(write_output, queue_size=queue_size) if output_dir is not None else None
+
+        image_count = 0
+        inference_time = 0.0
+        start_time = time.perf_counter()
+        try:
+            for path, (img, img_data) in prefetcher:
+                run_start = time.perf_counter()
+                outputs = session.run(None, {input_name: img_data})
+                inference_time += time.perf_counter() - run_start
+                image_count += 1
+                if writer is not None:
+                    writer.submit(path, img, outputs)
+        finally:
+            if writer is not None:
+                writer.close()
+        elapsed_time = time.perf_counter() - start_time
+
+        stats = {
+            "images": image_count,
+            "elapsed": elapsed_time,
+            "inference": inference_time,
+            "throughput": image_count / elapsed_time if elapsed_time > 0 else 0.0,
+        }
+        profile_file = session.end_profiling() or None
+        return stats, profile_file
+
 
 if __name__ == "__main__":
     """
@@ -251,6 +345,10 @@ if __name__ == "__main__":
     parser.add_argument("--img", type=str, default="./inference/detection/bus.jpg", help="Path to input image.")
     parser.add_argument("--conf-thres", type=float, default=0.5, help="Confidence threshold")
     parser.add_argument("--iou-thres", type=float, default=0.5, help="NMS IoU threshold")
+    parser.add_argument("--img-dir", type=str, default=None, help="Directory of input images, enables the pipelined stream mode.")
+    parser.add_argument("--output-dir", type=str, default=None, help="Directory for output images in stream mode, omit to skip saving.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of preprocessing threads in stream mode.")
+    parser.add_argument("--queue-size", type=int, default=8, help="Capacity of the prefetch and writer queues in stream mode.")
     args = parser.parse_args()
 
     # Check the requirements and select the appropriate backend (CPU or GPU)
@@ -259,17 +357,27 @@ if __name__ == "__main__":
     # Create an instance of the YOLOv8 class with the specified arguments
     detection = YOLOv8(args.model, args.img, args.conf_thres, args.iou_thres)
 
-    # Perform object detection and obtain the output image
-    output_image, profile_file = detection.main()
-
-    # Display the output image in a window
-    # cv2.namedWindow("Output", cv2.WINDOW_NORMAL)
-    # cv2.imshow("Output", output_image)
-
-    # Wait for a key press to exit
-    # cv2.waitKey(0)
-
-    output_path = 'output_image.jpg'
-    cv2.imwrite(output_path, output_image)
-    print(f"Output image saved to {output_path}")
-    print(f"Profiling data saved to {profile_file}")
+    if args.img_dir is not None:
+        # Pipelined stream mode over a directory of images
+        stats, profile_file = detection.stream(
+            ip.list_images(args.img_dir), args.output_dir, num_workers=args.workers, queue_size=args.queue_size
+        )
+        print(f"Processed {stats['images']} images in {stats['elapsed']:.3f} s ({stats['throughput']:.2f} img/s), "
+              f"session.run {stats['inference']:.3f} s")
+        if profile_file:
+            print(f"Profiling data saved to {profile_file}")
+    else:
+        # Perform object detection and obtain the output image
+        output_image, profile_file = detection.main()
+
+        # Display the output image in a window
+        # cv2.namedWindow("Output", cv2.WINDOW_NORMAL)
+        # cv2.imshow("Output", output_image)
+
+        # Wait for a key press to exit
+        # cv2.waitKey(0)
+
+        output_path = 'output_image.jpg'
+        cv2.imwrite(output_path, output_image)
+        print(f"Output image saved to {output_path}")
+        print(f"Profiling data saved to {profile_file}")
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import onnx
+import pandas as pd
+from utils import trace_file_parser as tfp
+from utils import pairs_ncu_integrator as pni
+from utils import warning_output as wo
+import onnx_kernel_filler as okf
+"""
+将算子与 kernel 的对应关系导出为列式表格（Parquet / Feather，或 CSV），与 onnx_kernel_filler 生成的 kernel 级计算图内容一致，
+但可以直接用 pandas / pyarrow 对多个模型做向量化筛选，无需重新解析 protobuf。
+
+输出三张表，均带有 "model" 列，多个模型的表可以直接拼接：
+    - kernels: 每个 kernel 一行，包含 kernel 名称、序号、耗时、启动参数、父算子的实测属性以及 ncu 指标（列名见 pairs_ncu_integrator.ncu_column_name，与 onnx_kernel_filler 的节点属性一致）；
+    - nodes: 每个算子一行，包含算子类型、在图中的位置、kernel 数、kernel 总耗时、实测耗时与属性（JSON 字符串）；
+    - edges: 每条算子间的数据依赖一行，包含生产者、消费者与张量名称。
+
+Parquet 与 Feather 需要 pyarrow。
+"""
+
+FILE_EXTENSIONS = {"parquet": "parquet", "feather": "feather", "csv": "csv"}
+
+
+def _attribute_value(attr):
+    """
+    将 onnx.AttributeProto 转换为可以写入 JSON 的值，张量只保留形状。
+    """
+    if attr.type == onnx.AttributeProto.TENSOR:
+        return {"tensor_dims": list(attr.t.dims)}
+    if attr.type == onnx.AttributeProto.GRAPH:
+        return {"graph": attr.g.name}
+    value = onnx.helper.get_attribute_value(attr)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, list):
+        return [v.decode("utf-8", errors="replace") if isinstance(v, bytes) else v for v in value
+                if not isinstance(v, (onnx.TensorProto, onnx.GraphProto))]
+    return value
+
+
+def _to_number(value):
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def build_tables(onnx_model, node_kernel_mapping, model_name):
+    """
+    构建 kernels、nodes、edges 三张表。
+
+    Args:
+        `onnx_model` (onnx.ModelProto): 算子级 ONNX 模型，可以不包含权重。
+        `node_kernel_mapping` (dict): trace_file_parser.get_node_kernel_mapping 返回的字典。
+        `model_name` (str): 模型名称。
+
+    Returns:
+        tuple: (kernels, nodes, edges) 三个 pandas.DataFrame。
+    """
+    kernel_rows = []
+    node_rows = []
+    edge_rows = []
+    producers = {}
+
+    for position, node in enumerate(onnx_model.graph.node):
+        for output in node.output:
+            producers[output] = node.name
+
+        trace_pair = node_kernel_mapping.get(f"{node.name}_kernel_time")
+        trace_node = trace_pair["Node"] if trace_pair is not None else None
+        kernels = trace_pair["Kernels"] if trace_pair is not None else []
+
+        node_rows.append({
+            "model": model_name,
+            "node_name": node.name,
+            "op_type": node.op_type,
+            "domain": node.domain,
+            "graph_position": position,
+            "traced": trace_pair is not None,
+            "trace_index": trace_node["Index"] if trace_node is not None else -1,
+            "trace_duration": trace_node["dur"] if trace_node is not None else None,
+            "provider": trace_node["args"]["provider"] if trace_node is not None else None,
+            "kernel_count": len(kernels),
+            "kernel_time": sum(kernel["dur"] for kernel in kernels),
+            "attributes": json.dumps({attr.name: _attribute_value(attr) for attr in node.attribute}),
+        })
+
+        if not kernels:
+            continue
+        trace_args = trace_node["args"]
+        parent_columns = {
+            "p_trace_duration": trace_node["dur"],
+            "p_trace_output_size": int(trace_args["output_size"]),
+            "p_trace_parameter_size": int(trace_args["parameter_size"]),
+            "p_trace_activation_size": int(trace_args["activation_size"]),
+            "p_trace_input_shapes": json.dumps([list(shape.values())[0] for shape in trace_args["input_type_shape"]]),
+            "p_trace_output_shapes": json.dumps([list(shape.values())[0] for shape in trace_args["output_type_shape"]]),
+        }
+        for kernel_position, kernel in enumerate(kernels):
+            kernel_args = kernel["args"]
+            row = {
+                "model": model_name,
+                "node_name": node.name,
+                "op_type": node.op_type,
+                "kernel_position": kernel_position,
+                "kernel_name": kernel["name"],
+                "kernel_index": kernel["Index"],
+                "duration": kernel["dur"],
+                "stream": int(kernel_args.get("stream", -1)),
+            }
+            for key in okf.LAUNCH_DIM_KEYS:
+                row[key] = int(kernel_args[key])
+            row["grid_size"] = row["grid_x"] * row["grid_y"] * row["grid_z"]
+            row["block_size"] = row["block_x"] * row["block_y"] * row["block_z"]
+            row.update(parent_columns)
+            for key, value in (kernel.get("ncu") or {}).items():
+                if key.endswith(" Value"):
+                    row[pni.ncu_column_name(key[:-len(' Value')])] = _to_number(value)
+            kernel_rows.append(row)
+
+    for node in onnx_model.graph.node:
+        for tensor_name in node.input:
+            producer = producers.get(tensor_name)
+            if producer is not None:
+                edge_rows.append({"model": model_name, "src": producer, "dst": node.name, "tensor": tensor_name})
+
+    return pd.DataFrame(kernel_rows), pd.DataFrame(node_rows), pd.DataFrame(edge_rows)
+
+
+def write_table(df, path, file_format):
+    """
+    按格式写出表格。
+    """
+    if file_format == "parquet":
+        df.to_parquet(path, index=False)
+    elif file_format == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    elif file_format == "csv":
+        df.to_csv(path, index=False)
+    else:
+        wo.error(f"[onnx_exporter] 未知格式: {file_format}")
+
+
+def export(onnx_path, trace_path, output_dir, ncu_csv_path=None, file_format="parquet", model_name=None):
+    """
+    导出算子与 kernel 的对应关系。
+
+    Args:
+        `onnx_path` (str): 算子级 ONNX 模型路径，不加载外部数据。
+        `trace_path` (str): 跟踪文件路径。
+        `output_dir` (str): 输出目录。
+        `ncu_csv_path` (str): ncu 生成的 CSV，非空时在 kernels 表中加入 ncu 指标。
+        `file_format` (str): "parquet"、"feather" 或 "csv"。
+        `model_name` (str): 模型名称，默认取 ONNX 文件名。
+
+    Returns:
+        dict: 表名到输出路径的映射。
+    """
+    if model_name is None:
+        model_name = os.path.splitext(os.path.basename(onnx_path))[0]
+
+    onnx_model = okf.load_model(onnx_path, weights="reference")
+    node_kernel_pairs = tfp.get_pairs_from_trace_file(trace_path)
+    if ncu_csv_path is not None:
+        node_kernel_pairs = pni.fill_pairs_with_ncu(node_kernel_pairs, ncu_csv_path)
+    node_kernel_mapping = tfp.get_node_kernel_mapping(node_kernel_pairs)
+
+    kernels, nodes, edges = build_tables(onnx_model, node_kernel_mapping, model_name)
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    try:
+        for table_name, df in (("kernels", kernels), ("nodes", nodes), ("edges", edges)):
+            path = os.path.join(output_dir, f"{model_name}_{table_name}.{FILE_EXTENSIONS[file_format]}")
+            write_table(df, path, file_format)
+            paths[table_name] = path
+    except ImportError as e:
+        wo.error(f"[onnx_exporter] 写出 {file_format} 需要 pyarrow：{e}")
+
+    print(f"[onnx_exporter] 导出 {len(kernels)} 个 kernel、{len(nodes)} 个算子、{len(edges)} 条边到 {output_dir}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export operator-kernel mapping as columnar tables.')
+    parser.add_argument('onnx', type=str, help='Path to the input ONNX file')
+    parser.add_argument('trace', type=str, help='Path to the trace file')
+    parser.add_argument('--output-dir', type=str, default=None, help='Output directory, defaults to the ONNX file directory')
+    parser.add_argument('--ncu', type=str, default=None, help='Path to the ncu CSV file')
+    parser.add_argument('--format', type=str, choices=list(FILE_EXTENSIONS), default="parquet", help='Output file format')
+    parser.add_argument('--model-name', type=str, default=None, help='Model name written to the "model" column')
+    args = parser.parse_args()
+
+    output_dir = args.output_dir if args.output_dir is not None else os.path.dirname(os.path.abspath(args.onnx))
+    export(args.onnx, args.trace, output_dir, args.ncu, args.format, args.model_name)
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python3 ./onnx_kernel_exporter.py ./examples/yolov8n.onnx ./examples/yolov8n-orto0.json --output-dir ./results/kernel_tables
+        查询多个模型：
+            pd.concat(pd.read_parquet(p) for p in glob("./results/kernel_tables/*_kernels.parquet")).query("duration > 100")
+    """
+    main()
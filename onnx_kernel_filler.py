@@ -1,82 +1,191 @@
 import onnx
+from onnx import external_data_helper
 import argparse
 import os
 from utils import trace_file_parser as tfp
+from utils import pairs_ncu_integrator as pni
 from utils import warning_output as wo
 
-def set_kernel_attributes(kernel_node, kernel):
+# 直接按类型构造属性，避免 onnx.helper.make_attribute 对每个值做类型推断，结果与其一致
+def _int_attribute(name, value):
+    return onnx.AttributeProto(name=name, type=onnx.AttributeProto.INT, i=value)
+
+def _string_attribute(name, value):
+    return onnx.AttributeProto(name=name, type=onnx.AttributeProto.STRING, s=value.encode("utf-8"))
+
+def _ints_attribute(name, values):
+    return onnx.AttributeProto(name=name, type=onnx.AttributeProto.INTS, ints=values)
+
+def _float_attribute(name, value):
+    return onnx.AttributeProto(name=name, type=onnx.AttributeProto.FLOAT, f=value)
+
+LAUNCH_DIM_KEYS = ("block_x", "block_y", "block_z", "grid_x", "grid_y", "grid_z")
+
+# 作为 kernel 节点属性的 ncu 指标：吞吐、占用率与 SM 周期
+NCU_NODE_METRICS = [
+    "Compute (SM) Throughput",
+    "Memory Throughput",
+    "SM Active Cycles",
+    "Elapsed Cycles",
+    "Theoretical Occupancy",
+    "Achieved Occupancy",
+]
+
+def make_ncu_attributes(kernel):
+    """
+    构造 kernel 的 ncu 指标属性，没有 ncu 数据或指标值无法转换为数值时跳过。
+
+    Returns:
+        list: onnx.AttributeProto 列表。
+    """
+    ncu = kernel.get("ncu")
+    if not ncu:
+        return []
+    attributes = []
+    for metric_name in NCU_NODE_METRICS:
+        value = ncu.get(metric_name + " Value")
+        try:
+            value = float(str(value).replace(",", ""))
+        except ValueError:
+            continue
+        attributes.append(_float_attribute(pni.ncu_column_name(metric_name), value))
+    return attributes
+
+def compute_operator_aggregates(node_kernel_mapping):
     """
-    此函数的作用是为内核节点添加属性。
+    一次遍历映射字典，统计每个算子的 kernel 总耗时与 kernel 数。
+
+    Args:
+        node_kernel_mapping (dict): 节点名称到内核信息的映射字典。
+
+    Returns:
+        dict: 键与 `node_kernel_mapping` 相同，值为 (kernel_time, kernel_count)。
+    """
+    return {
+        search_name: (sum(kernel["dur"] for kernel in trace_pair["Kernels"]), len(trace_pair["Kernels"]))
+        for search_name, trace_pair in node_kernel_mapping.items()
+    }
+
+def make_aggregate_attributes(aggregate, prefix=""):
+    """
+    构造算子的 kernel 总耗时与 kernel 数属性。
+    """
+    kernel_time, kernel_count = aggregate
+    return [_int_attribute(f"{prefix}kernel_time", kernel_time), _int_attribute(f"{prefix}kernel_count", kernel_count)]
+
+def make_kernel_attributes(kernel):
+    """
+    构造 kernel 节点自身的属性。
 
     Args:
-        kernel_node (onnx.NodeProto): 要添加属性的 ONNX 节点。
         kernel (Json 对象): 包含内核属性的对象。
 
     Returns:
-        onnx.NodeProto: 添加属性后的内核节点。
-    """
-    dur_attr = onnx.helper.make_attribute("duration", kernel["dur"])
-    kernel_node.attribute.append(dur_attr)
-    idx_attr = onnx.helper.make_attribute("index", kernel["Index"])
-    kernel_node.attribute.append(idx_attr)
-    block_x_attr = onnx.helper.make_attribute("block_x", kernel["args"]["block_x"])
-    kernel_node.attribute.append(block_x_attr)
-    block_y_attr = onnx.helper.make_attribute("block_y", kernel["args"]["block_y"])
-    kernel_node.attribute.append(block_y_attr)
-    block_z_attr = onnx.helper.make_attribute("block_z", kernel["args"]["block_z"])
-    kernel_node.attribute.append(block_z_attr)
-    grid_x_attr = onnx.helper.make_attribute("grid_x", kernel["args"]["grid_x"])
-    kernel_node.attribute.append(grid_x_attr)
-    grid_y_attr = onnx.helper.make_attribute("grid_y", kernel["args"]["grid_y"])
-    kernel_node.attribute.append(grid_y_attr)
-    grid_z_attr = onnx.helper.make_attribute("grid_z", kernel["args"]["grid_z"])
-    kernel_node.attribute.append(grid_z_attr)
-    return kernel_node
-
-def set_kernel_parent_attribute(kernel_node, parent_node, parent_trace_node):
-    """
-    此函数的作用是为内核节点添加父节点属性。
+        list: onnx.AttributeProto 列表。
+    """
+    kernel_args = kernel["args"]
+    return [
+        _int_attribute("duration", kernel["dur"]),
+        _int_attribute("index", kernel["Index"]),
+    ] + [_string_attribute(key, kernel_args[key]) for key in LAUNCH_DIM_KEYS]
+
+
+def make_parent_attributes(parent_node, parent_trace_node):
+    """
+    构造 kernel 节点的父节点属性，同一算子的所有 kernel 共用，每个算子只构造一次。
 
     Args:
-        kernel_node (onnx.NodeProto): 要添加属性的 ONNX 节点。
-        parent_node (onnx.NodeProto): 父节点。
+        parent_node (onnx.NodeProto): 父节点，其属性以 "p_" 为前缀复制，不修改原节点。
         parent_trace_node (dict): 实测运行中包含父节点属性的对象。
 
     Returns:
-        onnx.NodeProto: 添加属性后的内核节点。
+        list: onnx.AttributeProto 列表。
     """
+    attributes = [_string_attribute("parent_name", parent_node.name)]
 
     # 从 ONNX 图中父节点获取参数
-    new_attr = onnx.helper.make_attribute("parent_name", parent_node.name)
-    kernel_node.attribute.append(new_attr)
     for attr in parent_node.attribute:
-        attr.name = f"p_{attr.name}"
-        kernel_node.attribute.append(attr)
+        new_attr = onnx.AttributeProto()
+        new_attr.CopyFrom(attr)
+        new_attr.name = f"p_{attr.name}"
+        attributes.append(new_attr)
 
     # 从实测运行中获取父节点属性
-    new_attr = onnx.helper.make_attribute("p_trace_duration", parent_trace_node["dur"])
-    kernel_node.attribute.append(new_attr)
-    new_attr = onnx.helper.make_attribute("p_trace_output_size", int(parent_trace_node["args"]["output_size"]))
-    kernel_node.attribute.append(new_attr)
-    new_attr = onnx.helper.make_attribute("p_trace_parameter_size", int(parent_trace_node["args"]["parameter_size"]))
-    kernel_node.attribute.append(new_attr)
-    new_attr = onnx.helper.make_attribute("p_trace_activation_size", int(parent_trace_node["args"]["activation_size"]))
-    kernel_node.attribute.append(new_attr)
-    for idx, input in enumerate(parent_trace_node["args"]["input_type_shape"]):
+    trace_args = parent_trace_node["args"]
+    attributes += [
+        _int_attribute("p_trace_duration", parent_trace_node["dur"]),
+        _int_attribute("p_trace_output_size", int(trace_args["output_size"])),
+        _int_attribute("p_trace_parameter_size", int(trace_args["parameter_size"])),
+        _int_attribute("p_trace_activation_size", int(trace_args["activation_size"])),
+    ]
+    for idx, input in enumerate(trace_args["input_type_shape"]):
         input_shape = list(input.values())[0]
-        if input_shape:
-            new_attr = onnx.helper.make_attribute(f"p_trace_input_shape_{idx}", input_shape)
-        else:
-            new_attr = onnx.helper.make_attribute(f"p_trace_input_shape_{idx}", [-1])
+        if not input_shape:
+            input_shape = [-1]
             wo.simple(f"[onnx_filler] {parent_node.name} 的输入 {idx}： {input}形状为空")
-        kernel_node.attribute.append(new_attr)
-    
-    return kernel_node
+        attributes.append(_ints_attribute(f"p_trace_input_shape_{idx}", input_shape))
+
+    return attributes
+
+
+def make_kernel_nodes(node, trace_pair, chain_to_node, aggregate=None):
+    """
+    为一个算子构造其 kernel 节点，kernel 之间按发射顺序首尾相连。
+
+    Args:
+        node (onnx.NodeProto): 算子节点。
+        trace_pair (dict): 该算子在跟踪文件中的 pair。
+        chain_to_node (bool): 为 True 时第一个 kernel 的输入为算子的输入、最后一个 kernel 的输出为算子的输出（替换模式）；
+                              否则 kernel 链独立，第一个 kernel 没有输入（添加模式）。
+        aggregate (tuple): 该算子的 (kernel_time, kernel_count)，非空时作为父节点属性 "p_kernel_time"、"p_kernel_count"。
+
+    Returns:
+        list: onnx.NodeProto 列表。
+    """
+    kernels = trace_pair["Kernels"]
+    parent_attributes = make_parent_attributes(node, trace_pair["Node"])
+    if aggregate is not None:
+        parent_attributes += make_aggregate_attributes(aggregate, prefix="p_")
+
+    kernel_nodes = []
+    prev_outputs = list(node.input) if chain_to_node else []
+    for idx, kernel in enumerate(kernels):
+        kernel_name = f"{node.name}/kernel_{idx}"
+
+        # 替换模式中最后一个 kernel 的输出为原节点的输出；其余为新建一个对应的输出
+        if chain_to_node and idx == len(kernels) - 1:
+            kernel_outputs = list(node.output)
+        else:
+            kernel_outputs = [f"{kernel_name}_output"]
+
+        kernel_node = onnx.helper.make_node(
+            kernel.get('name', 'Unknown'),
+            prev_outputs,
+            kernel_outputs,
+            name=kernel_name
+        )
+        kernel_node.attribute.extend(make_kernel_attributes(kernel))
+        kernel_node.attribute.extend(make_ncu_attributes(kernel))
+        kernel_node.attribute.extend(parent_attributes)
+        kernel_nodes.append(kernel_node)
+
+        prev_outputs = kernel_outputs
+
+    return kernel_nodes
+
+def _set_graph_nodes(graph, nodes):
+    """
+    一次性替换图中的全部节点。
+    """
+    graph.ClearField("node")
+    graph.node.extend(nodes)
 
 def replace_operators_with_kernels(onnx_model, node_kernel_mapping):
     """
     该函数的功能是将 ONNX 模型中的操作符替换为对应的内核节点。
     将算子级 ONNX 计算图转换为 kernel 级计算图，主要方便通过 Netron 观察与分析，无法运行。
+    单次遍历生成新的节点列表，kernel 节点位于原算子的位置，保持拓扑顺序，最后一次性写回图中。
+    kernel 节点带有父算子的 kernel 总耗时与 kernel 数（"p_kernel_time"、"p_kernel_count"），填充过 ncu 数据时还带有 ncu 指标。
 
     Args:
         onnx_model (onnx.ModelProto): 要处理的 ONNX 模型。
@@ -86,68 +195,38 @@ def replace_operators_with_kernels(onnx_model, node_kernel_mapping):
         onnx.ModelProto: 替换操作符后的 ONNX 模型。
     """
     graph = onnx_model.graph
-    nodes_to_remove = []
     new_nodes = []
+    aggregates = compute_operator_aggregates(node_kernel_mapping)
 
     for node in graph.node:
         # 遍历所有 ONNX 图中节点
         search_name = f"{node.name}_kernel_time"
-        if search_name in node_kernel_mapping:
-            # 有执行记录的节点（算子）
-            trace_pair = node_kernel_mapping[search_name]
-            kernels = trace_pair["Kernels"]
-            trace_node = trace_pair["Node"]
-            if kernels:
-                # 存在对应的 kernel 序列
-                print(f"[onnx_filler] 找到算子 {node.name} 对应的 kernel 序列，算子编号 {trace_node["args"]["node_index"]}。")
-
-                prev_outputs = None
-                for idx, kernel in enumerate(kernels):
-                    kernel_name = f"{node.name}/kernel_{idx}"
-
-                    # 对于第一个 kernel，输入为原节点的输入；其余为前继 kernel 的输出
-                    if idx == 0:
-                        kernel_inputs = node.input
-                    else:
-                        kernel_inputs = prev_outputs
-
-                    # 对于最后一个 kernel，输出为原节点的输出；其余为新建一个对应的输出
-                    if idx == len(kernels) - 1:
-                        kernel_outputs = node.output
-                    else:
-                        kernel_outputs = [f"{kernel_name}_output"]
-
-                    kernel_node = onnx.helper.make_node(
-                        kernel.get('name', 'Unknown'),
-                        kernel_inputs,
-                        kernel_outputs,
-                        name=kernel_name
-                    )
-                    
-                    kernel_node = set_kernel_attributes(kernel_node, kernel)
-                    kernel_node = set_kernel_parent_attribute(kernel_node, node, trace_node)
-                    new_nodes.append(kernel_node)
-
-                    prev_outputs = kernel_outputs
-                nodes_to_remove.append(node)
-            else:
-                wo.simple(f"[onnx_filler] {node.name} 捕获到算子被执行但无对应 kernel，算子编号 {trace_node["args"]["node_index"]}")
-        else:
+        trace_pair = node_kernel_mapping.get(search_name)
+        if trace_pair is None:
             wo.simple(f"[onnx_filler] {node.name} 未找到对应 _kernel_time")
+            new_nodes.append(node)
+            continue
+
+        # 有执行记录的节点（算子）
+        node_index = trace_pair["Node"]["args"]["node_index"]
+        if trace_pair["Kernels"]:
+            # 存在对应的 kernel 序列
+            print(f"[onnx_filler] 找到算子 {node.name} 对应的 kernel 序列，算子编号 {node_index}。")
+            new_nodes.extend(make_kernel_nodes(node, trace_pair, chain_to_node=True, aggregate=aggregates[search_name]))
+        else:
+            wo.simple(f"[onnx_filler] {node.name} 捕获到算子被执行但无对应 kernel，算子编号 {node_index}")
+            node.attribute.extend(make_aggregate_attributes(aggregates[search_name]))
+            new_nodes.append(node)
 
-    # 移除需要替换的节点
-    for node in nodes_to_remove:
-        graph.node.remove(node)
-
-    # 添加新生成的节点
-    graph.node.extend(new_nodes)
+    _set_graph_nodes(graph, new_nodes)
 
     return onnx_model
 
 def add_kernels_for_operators(onnx_model, node_kernel_mapping):
     """
-    此函数的作用是为 ONNX 模型中的操作符添加对应的内核节点，并为操作符节点添加索引和持续时间属性。
-    但是使用 Netron 观察效果不好。
+    此函数的作用是为 ONNX 模型中的操作符添加对应的内核节点，并为有执行记录的操作符节点添加索引、持续时间、
+    kernel 总耗时与 kernel 数属性。但是使用 Netron 观察效果不好。
+    kernel 节点插入在对应算子之前，其最后的输出作为算子的额外输入，保持拓扑顺序。
 
     Args:
         onnx_model (onnx.ModelProto): 待处理的 ONNX 模型。
@@ -157,55 +236,143 @@ def add_kernels_for_operators(onnx_model, node_kernel_mapping):
         onnx.ModelProto: 处理后的 ONNX 模型，其中添加了内核节点，并为操作符节点添加了属性。
     """
     graph = onnx_model.graph
+    new_nodes = []
+    aggregates = compute_operator_aggregates(node_kernel_mapping)
 
     for node in graph.node:
         # 遍历图中所有算子
         search_name = f"{node.name}_kernel_time"
-        if search_name in node_kernel_mapping:
-            # 存在执行记录的节点（算子）
-            trace_pair = node_kernel_mapping[search_name]
-            kernels = trace_pair["Kernels"]
-            trace_node = trace_pair["Node"]
-            if kernels:
-                # 由 CUDA EP 执行并且实际发射了 kernel
-                print(f"[onnx_filler] 找到算子 {node.name} 对应的 kernel 序列，算子编号 {trace_node["args"]["node_index"]}。")
-
-                kernel_inputs = []
-                for idx, kernel in enumerate(kernels):
-                    kernel_name = f"{node.name}/kernel_{idx}"
-                    kernel_outputs = [f"{kernel_name}_output"]
-
-                    kernel_node = onnx.helper.make_node(
-                        kernel.get('name', 'Unknown'),
-                        kernel_inputs,
-                        kernel_outputs,
-                        name=kernel_name
-                    )
-
-                    kernel_node = set_kernel_attributes(kernel_node, kernel)
-                    kernel_node = set_kernel_parent_attribute(kernel_node, node, trace_node)
-                    graph.node.append(kernel_node)
-
-                    kernel_inputs = kernel_outputs
-                
-                node.input.append(kernel_outputs[0])
-            else:
-                wo.simple(f"[onnx_filler] {node.name} 捕获到算子被执行但无对应 kernel，算子编号 {trace_node["args"]["node_index"]}")
-        else:
+        trace_pair = node_kernel_mapping.get(search_name)
+        if trace_pair is None:
+            # 没有执行记录的节点保持不变
             wo.simple(f"[onnx_filler] {node.name} 未找到对应 _kernel_time")
+            new_nodes.append(node)
+            continue
+
+        # 存在执行记录的节点（算子）
+        node_index = trace_pair["Node"]["args"]["node_index"]
+        if trace_pair["Kernels"]:
+            # 由 CUDA EP 执行并且实际发射了 kernel
+            print(f"[onnx_filler] 找到算子 {node.name} 对应的 kernel 序列，算子编号 {node_index}。")
+            kernel_nodes = make_kernel_nodes(node, trace_pair, chain_to_node=False)
+            new_nodes.extend(kernel_nodes)
+            node.input.append(kernel_nodes[-1].output[0])
+        else:
+            wo.simple(f"[onnx_filler] {node.name} 捕获到算子被执行但无对应 kernel，算子编号 {node_index}")
+
+        node.attribute.extend([
+            _int_attribute("index", trace_pair["Node"]["Index"]),
+            _int_attribute("duration", trace_pair["Node"]["dur"]),
+        ] + make_aggregate_attributes(aggregates[search_name]))
+        new_nodes.append(node)
+
+    _set_graph_nodes(graph, new_nodes)
 
-        node.attribute.append(onnx.helper.make_attribute("index", trace_pair["Node"]["Index"]))
-        node.attribute.append(onnx.helper.make_attribute("duration", trace_pair["Node"]["dur"]))
-    
     return onnx_model
 
 
+# 张量中保存数据的字段
+TENSOR_DATA_FIELDS = (
+    "raw_data", "float_data", "int32_data", "string_data", "int64_data", "double_data", "uint64_data",
+)
+
+def load_model(model_path, weights="keep"):
+    """
+    加载 ONNX 模型。
+
+    Args:
+        model_path (str): 模型路径。
+        weights (str): 权重的处理方式：
+            - "keep": 加载全部权重并随模型保存；
+            - "reference": 不加载外部数据，输出模型沿用原模型的外部数据引用，不复制权重；
+            - "strip": 不加载外部数据，并去除所有初始化器与张量属性中的数据，只保留名称、类型与形状，输出只含计算图。
+            后两种方式下内存占用与输出大小只与节点数有关，但权重内嵌在模型文件中时仍需读取整个文件。
+
+    Returns:
+        onnx.ModelProto: 加载的模型。
+    """
+    if weights == "keep":
+        return onnx.load(model_path)
+    if weights not in ("reference", "strip"):
+        wo.error(f"[onnx_filler] 未知的权重处理方式: {weights}")
+
+    onnx_model = onnx.load(model_path, load_external_data=False)
+    if weights == "strip":
+        stripped = strip_tensor_data(onnx_model)
+        print(f"[onnx_filler] 去除了 {stripped} 个张量的数据")
+    return onnx_model
+
+def _strip_tensor(tensor):
+    for field in TENSOR_DATA_FIELDS:
+        tensor.ClearField(field)
+    tensor.ClearField("external_data")
+    tensor.data_location = onnx.TensorProto.DEFAULT
+
+def iter_graph_tensors(onnx_model):
+    """
+    遍历主图中的初始化器与节点张量属性（如 Constant 的 value）。
+    """
+    graph = onnx_model.graph
+    yield from graph.initializer
+    for sparse_tensor in graph.sparse_initializer:
+        yield sparse_tensor.values
+        yield sparse_tensor.indices
+    for node in graph.node:
+        for attr in node.attribute:
+            if attr.type == onnx.AttributeProto.TENSOR:
+                yield attr.t
+            elif attr.type == onnx.AttributeProto.TENSORS:
+                yield from attr.tensors
+
+def strip_tensor_data(onnx_model):
+    """
+    去除主图中所有张量的数据，保留名称、类型与形状。
+
+    Returns:
+        int: 被处理的张量数。
+    """
+    count = 0
+    for tensor in iter_graph_tensors(onnx_model):
+        _strip_tensor(tensor)
+        count += 1
+    return count
+
+def check_external_data_location(onnx_model, model_path, output_path):
+    """
+    检查输出模型能否引用原模型的外部数据文件。ONNX 要求外部数据位于模型所在目录内，
+    因此输出模型需与原模型位于同一目录（默认的输出路径即如此），否则需要将数据文件复制或链接到输出目录。
+
+    Returns:
+        int: 使用外部数据的张量数。
+    """
+    count = sum(1 for tensor in iter_graph_tensors(onnx_model) if external_data_helper.uses_external_data(tensor))
+    model_dir = os.path.dirname(os.path.abspath(model_path))
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    if count and model_dir != output_dir:
+        wo.simple(f"[onnx_filler] 输出目录 {output_dir} 与原模型目录 {model_dir} 不同，需将外部数据文件复制或链接到输出目录")
+    return count
+
+def save_model(onnx_model, output_path, model_path, weights="keep"):
+    """
+    保存填充后的模型，`weights` 与 `load_model` 一致。
+    """
+    if weights == "reference":
+        count = check_external_data_location(onnx_model, model_path, output_path)
+        print(f"[onnx_filler] {count} 个张量引用原模型的外部数据")
+    onnx.save(onnx_model, output_path)
+
+
 def main():
     parser = argparse.ArgumentParser(description='Fill ONNX model with kernel information.')
     parser.add_argument('onnx', type=str, help='Path to the input ONNX file')
     parser.add_argument('trace', type=str, help='Path to the trace file')
     parser.add_argument('--output', type=str, help='Path to the output ONNX file')
     parser.add_argument('--mode', type=str, help='Mode of filling, either "replace" or "add"', default="replace")
+    parser.add_argument('--weights', type=str, choices=["keep", "reference", "strip"], default="keep",
+                        help='keep: save all weights; reference: keep external data references without loading them; '
+                             'strip: drop all tensor data and save the annotated graph only')
+    parser.add_argument('--ncu', type=str, default=None,
+                        help='Path to the ncu CSV file, attach throughput, occupancy and SM cycle metrics to kernel nodes')
 
     args = parser.parse_args()
 
@@ -213,8 +380,10 @@ def main():
         base_name, ext = os.path.splitext(args.onnx)
         args.output = f"{base_name}_kernel{ext}"
 
-    onnx_model = onnx.load(args.onnx)
+    onnx_model = load_model(args.onnx, args.weights)
     node_kernel_pairs = tfp.get_pairs_from_trace_file(args.trace)
+    if args.ncu is not None:
+        node_kernel_pairs = pni.fill_pairs_with_ncu(node_kernel_pairs, args.ncu)
     node_kernel_mapping = tfp.get_node_kernel_mapping(node_kernel_pairs)
 
     if args.mode == "replace":
@@ -224,7 +393,7 @@ def main():
     else:
         wo.error(f"[onnx_filler] 未知模式: {args.mode}")
 
-    onnx.save(filled_model, args.output)
+    save_model(filled_model, args.output, args.onnx, args.weights)
     print(f"[onnx_filler] 成功将填充后的模型保存到 {args.output}")
 
 
@@ -233,5 +402,9 @@ if __name__ == "__main__":
     Usage:
         简单的运行：
             python3 ./onnx_kernel_filler.py ./examples/yolov8n.onnx ./examples/yolov8n-orto0.json
+        附加 ncu 指标：
+            python3 ./onnx_kernel_filler.py ./examples/yolov8n.onnx ./examples/yolov8n-orto0.json --ncu ./examples/ncu/yolov8n-orto0-ncu-basic.csv
+        大模型只输出计算图：
+            python3 ./onnx_kernel_filler.py ./models/large.onnx ./results/trace/large.json --weights strip
     """
     main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+import argparse
+import hashlib
+import os
+import sys
+
+"""
+ncu 的替身，不需要 GPU，用于测试 ncu_job_scheduler 等批量分析脚本。
+不会运行被分析的程序，只模拟 `ncu --csv` 的标准输出：若干行程序输出与 ==PROF== 信息，随后是 CSV 表头与各 kernel 的指标行。
+指标值由模型路径与 kernel 的实际序号决定，同一输入多次运行结果一致。
+支持 `--launch-skip`、`--launch-count`、`--section` 与 `--log-file`，输出的 ID 与真实 ncu 一样从 0 开始。
+指定 `--log-file` 时与真实 ncu 一样，==PROF== 信息与 CSV 写入该文件，程序输出仍在标准输出中。
+
+环境变量：
+    FAKE_NCU_KERNELS: 模拟的 kernel 数量，默认 8。
+    FAKE_NCU_FAIL: 非空时以返回码 1 退出，模拟 ncu 崩溃。
+    FAKE_NCU_NO_CSV: 非空时只输出前导内容，模拟输出被截断。
+
+Usage:
+    python3 ./profile/yolo_ncu_repeat.py  # 将其中的 ncu_command 设置为 "python3 ./profile/fake_ncu.py"
+"""
+
+HEADER = ["ID", "Process ID", "Process Name", "Host Name", "Kernel Name", "Context", "Stream", "Block Size",
+          "Grid Size", "Device", "CC", "Section Name", "Metric Name", "Metric Unit", "Metric Value"]
+
+# (Section Name, Metric Name, Metric Unit)
+METRICS = [
+    ("GPU Speed Of Light Throughput", "DRAM Frequency", "cycle/nsecond"),
+    ("GPU Speed Of Light Throughput", "SM Frequency", "cycle/nsecond"),
+    ("GPU Speed Of Light Throughput", "Elapsed Cycles", "cycle"),
+    ("GPU Speed Of Light Throughput", "Memory Throughput", "%"),
+    ("GPU Speed Of Light Throughput", "Duration", "usecond"),
+    ("GPU Speed Of Light Throughput", "SM Active Cycles", "cycle"),
+    ("GPU Speed Of Light Throughput", "Compute (SM) Throughput", "%"),
+    ("Launch Statistics", "Block Size", ""),
+    ("Launch Statistics", "Grid Size", ""),
+    ("Launch Statistics", "Registers Per Thread", "register/thread"),
+    ("Launch Statistics", "Shared Memory Configuration Size", "Kbyte"),
+    ("Launch Statistics", "Driver Shared Memory Per Block", "Kbyte/block"),
+    ("Launch Statistics", "Dynamic Shared Memory Per Block", "byte/block"),
+    ("Launch Statistics", "Static Shared Memory Per Block", "byte/block"),
+    ("Launch Statistics", "# SMs", "SM"),
+    ("Occupancy", "Block Limit SM", "block"),
+    ("Occupancy", "Block Limit Registers", "block"),
+    ("Occupancy", "Block Limit Shared Mem", "block"),
+    ("Occupancy", "Block Limit Warps", "block"),
+    ("Occupancy", "Theoretical Active Warps per SM", "warp"),
+    ("Occupancy", "Theoretical Occupancy", "%"),
+    ("Occupancy", "Achieved Occupancy", "%"),
+    ("Occupancy", "Achieved Active Warps Per SM", "warp"),
+]
+
+# section 标识到 CSV 中 "Section Name" 的映射
+SECTION_NAMES = {
+    "SpeedOfLight": "GPU Speed Of Light Throughput",
+    "LaunchStats": "Launch Statistics",
+    "Occupancy": "Occupancy",
+}
+
+
+def _value(model_path, kernel_id, metric_name):
+    digest = hashlib.md5(f"{model_path}:{kernel_id}:{metric_name}".encode()).digest()
+    return int.from_bytes(digest[:4], 'little') % 10000 / 100
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Fake Nsight Compute command line for GPU-less testing.')
+    parser.add_argument('--csv', action='store_true')
+    parser.add_argument('--launch-skip', type=int, default=0)
+    parser.add_argument('--launch-count', type=int, default=None)
+    parser.add_argument('--section', action='append', default=None)
+    parser.add_argument('--log-file', type=str, default=None)
+    parser.add_argument('program', nargs=argparse.REMAINDER)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if os.environ.get("FAKE_NCU_FAIL"):
+        print("==ERROR== fake ncu failure", file=sys.stderr)
+        return 1
+
+    model_path = args.program[args.program.index("--model") + 1] if "--model" in args.program else ""
+    kernel_count = int(os.environ.get("FAKE_NCU_KERNELS", "8"))
+
+    log = open(args.log_file, 'w') if args.log_file is not None else sys.stdout
+    try:
+        print("==PROF== Connected to process 1234 (/usr/bin/python3)", file=log)
+        print("Output image saved to output_image.jpg")
+        print("==PROF== Disconnected from process 1234", file=log)
+        if os.environ.get("FAKE_NCU_NO_CSV"):
+            return 0
+
+        sections = {SECTION_NAMES[section] for section in args.section} if args.section else None
+        last_kernel = kernel_count if args.launch_count is None else min(kernel_count, args.launch_skip + args.launch_count)
+
+        print(",".join(f'"{column}"' for column in HEADER), file=log)
+        for output_id, kernel_id in enumerate(range(args.launch_skip, last_kernel)):
+            for section_name, metric_name, metric_unit in METRICS:
+                if sections is not None and section_name not in sections:
+                    continue
+                row = [str(output_id), "1234", "python3", "127.0.0.1", f"fake_kernel_{kernel_id % 3}", "1", "7",
+                       "(128, 1, 1)", "(64, 1, 1)", "0", "7.0", section_name, metric_name, metric_unit,
+                       f"{_value(model_path, kernel_id, metric_name):.2f}"]
+                print(",".join(f'"{field}"' for field in row), file=log)
+    finally:
+        if log is not sys.stdout:
+            log.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+import numpy as np
+import onnxruntime as ort
+from utils.trace_index import TraceIndex
+from utils import warning_output as wout
+from experiments import trace_kernel_reporter as tkr
+
+"""
+在不同图优化等级（disable / basic / extended / all）下对同一模型进行 ONNX Runtime Profiling，
+保存每个等级优化后的模型与跟踪文件，并对比各算子类型的节点数、kernel 数与 kernel 总耗时，量化算子融合的收益。
+
+Usage:
+    python3 ./profile/ort_opt_level_sweep.py --model ./models/detection/ultralytics-yolov8/yolov8n.onnx --output ./results/opt-level/yolov8n
+    python3 ./profile/ort_opt_level_sweep.py --model ./models/detection/ultralytics-yolov8/yolov8n.onnx --output ./results/opt-level/yolov8n --report-only
+"""
+
+OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+# ORT 输入类型到 numpy 类型的映射
+_ORT_TYPE_2_NUMPY = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(uint8)": np.uint8,
+    "tensor(bool)": np.bool_,
+}
+
+
+def _make_dummy_inputs(session, batch_size):
+    """
+    根据会话的输入信息生成随机输入，动态维度的第 0 维取 batch_size，其余取 1。
+    """
+    inputs = {}
+    for model_input in session.get_inputs():
+        shape = [
+            dim if isinstance(dim, int) and dim > 0 else (batch_size if idx == 0 else 1)
+            for idx, dim in enumerate(model_input.shape)
+        ]
+        dtype = _ORT_TYPE_2_NUMPY.get(model_input.type, np.float32)
+        inputs[model_input.name] = np.random.rand(*shape).astype(dtype)
+    return inputs
+
+
+def _get_level_paths(model_path, output_dir, level):
+    model_name = os.path.splitext(os.path.basename(model_path))[0]
+    optimized_model_path = os.path.join(output_dir, f"{model_name}-opt-{level}.onnx")
+    trace_path = os.path.join(output_dir, f"{model_name}-opt-{level}.json")
+    return optimized_model_path, trace_path
+
+
+def profile_level(model_path, output_dir, level, providers=("CUDAExecutionProvider",), batch_size=1):
+    """
+    在指定的图优化等级下运行一次模型，保存优化后的模型与跟踪文件。
+
+    Args:
+        `model_path` (str): ONNX 模型路径。
+        `output_dir` (str): 输出目录。
+        `level` (str): 图优化等级，`OPTIMIZATION_LEVELS` 的键。
+        `providers` (tuple): 执行提供者。
+        `batch_size` (int): 动态 batch 维度使用的大小。
+
+    Returns:
+        str: 跟踪文件路径。
+    """
+    optimized_model_path, trace_path = _get_level_paths(model_path, output_dir, level)
+
+    so = ort.SessionOptions()
+    so.enable_profiling = True
+    so.log_severity_level = 0
+    so.graph_optimization_level = OPTIMIZATION_LEVELS[level]
+    so.optimized_model_filepath = optimized_model_path
+    so.profile_file_prefix = os.path.splitext(trace_path)[0]
+
+    start_time = time.time()
+    session = ort.InferenceSession(model_path, providers=list(providers), sess_options=so)
+    session.run(None, _make_dummy_inputs(session, batch_size))
+    profile_file = session.end_profiling()
+
+    # ORT 会在前缀后追加时间戳，统一重命名，方便后续按等级查找
+    os.replace(profile_file, trace_path)
+    print(f"[ort_opt_level_sweep] {level}: 优化模型保存到 {optimized_model_path}，跟踪文件保存到 {trace_path}，耗时 {time.time() - start_time:.2f} 秒")
+    return trace_path
+
+
+def summarize_trace(trace_path):
+    """
+    统计跟踪文件中各算子类型的节点数、kernel 数、kernel 总耗时以及 kernel 序列种类数。
+
+    Args:
+        `trace_path` (str): 跟踪文件路径。
+
+    Returns:
+        dict: 键为算子类型，值为包含 "nodes"、"kernels"、"kernel_time"、"sequences" 的字典；
+              另有键 "__total__" 汇总整个模型。
+    """
+    trace_index = TraceIndex.from_trace_file(trace_path)
+    result, op_provider_count, _ = tkr.collect_relations(trace_index, ignore_memcpy=True)
+
+    summary = defaultdict(lambda: {"nodes": 0, "kernels": 0, "kernel_time": 0, "sequences": 0})
+    for (op_name, _), count in op_provider_count.items():
+        summary[op_name]["nodes"] += count
+    for (op_name, _, kernel_sequence) in result:
+        summary[op_name]["sequences"] += 1
+    for op_name, pairs in trace_index.by_op_name.items():
+        for pair in pairs:
+            for kernel in pair.kernels:
+                if kernel.index < 0:
+                    continue
+                summary[op_name]["kernels"] += 1
+                summary[op_name]["kernel_time"] += kernel.dur
+
+    total = {"nodes": 0, "kernels": 0, "kernel_time": 0, "sequences": 0}
+    for op_summary in summary.values():
+        for key in total:
+            total[key] += op_summary[key]
+    summary = dict(summary)
+    summary["__total__"] = total
+    return summary
+
+
+def diff_levels(level_summaries):
+    """
+    将各等级的统计合并为以算子类型为行、等级为列的对比表。
+
+    Args:
+        `level_summaries` (dict): 键为等级，值为 `summarize_trace` 的返回值。
+
+    Returns:
+        dict: 键为算子类型，值为 {等级: 统计字典}，某等级中不存在的算子类型（被融合或新生成）统计为 0。
+    """
+    empty = {"nodes": 0, "kernels": 0, "kernel_time": 0, "sequences": 0}
+    op_names = sorted({op_name for summary in level_summaries.values() for op_name in summary if op_name != "__total__"})
+    op_names.append("__total__")
+    return {
+        op_name: {level: summary.get(op_name, empty) for level, summary in level_summaries.items()}
+        for op_name in op_names
+    }
+
+
+def print_markdown(diff_table, levels):
+    print("## 各图优化等级对比（节点数 / kernel 数 / kernel 总耗时 us）")
+    print("| 算子 | " + " | ".join(levels) + " |")
+    print("| ---- |" + " ---- |" * len(levels))
+    for op_name, level_stats in diff_table.items():
+        cells = [
+            f"{level_stats[level]['nodes']} / {level_stats[level]['kernels']} / {level_stats[level]['kernel_time']}"
+            for level in levels
+        ]
+        name = "**Total**" if op_name == "__total__" else op_name
+        print(f"| {name} | " + " | ".join(cells) + " |")
+    print()
+
+    base = diff_table["__total__"][levels[0]]
+    print(f"## 相对 {levels[0]} 的变化")
+    print("| 等级 | 节点数 | kernel 数 | kernel 总耗时 |")
+    print("| ---- | ---- | ---- | ---- |")
+    for level in levels:
+        stats = diff_table["__total__"][level]
+        time_ratio = stats["kernel_time"] / base["kernel_time"] if base["kernel_time"] else 0
+        print(f"| {level} | {stats['nodes'] - base['nodes']:+d} | {stats['kernels'] - base['kernels']:+d} | {time_ratio:.2%} |")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile a model under each ORT graph optimization level and diff the traces.')
+    parser.add_argument('--model', required=True, help='Path to the ONNX model')
+    parser.add_argument('--output', required=True, help='Directory for optimized models, traces and the summary')
+    parser.add_argument('--levels', nargs='+', choices=list(OPTIMIZATION_LEVELS), default=list(OPTIMIZATION_LEVELS),
+                        help='Optimization levels to profile')
+    parser.add_argument('--batch-size', type=int, default=1, help='Batch size used for dynamic batch dimension')
+    parser.add_argument('--report-only', action='store_true', help='Reuse existing traces in the output directory')
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+
+    level_summaries = {}
+    for level in args.levels:
+        _, trace_path = _get_level_paths(args.model, args.output, level)
+        if args.report_only:
+            if not os.path.exists(trace_path):
+                wout.error(f"[ort_opt_level_sweep] 未找到 {level} 等级的跟踪文件 {trace_path}")
+        else:
+            trace_path = profile_level(args.model, args.output, level, batch_size=args.batch_size)
+        level_summaries[level] = summarize_trace(trace_path)
+
+    diff_table = diff_levels(level_summaries)
+    print_markdown(diff_table, args.levels)
+
+    model_name = os.path.splitext(os.path.basename(args.model))[0]
+    summary_path = os.path.join(args.output, f"{model_name}-opt-levels.json")
+    with open(summary_path, 'w') as f:
+        json.dump(diff_table, f, indent=4)
+    print(f"[ort_opt_level_sweep] 对比结果保存到 {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 import os
-import subprocess
-import time
+from utils import ncu_job_scheduler as njs
 
 """
 对 Yolo 模型进行批量 Nsight Compute 分析，获取 csv 文件。
+任务由 ncu_job_scheduler 调度，中断后重新运行会跳过已完成的模型，输出的 csv 已去除前导内容，无需再用 csv_processor 处理。
 
 Usage:
     python3 ./profile/yolo_ncu_csv.py
@@ -34,9 +34,15 @@ Usage:
 model_dir = './models/detection/ultralytics-yolo12'
 result_dir = './results/ncu/retest-yolo12'
 
+# 同时运行的任务数，同一块 GPU 上保持为 1
+concurrency = 1
+# ncu 命令，无 GPU 测试时可替换为 "python3 ./profile/fake_ncu.py"
+ncu_command = 'ncu'
+
 os.makedirs(result_dir, exist_ok=True)
 
-for filename in os.listdir(model_dir):
+jobs = []
+for filename in sorted(os.listdir(model_dir)):
     if filename.endswith('.onnx'):
         model_name = os.path.splitext(filename)[0]
         result_file = os.path.join(result_dir, f'{model_name}-orto0-ncu-basic.csv')
@@ -45,27 +51,7 @@ for filename in os.listdir(model_dir):
         print(f"发现 ONNX 模型文件: {filename}")
         print(f"模型路径: {model_path}")
         print(f"CSV 保存路径: {result_file}")
-        print("开始进行性能分析...")
-
-        start_time = time.time()  # 记录开始时间
-        start_formatted_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
-        print(f"开始时间: {start_formatted_time}")
-
-        command = f'ncu --csv >{result_file} python3 ./inference/detection/yolo_ort_nopf.py --model {model_path}'
+        jobs.append(njs.make_job(model_path, result_file))
 
-        try:
-            subprocess.run(command, shell=True, check=True)
-            end_time = time.time()  # 记录结束时间
-            end_formatted_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
-            elapsed_time = end_time - start_time  # 计算耗时
-            print(f'已完成对 {model_name} 的性能分析，结果保存到 {result_file}')
-            print(f"结束时间: {end_formatted_time}")
-            print(f"耗时: {elapsed_time:.2f} 秒")
-        except subprocess.CalledProcessError as e:
-            end_time = time.time()  # 记录出错时的结束时间
-            end_formatted_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
-            elapsed_time = end_time - start_time  # 计算耗时
-            print(f'对 {model_name} 进行性能分析时出错: {e}')
-            print(f"结束时间: {end_formatted_time}")
-            print(f"耗时: {elapsed_time:.2f} 秒")
-    
\ No newline at end of file
+scheduler = njs.NcuJobScheduler(os.path.join(result_dir, 'ncu_manifest.json'), concurrency=concurrency, ncu=ncu_command)
+scheduler.run(jobs)
@@ -1,9 +1,9 @@
 import os
-import subprocess
-import time
+from utils import ncu_job_scheduler as njs
 
 """
 对指定的 Yolo 模型进行多次 Nsight Compute 分析，获取编号后的 csv 文件。
+任务由 ncu_job_scheduler 调度，中断后重新运行会跳过已完成的编号，输出的 csv 已去除前导内容，无需再用 csv_processor 处理。
 
 Usage:
     python3 ./profile/yolo_ncu_repeat.py
@@ -26,36 +26,32 @@ result_dir = './results/ncu/yolov8n-multi-runs'
 run_start = 31
 num_runs = 20
 
+# 只分析波动分析需要的 kernel 与指标（与 experiments/kernel_execute_metric_fluctuate_analysis.py 一致），均设为 None 则分析全部
+kernel_id_list = [0, 3, 303, 326]
+metric_list = ["Compute (SM) Throughput", "Memory Throughput", "SM Active Cycles", "SM Frequency", "Duration", "Achieved Occupancy"]
+# 间隔不超过该值的 kernel ID 合并到同一次 ncu 调用
+max_gap = 8
+
+# 同时运行的任务数，同一块 GPU 上保持为 1
+concurrency = 1
+# ncu 命令，无 GPU 测试时可替换为 "python3 ./profile/fake_ncu.py"
+ncu_command = 'ncu'
+
 os.makedirs(result_dir, exist_ok=True)
 
 model_name = os.path.splitext(os.path.basename(model_path))[0]
 
-for run_num in range(run_start, num_runs + run_start):
-    result_file = os.path.join(result_dir, f'{model_name}-orto0-ncu-basic-run{run_num}.csv')
-
-    print(f"发现 ONNX 模型文件: {os.path.basename(model_path)}")
-    print(f"模型路径: {model_path}")
-    print(f"CSV 保存路径: {result_file}")
-    print("开始进行性能分析...")
-
-    start_time = time.time()  # 记录开始时间
-    start_formatted_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
-    print(f"开始时间: {start_formatted_time}")
-
-    command = f'ncu --csv >{result_file} python3 ./inference/detection/yolo_ort_nopf.py --model {model_path}'
-
-    try:
-        subprocess.run(command, shell=True, check=True)
-        end_time = time.time()  # 记录结束时间
-        end_formatted_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
-        elapsed_time = end_time - start_time  # 计算耗时
-        print(f'已完成对 {model_name} 的第 {run_num} 次性能分析，结果保存到 {result_file}')
-        print(f"结束时间: {end_formatted_time}")
-        print(f"耗时: {elapsed_time:.2f} 秒")
-    except subprocess.CalledProcessError as e:
-        end_time = time.time()  # 记录出错时的结束时间
-        end_formatted_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
-        elapsed_time = end_time - start_time  # 计算耗时
-        print(f'对 {model_name} 进行第 {run_num} 次性能分析时出错: {e}')
-        print(f"结束时间: {end_formatted_time}")
-        print(f"耗时: {elapsed_time:.2f} 秒")
\ No newline at end of file
+print(f"ONNX 模型文件: {os.path.basename(model_path)}")
+print(f"模型路径: {model_path}")
+print(f"CSV 保存目录: {result_dir}")
+
+jobs = [
+    njs.make_job(
+        model_path, os.path.join(result_dir, f'{model_name}-orto0-ncu-basic-run{run_num}.csv'), run=run_num,
+        kernel_ids=kernel_id_list, metrics=metric_list,
+    )
+    for run_num in range(run_start, num_runs + run_start)
+]
+
+scheduler = njs.NcuJobScheduler(os.path.join(result_dir, 'ncu_manifest.json'), concurrency=concurrency, ncu=ncu_command, max_gap=max_gap)
+scheduler.run(jobs)
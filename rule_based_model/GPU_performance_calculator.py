@@ -1,5 +1,103 @@
+import csv
+import re
+import numpy as np
 from utils import warning_output as wout
 
+# 各计算能力的 SM 资源，来自 CUDA Programming Guide 与 CUDA Occupancy Calculator，共享内存单位为字节
+SM_RESOURCES = {
+    (6, 0): {"max_warps_per_sm": 64, "max_blocks_per_sm": 32, "registers_per_sm": 65536, "max_registers_per_block": 65536,
+             "register_allocation_unit": 256, "sub_partitions": 2, "shared_mem_per_sm": 65536, "max_shared_mem_per_block": 49152,
+             "shared_mem_allocation_unit": 256, "reserved_shared_mem_per_block": 0},
+    (7, 0): {"max_warps_per_sm": 64, "max_blocks_per_sm": 32, "registers_per_sm": 65536, "max_registers_per_block": 65536,
+             "register_allocation_unit": 256, "sub_partitions": 4, "shared_mem_per_sm": 98304, "max_shared_mem_per_block": 98304,
+             "shared_mem_allocation_unit": 256, "reserved_shared_mem_per_block": 0},
+    (7, 5): {"max_warps_per_sm": 32, "max_blocks_per_sm": 16, "registers_per_sm": 65536, "max_registers_per_block": 65536,
+             "register_allocation_unit": 256, "sub_partitions": 4, "shared_mem_per_sm": 65536, "max_shared_mem_per_block": 65536,
+             "shared_mem_allocation_unit": 256, "reserved_shared_mem_per_block": 0},
+    (8, 0): {"max_warps_per_sm": 64, "max_blocks_per_sm": 32, "registers_per_sm": 65536, "max_registers_per_block": 65536,
+             "register_allocation_unit": 256, "sub_partitions": 4, "shared_mem_per_sm": 167936, "max_shared_mem_per_block": 166912,
+             "shared_mem_allocation_unit": 128, "reserved_shared_mem_per_block": 1024},
+    (8, 6): {"max_warps_per_sm": 48, "max_blocks_per_sm": 16, "registers_per_sm": 65536, "max_registers_per_block": 65536,
+             "register_allocation_unit": 256, "sub_partitions": 4, "shared_mem_per_sm": 102400, "max_shared_mem_per_block": 101376,
+             "shared_mem_allocation_unit": 128, "reserved_shared_mem_per_block": 1024},
+    (8, 9): {"max_warps_per_sm": 48, "max_blocks_per_sm": 24, "registers_per_sm": 65536, "max_registers_per_block": 65536,
+             "register_allocation_unit": 256, "sub_partitions": 4, "shared_mem_per_sm": 102400, "max_shared_mem_per_block": 101376,
+             "shared_mem_allocation_unit": 128, "reserved_shared_mem_per_block": 1024},
+    (9, 0): {"max_warps_per_sm": 64, "max_blocks_per_sm": 32, "registers_per_sm": 65536, "max_registers_per_block": 65536,
+             "register_allocation_unit": 256, "sub_partitions": 4, "shared_mem_per_sm": 233472, "max_shared_mem_per_block": 232448,
+             "shared_mem_allocation_unit": 128, "reserved_shared_mem_per_block": 1024},
+}
+
+WARP_SIZE = 32
+
+# GPU 规格表，键为 GPU 型号的简称，匹配时在完整名称（如 "Tesla V100-SXM2-32GB"）中查找
+# 时钟为 boost 频率（MHz），峰值为 FP32（TFLOP/s），带宽为 DRAM（GB/s），同一型号的不同版本（PCIe / SXM）取常见的一种
+GPU_SPECS = {
+    "P100": {"architecture": "Pascal", "compute_capability": (6, 0), "sm_count": 56, "clock_mhz": 1480, "fp32_tflops": 10.6, "dram_gbs": 732},
+    "V100": {"architecture": "Volta", "compute_capability": (7, 0), "sm_count": 80, "clock_mhz": 1530, "fp32_tflops": 15.7, "dram_gbs": 900},
+    "T4": {"architecture": "Turing", "compute_capability": (7, 5), "sm_count": 40, "clock_mhz": 1590, "fp32_tflops": 8.1, "dram_gbs": 320},
+    "RTX 2080 Ti": {"architecture": "Turing", "compute_capability": (7, 5), "sm_count": 68, "clock_mhz": 1545, "fp32_tflops": 13.4, "dram_gbs": 616},
+    "A100": {"architecture": "Ampere", "compute_capability": (8, 0), "sm_count": 108, "clock_mhz": 1410, "fp32_tflops": 19.5, "dram_gbs": 1555},
+    "A10": {"architecture": "Ampere", "compute_capability": (8, 6), "sm_count": 72, "clock_mhz": 1695, "fp32_tflops": 31.2, "dram_gbs": 600},
+    "RTX 3090": {"architecture": "Ampere", "compute_capability": (8, 6), "sm_count": 82, "clock_mhz": 1695, "fp32_tflops": 35.6, "dram_gbs": 936},
+    "L4": {"architecture": "Ada", "compute_capability": (8, 9), "sm_count": 58, "clock_mhz": 2040, "fp32_tflops": 30.3, "dram_gbs": 300},
+    "RTX 4090": {"architecture": "Ada", "compute_capability": (8, 9), "sm_count": 128, "clock_mhz": 2520, "fp32_tflops": 82.6, "dram_gbs": 1008},
+    "H100": {"architecture": "Hopper", "compute_capability": (9, 0), "sm_count": 132, "clock_mhz": 1980, "fp32_tflops": 67.0, "dram_gbs": 3350},
+}
+
+def get_gpu_model(gpu_name):
+    """
+    由完整的 GPU 名称得到规格表中的型号简称，取名称中出现的最长简称（如 "A100" 优先于 "A10"），未知型号返回 None。
+    """
+    tokens = gpu_name.upper().replace("-", " ").split()
+    candidates = [model for model in GPU_SPECS if all(part in tokens for part in model.upper().split())]
+    if not candidates:
+        return None
+    return max(candidates, key=len)
+
+def get_gpu_spec(gpu_name):
+    """
+    获取 GPU 规格，包含 GPU_SPECS 中的字段与对应计算能力的 SM_RESOURCES 字段，未知型号时输出警告并返回 None。
+    """
+    model = get_gpu_model(gpu_name)
+    if model is None:
+        wout.simple(f"[GPU_performance_calculator] 未知的 GPU 型号: {gpu_name}")
+        return None
+    spec = dict(GPU_SPECS[model])
+    spec.update(SM_RESOURCES[spec["compute_capability"]])
+    return spec
+
+# ncu 的存储单位为十进制前缀
+NCU_BYTE_UNITS = {"byte": 1, "Kbyte": 1e3, "Mbyte": 1e6}
+
+def parse_ncu_number(value):
+    """
+    将 ncu 的指标值转换为数值，去除千位分隔符（如 "1,024"）。
+    """
+    return float(str(value).replace(",", ""))
+
+def parse_ncu_bytes(metric_name, value, unit):
+    """
+    将 ncu 的存储量转换为字节，单位可能带有 "/block" 后缀。
+    以 Kbyte 输出时只保留两位小数，共享内存配置大小总是 1 KiB 的整数倍，取最接近的倍数（如 98.30 Kbyte -> 98304）。
+    """
+    base_unit = str(unit).split("/")[0]
+    if base_unit not in NCU_BYTE_UNITS:
+        wout.error(f"[GPU_performance_calculator] 未知的存储单位: {unit}")
+    size = parse_ncu_number(value) * NCU_BYTE_UNITS[base_unit]
+    if metric_name == "Shared Memory Configuration Size":
+        return round(size / 1024) * 1024
+    return round(size)
+
+def get_kernel_ncu_bytes(kernel, metric_name, default=0):
+    """
+    获取 kernel 的 ncu 存储量指标（字节），没有 ncu 数据或该指标时返回 `default`，缺少单位时视为 byte。
+    """
+    ncu = kernel.get("ncu") or {}
+    if f"{metric_name} Value" not in ncu:
+        return default
+    return parse_ncu_bytes(metric_name, ncu[f"{metric_name} Value"], ncu.get(f"{metric_name} Unit", "byte"))
+
 def get_kernel_grid_size(kernel):
     if "Memcpy" in kernel["name"]:
         return 0
@@ -50,4 +148,288 @@ def get_kernel_sm_active_cycles(kernel):
 def get_op_metric_average(kernels, cal_func): 
     if kernels is None or len(kernels) == 0:
         return 0
-    return sum(cal_func(kernel) for kernel in kernels) / len(kernels)
\ No newline at end of file
+    return sum(cal_func(kernel) for kernel in kernels) / len(kernels)
+
+
+def get_occupancy_spec(device):
+    """
+    获取计算占用率所需的 SM 资源。
+
+    Args:
+        `device`: GPU 名称（如 "Tesla T4"），或计算能力，可以是 (7, 5)、"7.5" 或 7.5（ncu CSV 中的 "CC" 列）。
+
+    Returns:
+        dict: SM_RESOURCES 中的字段，未知设备时返回 None。
+    """
+    if isinstance(device, str) and get_gpu_model(device) is not None:
+        return get_gpu_spec(device)
+    if isinstance(device, float):
+        device = str(device)
+    if isinstance(device, str):
+        # 其余字符串只接受 "7.0" 形式的计算能力
+        match = re.fullmatch(r"\s*(\d+)\.(\d+)\s*", device)
+        if match is None:
+            wout.simple(f"[GPU_performance_calculator] 未知的设备: {device}")
+            return None
+        device = (int(match.group(1)), int(match.group(2)))
+    if tuple(device) not in SM_RESOURCES:
+        wout.simple(f"[GPU_performance_calculator] 未知的设备: {device}")
+        return None
+    return SM_RESOURCES[tuple(device)]
+
+def stack_occupancy_specs(devices):
+    """
+    将每个 kernel 的设备合并为字段为数组的规格，用于对不同设备上的 kernel 一次计算占用率。
+
+    Args:
+        `devices` (list): 每个 kernel 的设备，格式见 get_occupancy_spec。
+
+    Returns:
+        dict: SM_RESOURCES 的各字段，值为与 `devices` 等长的数组，存在未知设备时返回 None。
+    """
+    specs = {}
+    for device in set(devices):
+        specs[device] = get_occupancy_spec(device)
+        if specs[device] is None:
+            return None
+    fields = next(iter(SM_RESOURCES.values())).keys()
+    return {field: np.asarray([specs[device][field] for device in devices], dtype=np.float64) for field in fields}
+
+def _round_up(value, unit):
+    return np.ceil(value / unit) * unit
+
+def estimate_occupancy(block_size, registers_per_thread, shared_mem_per_block, spec, shared_mem_config=None):
+    """
+    按 CUDA Occupancy Calculator 的规则计算理论占用率，对全部 kernel 向量化计算。
+
+    Args:
+        `block_size` (array): 每个线程块的线程数。
+        `registers_per_thread` (array): 每个线程的寄存器数。
+        `shared_mem_per_block` (array): 每个线程块的共享内存（静态 + 动态，字节），不含驱动保留部分。
+        `spec` (dict): get_gpu_spec 或 get_occupancy_spec 的返回值，也可以是 stack_occupancy_specs 得到的逐 kernel 数组。
+        `shared_mem_config` (array): SM 的共享内存配置大小（字节），为 None 时取该设备的最大值。
+
+    Returns:
+        dict: 各字段均为数组
+            - "block_limit_sm"、"block_limit_registers"、"block_limit_shared_mem"、"block_limit_warps": 各资源限制的每 SM 线程块数；
+            - "blocks_per_sm": 每 SM 活跃线程块数，为各限制的最小值；
+            - "active_warps": 每 SM 活跃 warp 数；
+            - "occupancy": 理论占用率，取值 [0, 1]。
+    """
+    block_size = np.asarray(block_size, dtype=np.float64)
+    registers_per_thread = np.asarray(registers_per_thread, dtype=np.float64)
+    shared_mem_per_block = np.asarray(shared_mem_per_block, dtype=np.float64)
+    if shared_mem_config is None:
+        shared_mem_config = spec["shared_mem_per_sm"]
+    shared_mem_config = np.asarray(shared_mem_config, dtype=np.float64)
+
+    warps_per_block = np.ceil(block_size / WARP_SIZE)
+    valid = warps_per_block > 0
+    safe_warps_per_block = np.where(valid, warps_per_block, 1)
+
+    block_limit_sm = np.broadcast_to(np.asarray(spec["max_blocks_per_sm"], dtype=np.float64), block_size.shape)
+    block_limit_warps = np.floor(spec["max_warps_per_sm"] / safe_warps_per_block)
+
+    # 寄存器按 warp 分配，每个 SM 子分区独立分配
+    registers_per_warp = _round_up(registers_per_thread * WARP_SIZE, spec["register_allocation_unit"])
+    warps_per_sub_partition = np.floor(
+        (spec["registers_per_sm"] / spec["sub_partitions"]) / np.where(registers_per_warp > 0, registers_per_warp, 1))
+    block_limit_registers = np.where(
+        registers_per_warp > 0,
+        np.floor(warps_per_sub_partition * spec["sub_partitions"] / safe_warps_per_block),
+        block_limit_sm)
+    block_limit_registers = np.where(registers_per_warp * warps_per_block > spec["max_registers_per_block"], 0, block_limit_registers)
+
+    # 共享内存按分配粒度对齐，并包含驱动为每个线程块保留的部分
+    shared_mem_allocated = _round_up(shared_mem_per_block + spec["reserved_shared_mem_per_block"], spec["shared_mem_allocation_unit"])
+    block_limit_shared_mem = np.where(
+        shared_mem_allocated > 0,
+        np.floor(shared_mem_config / np.where(shared_mem_allocated > 0, shared_mem_allocated, 1)),
+        block_limit_sm)
+    block_limit_shared_mem = np.where(shared_mem_per_block > spec["max_shared_mem_per_block"], 0, block_limit_shared_mem)
+
+    blocks_per_sm = np.minimum.reduce([block_limit_sm, block_limit_registers, block_limit_shared_mem, block_limit_warps])
+    blocks_per_sm = np.where(valid, blocks_per_sm, 0)
+    active_warps = blocks_per_sm * warps_per_block
+
+    return {
+        "block_limit_sm": block_limit_sm,
+        "block_limit_registers": block_limit_registers,
+        "block_limit_shared_mem": block_limit_shared_mem,
+        "block_limit_warps": block_limit_warps,
+        "blocks_per_sm": blocks_per_sm,
+        "active_warps": active_warps,
+        "occupancy": active_warps / spec["max_warps_per_sm"],
+    }
+
+def estimate_roofline(grid_size, block_size, registers_per_thread, shared_mem_per_block, flops, memory_bytes, spec, shared_mem_config=None):
+    """
+    Roofline 模型，估计每个 kernel 的可达吞吐与耗时下界，对全部 kernel 向量化计算。
+
+    可达算力 = 峰值算力 × 有线程块的 SM 比例 × 波次效率，其中波次数 = 线程块数 / (每 SM 活跃线程块数 × SM 数)，
+    超过一个波次时波次效率 = 波次数 / 向上取整的波次数，即最后一个不满的波次的损失；可达带宽 = 峰值带宽 × 有线程块的 SM 比例。
+    耗时下界为计算时间与访存时间中的较大者。
+
+    Args:
+        `grid_size` (array): 每个 kernel 的线程块数。
+        `block_size`、`registers_per_thread`、`shared_mem_per_block`: 见 estimate_occupancy。
+        `flops` (array): 每个 kernel 的浮点运算数。
+        `memory_bytes` (array): 每个 kernel 的访存字节数。
+        `spec` (dict): get_gpu_spec 的返回值。
+        `shared_mem_config` (array): 见 estimate_occupancy。
+
+    Returns:
+        dict: estimate_occupancy 的全部字段，以及
+            - "waves": 波次数；
+            - "achievable_flops": 可达算力（FLOP/s）；
+            - "achievable_bandwidth": 可达带宽（B/s）；
+            - "arithmetic_intensity": 运算强度（FLOP/B）；
+            - "compute_bound": 是否为计算受限；
+            - "lower_bound_time": 耗时下界（秒）。
+    """
+    grid_size = np.asarray(grid_size, dtype=np.float64)
+    flops = np.asarray(flops, dtype=np.float64)
+    memory_bytes = np.asarray(memory_bytes, dtype=np.float64)
+    result = estimate_occupancy(block_size, registers_per_thread, shared_mem_per_block, spec, shared_mem_config)
+
+    sm_count = spec["sm_count"]
+    peak_flops = np.asarray(spec["fp32_tflops"], dtype=np.float64) * 1e12
+    peak_bandwidth = np.asarray(spec["dram_gbs"], dtype=np.float64) * 1e9
+
+    active_sm_fraction = np.minimum(grid_size, sm_count) / sm_count
+    blocks_per_wave = result["blocks_per_sm"] * sm_count
+    waves = np.divide(grid_size, blocks_per_wave, out=np.zeros_like(grid_size), where=blocks_per_wave > 0)
+    # 不足一个波次时损失已由有线程块的 SM 比例体现
+    wave_efficiency = np.where(waves > 1, waves / np.ceil(np.maximum(waves, 1)), 1.0)
+
+    achievable_flops = peak_flops * active_sm_fraction * wave_efficiency
+    achievable_bandwidth = peak_bandwidth * active_sm_fraction
+    compute_time = np.divide(flops, achievable_flops, out=np.where(flops > 0, np.inf, 0.0), where=achievable_flops > 0)
+    memory_time = np.divide(memory_bytes, achievable_bandwidth, out=np.where(memory_bytes > 0, np.inf, 0.0), where=achievable_bandwidth > 0)
+
+    result.update({
+        "waves": waves,
+        "achievable_flops": achievable_flops,
+        "achievable_bandwidth": achievable_bandwidth,
+        "arithmetic_intensity": np.divide(flops, memory_bytes, out=np.zeros_like(flops), where=memory_bytes > 0),
+        "compute_bound": compute_time >= memory_time,
+        "lower_bound_time": np.maximum(compute_time, memory_time),
+    })
+    return result
+
+def load_profile_report(report_csv_path):
+    """
+    读取 data_shape_analyzer 保存的 onnx-tool 分析报告（report.csv）。
+
+    Returns:
+        dict: {节点名称: (MACs, 访存字节数)}，不含最后的汇总行。
+    """
+    report = {}
+    with open(report_csv_path, 'r') as f:
+        for row in csv.DictReader(f):
+            if row["Name"] == "Total":
+                continue
+            report[row["Name"]] = (int(row["Forward_MACs"]), int(row["Memory"]))
+    return report
+
+def _kernel_shared_mem(kernel):
+    return get_kernel_ncu_bytes(kernel, "Static Shared Memory Per Block") + get_kernel_ncu_bytes(kernel, "Dynamic Shared Memory Per Block")
+
+def estimate_model_kernels(node_kernel_pairs, report, gpu_name, default_registers_per_thread=32):
+    """
+    估计模型全部 kernel 的占用率、可达吞吐与耗时下界。
+
+    onnx-tool 只给出算子级的 MACs 与访存量，算子的 FLOPs（2 × MACs）与访存字节数按线程数（线程块数 × 线程块大小）
+    比例分配到其各个 kernel，单个 kernel 的耗时下界只是近似值（如 cuDNN 的辅助 kernel 线程多而计算少）。
+    算子级耗时下界不依赖分配方式：全部计算与访存都以其 kernel 中最高的可达算力与带宽执行所需的时间。
+    kernel 带有 ncu 数据时（如来自规则库的预测结果）使用其中的寄存器、共享内存与共享内存配置大小，与 occupancy_validator 验证的输入相同；
+    否则寄存器取 `default_registers_per_thread`，共享内存取 0，配置大小取设备的最大值。
+
+    Args:
+        `node_kernel_pairs` (list): 节点与 kernel 对的列表，kernel 可以是预测结果。
+        `report` (dict): load_profile_report 的返回值。
+        `gpu_name` (str): 目标 GPU 名称。
+        `default_registers_per_thread` (int): 没有 ncu 数据时每线程的寄存器数。
+
+    Returns:
+        tuple: (kernel 列表 [(节点名称, kernel 名称), ...], estimate_roofline 的返回值, 算子级结果)，不含 Memcpy。
+               算子级结果为 {节点名称: {"flops", "memory_bytes", "kernel_count", "lower_bound_time"}}。
+    """
+    spec = get_gpu_spec(gpu_name)
+    if spec is None:
+        wout.error(f"[GPU_performance_calculator] 无法估计未知 GPU {gpu_name} 的性能")
+
+    kernel_keys = []
+    kernel_node = []
+    node_work = {}
+    columns = {"grid_size": [], "block_size": [], "registers_per_thread": [], "shared_mem_per_block": [], "shared_mem_config": [],
+               "flops": [], "memory_bytes": []}
+    missing_nodes = 0
+    for pair in node_kernel_pairs:
+        node_name = pair["Node"]["name"].removesuffix("_kernel_time")
+        kernels = [kernel for kernel in pair["Kernels"] if "Memcpy" not in kernel["name"]]
+        if not kernels:
+            continue
+        if node_name not in report:
+            missing_nodes += 1
+        macs, memory_bytes = report.get(node_name, (0, 0))
+        node_work[node_name] = (2 * macs, memory_bytes, len(kernels))
+
+        threads = np.asarray([get_kernel_grid_size(kernel) * get_kernel_block_size(kernel) for kernel in kernels], dtype=np.float64)
+        shares = threads / threads.sum() if threads.sum() > 0 else np.full(len(kernels), 1 / len(kernels))
+        for kernel, share in zip(kernels, shares):
+            kernel_keys.append((node_name, kernel["name"]))
+            kernel_node.append(len(node_work) - 1)
+            columns["grid_size"].append(get_kernel_grid_size(kernel))
+            columns["block_size"].append(get_kernel_block_size(kernel))
+            ncu = kernel.get("ncu") or {}
+            registers_per_thread = ncu.get("Registers Per Thread Value")
+            columns["registers_per_thread"].append(
+                parse_ncu_number(registers_per_thread) if registers_per_thread is not None else default_registers_per_thread)
+            columns["shared_mem_per_block"].append(_kernel_shared_mem(kernel))
+            columns["shared_mem_config"].append(get_kernel_ncu_bytes(kernel, "Shared Memory Configuration Size", spec["shared_mem_per_sm"]))
+            columns["flops"].append(2 * macs * share)
+            columns["memory_bytes"].append(memory_bytes * share)
+
+    if missing_nodes:
+        wout.simple(f"[GPU_performance_calculator] {missing_nodes} 个算子不在分析报告中，其 FLOPs 与访存量视为 0")
+
+    result = estimate_roofline(spec=spec, **columns)
+
+    # 每个算子的 kernel 中最高的可达算力与带宽
+    kernel_node = np.asarray(kernel_node, dtype=np.int64)
+    best_flops = np.zeros(len(node_work))
+    best_bandwidth = np.zeros(len(node_work))
+    np.maximum.at(best_flops, kernel_node, result["achievable_flops"])
+    np.maximum.at(best_bandwidth, kernel_node, result["achievable_bandwidth"])
+
+    node_results = {}
+    for node_idx, (node_name, (flops, memory_bytes, kernel_count)) in enumerate(node_work.items()):
+        compute_time = flops / best_flops[node_idx] if best_flops[node_idx] > 0 else (np.inf if flops > 0 else 0.0)
+        memory_time = memory_bytes / best_bandwidth[node_idx] if best_bandwidth[node_idx] > 0 else (np.inf if memory_bytes > 0 else 0.0)
+        node_results[node_name] = {
+            "flops": flops,
+            "memory_bytes": memory_bytes,
+            "kernel_count": kernel_count,
+            "lower_bound_time": float(max(compute_time, memory_time)),
+        }
+
+    return kernel_keys, result, node_results
+
+
+if __name__ == "__main__":
+    """
+    Usage: python3 ./rule_based_model/GPU_performance_calculator.py ./examples/yolov8n-orto0.json ./examples/yolov8n_analyse/report.csv "Tesla V100-SXM2-32GB"
+    """
+    import sys
+    from utils import trace_file_parser as tfp
+
+    trace_file_path, report_csv_path, gpu_name = sys.argv[1:4]
+    node_kernel_pairs = tfp.get_pairs_from_trace_file(trace_file_path)
+    kernel_keys, result, node_results = estimate_model_kernels(node_kernel_pairs, load_profile_report(report_csv_path), gpu_name)
+
+    print(f"[GPU_performance_calculator] {len(kernel_keys)} 个 kernel，平均理论占用率 {result['occupancy'].mean():.2%}，"
+          f"计算受限 {int(result['compute_bound'].sum())} 个")
+    print(f"[GPU_performance_calculator] 算子耗时下界之和 {sum(node['lower_bound_time'] for node in node_results.values()) * 1e6:.1f} us")
+    for node_name, node in sorted(node_results.items(), key=lambda item: -item[1]["lower_bound_time"])[:10]:
+        print(f"    {node_name.ljust(40)} {node['lower_bound_time'] * 1e6:>10.2f} us  {node['flops'] / 1e9:>8.3f} GFLOP  {node['memory_bytes'] / 1e6:>8.3f} MB")
@@ -1,6 +1,9 @@
 import json
 from utils import warning_output as wout
 import math
+import time
+from collections import defaultdict
+import numpy as np
 
 # 0 - 任务基本信息
 # 1 - 严重非预期情况
@@ -94,12 +97,95 @@ def _calculate_shape_match_score(testing_shape, target_shape, difference_punish_
 def _shape_full_score(shape_len, totol_size_weight):
     return shape_len + totol_size_weight
 
+def _size_ratio(testing, target):
+    """
+    逐元素计算 min(testing / target, target / testing)，任一为 0 时为 0。
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.minimum(testing / target, target / testing)
+    return np.where((testing != 0) & (target != 0), ratio, 0.0)
+
+def _calculate_shape_match_scores(testing_shape, target_shapes, difference_punish_weight, totol_size_weight):
+    """
+    `_calculate_shape_match_score` 的向量化版本，一次计算待测形状与全部候选形状的得分。
+
+    Args:
+        `testing_shape` (list): 待测形状。
+        `target_shapes` (list): 候选形状列表，元素为 None 表示候选没有该形状，得分为 0。
+        `difference_punish_weight` (float): 形状不同时，对形状差异的惩罚权重，需要小于 1。
+        `totol_size_weight` (float): 形状大小权重。
+
+    Returns:
+        numpy.ndarray: 每个候选的得分。
+    """
+    scores = np.zeros(len(target_shapes), dtype=np.float64)
+    testing = np.asarray(testing_shape, dtype=np.float64)
+    testing_size = float(np.prod(testing))
+
+    same_rank = [idx for idx, shape in enumerate(target_shapes) if shape is not None and len(shape) == len(testing_shape)]
+    other_rank = [idx for idx, shape in enumerate(target_shapes) if shape is not None and len(shape) != len(testing_shape)]
+
+    if same_rank:
+        targets = np.asarray([target_shapes[idx] for idx in same_rank], dtype=np.float64).reshape(len(same_rank), len(testing_shape))
+        dim_scores = np.where(targets == testing, 1.0, difference_punish_weight * _size_ratio(testing, targets))
+        size_scores = totol_size_weight * _size_ratio(testing_size, np.prod(targets, axis=1))
+        scores[same_rank] = dim_scores.sum(axis=1) + size_scores
+    if other_rank:
+        target_sizes = np.asarray([math.prod(target_shapes[idx]) for idx in other_rank], dtype=np.float64)
+        scores[other_rank] = totol_size_weight * _size_ratio(testing_size, target_sizes)
+    return scores
+
 def _exact_output():
+    if _profiler is not None:
+        _profiler.note_score(1.0, exact=True)
     output(f"[data_based_kernel_finder]     算子精确匹配", 4)
 
 def _no_exact_output(match_score, full_score=-1):
+    if _profiler is not None:
+        _profiler.note_score(match_score / full_score if full_score > 0 else None)
     warning(f"[data_based_kernel_finder]     算子未精确匹配，匹配度 {match_score} / {full_score}", 3)
 
+"""
+匹配函数注册。
+    - `register_matcher`：为指定的算子类型注册专用匹配函数；
+    - `register_family`：为一类算子注册通用匹配函数，未注册专用匹配函数的算子按所属类别匹配，
+      规则库中没有该算子的数据时，使用同类别其他算子的数据。类别中可以包含已注册专用匹配函数的算子，
+      这些算子仍使用专用匹配函数，其数据可供同类别的其他算子使用。
+既不属于已注册算子也不属于任何类别的算子，若规则库中有数据，使用逐元素 N 元通用匹配函数。
+其他模块可以通过这两个装饰器添加新的算子或类别，无需修改本文件。
+"""
+op_func_dict = {}
+op_family_dict = {}
+family_func_dict = {}
+
+def register_matcher(*op_names):
+    """
+    注册专用匹配函数的装饰器，已注册的算子类型会被覆盖。
+
+    Args:
+        `op_names` (str): 算子类型，如 "Conv"。
+    """
+    def decorator(func):
+        for op_name in op_names:
+            op_func_dict[op_name] = func
+        return func
+    return decorator
+
+def register_family(family_name, op_names):
+    """
+    注册一类算子通用匹配函数的装饰器。
+
+    Args:
+        `family_name` (str): 类别名称，如 "matmul"。
+        `op_names` (list): 属于该类别的算子类型。
+    """
+    def decorator(func):
+        family_func_dict[family_name] = func
+        for op_name in op_names:
+            op_family_dict[op_name] = family_name
+        return func
+    return decorator
+
 """
 寻找各个算子最为匹配的 kernel 序列。
 
@@ -119,6 +205,7 @@ def _no_exact_output(match_score, full_score=-1):
 Returns:
     list: 找到的算子列表。空列表标识找到的结果就是空列表，即不真正调用 kernel；为 None 则表示异常或者没有找到。
 """
+@register_matcher("Reshape", "Resize", "Shape", "Gather")
 def empty_find_kernel(op_data_list, node_info):
     # 没有对应 kernel 的算子，直接返回空列表
     output(f"[data_based_kernel_finder]     {node_info['op_name']} 对应 kernel 为空", 4)
@@ -128,6 +215,14 @@ def undefined_find_kernel(op_data_list, node_info):
     warning(f"[data_based_kernel_finder]     {node_info['op_name']} 算子类型未注册", 1)
     return None
 
+def _has_no_data(op_data_list, node_info):
+    # 规则库中没有该算子的数据（且不属于可借用数据的类别）时，匹配函数收到 None
+    if op_data_list is None:
+        warning(f"[data_based_kernel_finder]     {node_info['op_name']} 算子在规则库中没有数据", 2)
+        return True
+    return False
+
+@register_matcher("Conv")
 def conv_find_kernel(op_data_list, node_info):
     # input_shape_0: input
     # input_shape_1: weight
@@ -150,6 +245,9 @@ def conv_find_kernel(op_data_list, node_info):
     max_exact_match_args_score = 0
     exact_match_args_score = 0
 
+    if _has_no_data(op_data_list, node_info):
+        return None
+
     for data in op_data_list:
         data_has_bias = "input_shape_2" in data
         
@@ -185,6 +283,7 @@ def conv_find_kernel(op_data_list, node_info):
 
     return target_data["kernels"]
 
+@register_matcher("Concat")
 def concat_find_kernel(op_data_list, node_info):
     # 输入的数量不确定，不像 Conv 那样确定有图像、卷积核和偏置，该算子可能合并多个输入
 
@@ -206,6 +305,9 @@ def concat_find_kernel(op_data_list, node_info):
     max_exact_match_args_score = 0
     exact_match_args_score = 0
 
+    if _has_no_data(op_data_list, node_info):
+        return None
+
     for data in op_data_list:
         # 区分考虑输入形状相同和不同的情况
         if input_all_same:
@@ -243,6 +345,8 @@ def concat_find_kernel(op_data_list, node_info):
     # 当没有精确匹配时，调整最匹配序列的相关参数
     # 暂时先不做出调整，直接返回 
     return target_data["kernels"]
+
+@register_matcher("Split")
 def split_find_kernel(op_data_list, node_info):
     # 类似 Concat，只不过数量不确定的是输出，可能分割为多个输出
 
@@ -263,6 +367,9 @@ def split_find_kernel(op_data_list, node_info):
     max_exact_match_args_score = 0
     exact_match_args_score = 0
 
+    if _has_no_data(op_data_list, node_info):
+        return None
+
     for data in op_data_list:
         # 区分考虑输出形状相同和不同的情况
         if output_all_same:
@@ -298,6 +405,7 @@ def split_find_kernel(op_data_list, node_info):
     # 暂时先不做出调整，直接返回 
     return target_data["kernels"]
 
+@register_matcher("Slice")
 def slice_find_kernel(op_data_list, node_info):
     # 目前见到的 Slice 包含 4 个输入，分别是 data, starts, ends, axes
 
@@ -312,6 +420,9 @@ def slice_find_kernel(op_data_list, node_info):
     max_exact_match_args_score = 0
     exact_match_args_score = 0
 
+    if _has_no_data(op_data_list, node_info):
+        return None
+
     for data in op_data_list:
         exact_match_args_score = 0
         exact_match_args_score += _calculate_shape_match_score(node_info["input_shape_0"], data["input_shape_0"], difference_punish_weight, totol_size_weight)
@@ -323,10 +434,21 @@ def slice_find_kernel(op_data_list, node_info):
         if exact_match_args_score > max_exact_match_args_score:
             max_exact_match_args_score = exact_match_args_score
             target_data = data
-        
+
+    full_score = sum(_shape_full_score(len(node_info[key]), totol_size_weight)
+                     for key in ("input_shape_0", "input_shape_1", "input_shape_2", "input_shape_3", "output_shape_0"))
+    if max_exact_match_args_score == full_score:
+        _exact_output()
+    else:
+        _no_exact_output(max_exact_match_args_score, full_score)
+
+    if target_data == {}:
+        warning(f"[data_based_kernel_finder]     Slice 算子没有满足条件的 kernel 序列", 2)
+        return None
     return target_data["kernels"]
 
     
+@register_matcher("Mul", "Add", "Div", "Sub")
 def simple_binary_find_kernel(op_data_list, node_info):
     # 逐元素操作，输入一定是两个，但是具体的维度不一定，会进行广播
     # 包含 Mul、Div、Add、Sub
@@ -348,10 +470,16 @@ def simple_binary_find_kernel(op_data_list, node_info):
     difference_punish_weight = 1
     totol_size_weight = 2
 
+    full_score = _shape_full_score(len(node_info["input_shape_0"]), totol_size_weight) \
+        + _shape_full_score(len(node_info["input_shape_1"]), totol_size_weight) \
+        + _shape_full_score(len(node_info["output_shape_0"]), totol_size_weight)
     target_data = {}
     max_exact_match_args_score = 0
     exact_match_args_score = 0
 
+    if _has_no_data(op_data_list, node_info):
+        return None
+
     for data in op_data_list:
         # 原始模型存在瑕疵，有 Div 节点常量形状参数未标注
         if len(data["input_shape_0"]) == 0:
@@ -372,10 +500,14 @@ def simple_binary_find_kernel(op_data_list, node_info):
                 _exact_output()
                 return data["kernels"]
     
-    _no_exact_output(max_exact_match_args_score)
+    _no_exact_output(max_exact_match_args_score, full_score)
 
+    if target_data == {}:
+        warning(f"[data_based_kernel_finder]     {node_info['op_name']} 算子没有满足条件的 kernel 序列", 2)
+        return None
     return target_data["kernels"]
 
+@register_matcher("Sigmoid", "MaxPool", "Softmax", "Transpose")
 def simple_unary_find_kernel(op_data_list, node_info):
     # 输入和输出均只有一个
     input_dim = len(node_info["input_shape_0"])
@@ -389,6 +521,9 @@ def simple_unary_find_kernel(op_data_list, node_info):
     exact_match_args_score = 0
     full_score = _shape_full_score(input_dim, totol_size_weight) + _shape_full_score(output_dim, totol_size_weight)
 
+    if _has_no_data(op_data_list, node_info):
+        return None
+
     for data in op_data_list:
         exact_match_args_score = _calculate_shape_match_score(node_info["input_shape_0"], data["input_shape_0"], difference_punish_weight, totol_size_weight)
         exact_match_args_score += _calculate_shape_match_score(node_info["output_shape_0"], data["output_shape_0"], difference_punish_weight, totol_size_weight)
@@ -402,37 +537,400 @@ def simple_unary_find_kernel(op_data_list, node_info):
                 return target_data["kernels"]
     
     _no_exact_output(max_exact_match_args_score, full_score)
+    if target_data == {}:
+        warning(f"[data_based_kernel_finder]     {node_info['op_name']} 算子没有满足条件的 kernel 序列", 2)
+        return None
     return target_data["kernels"]
 
+@register_matcher("MemcpyFromHost", "MemcpyToHost")
 def memory_find_kernel(op_data_list, node_info):
     # 内存拷贝节点暂略，因为这不在 ONNX 算子集中，而是 ORT 处理模型后在图中生成的
     warning("[data_based_kernel_finder]     暂不支持内存拷贝节点，这并非 ONNX 算子集中节点", 1)
     return None
 
-op_func_dict = {
-    "Conv": conv_find_kernel,
-    "Concat": concat_find_kernel,
-    "Split": split_find_kernel,
-    "Slice": slice_find_kernel,
+def _vectorized_find_kernel(op_data_list, node_info, shape_keys, extra_scores=None, extra_full_score=0):
+    """
+    通用匹配：对 `shape_keys` 中的每个形状向量化计算全部候选的得分，取得分最高的第一个候选。
+
+    Args:
+        `shape_keys` (list): 参与匹配的形状键，如 "input_shape_0"。
+        `extra_scores` (numpy.ndarray): 额外的逐候选得分，与形状得分相加。
+        `extra_full_score` (float): 额外得分的满分。
+    """
+    difference_punish_weight = 1
+    totol_size_weight = 2
+
+    candidates = list(op_data_list)
+    if len(candidates) == 0:
+        warning(f"[data_based_kernel_finder]     {node_info['op_name']} 算子没有候选 kernel 序列", 2)
+        return None
+
+    scores = np.zeros(len(candidates), dtype=np.float64) if extra_scores is None else np.asarray(extra_scores, dtype=np.float64)
+    full_score = extra_full_score
+    for key in shape_keys:
+        testing_shape = node_info[key] if len(node_info[key]) != 0 else [1]
+        target_shapes = [(data[key] if len(data[key]) != 0 else [1]) if key in data else None for data in candidates]
+        scores = scores + _calculate_shape_match_scores(testing_shape, target_shapes, difference_punish_weight, totol_size_weight)
+        full_score += _shape_full_score(len(testing_shape), totol_size_weight)
+
+    best = int(np.argmax(scores))
+    if scores[best] <= 0:
+        warning(f"[data_based_kernel_finder]     {node_info['op_name']} 算子没有满足条件的 kernel 序列", 2)
+        return None
+
+    if math.isclose(scores[best], full_score):
+        _exact_output()
+    else:
+        _no_exact_output(float(scores[best]), full_score)
+    return candidates[best]["kernels"]
+
+def _shape_keys(node_info, prefix):
+    keys = []
+    while f"{prefix}{len(keys)}" in node_info:
+        keys.append(f"{prefix}{len(keys)}")
+    return keys
+
+@register_family("elementwise", (
+    "Add", "Sub", "Mul", "Div", "Sigmoid", "Pow", "Sqrt", "Reciprocal", "Exp", "Log", "Neg", "Abs", "Erf", "Tanh", "Relu", "LeakyRelu", "HardSigmoid",
+    "HardSwish", "Mish", "Clip", "Cast", "Where", "Equal", "Less", "Greater", "And", "Or", "Not", "Min", "Max", "Sum",
+))
+def elementwise_nary_find_kernel(op_data_list, node_info):
+    # 逐元素操作，输入数量不确定，全部输入和输出形状参与匹配
+    return _vectorized_find_kernel(op_data_list, node_info, _shape_keys(node_info, "input_shape_") + _shape_keys(node_info, "output_shape_"))
+
+@register_family("reduction", (
+    "ReduceMean", "ReduceSum", "ReduceMax", "ReduceMin", "ReduceProd", "ReduceL2", "ArgMax", "ArgMin",
+    "GlobalAveragePool", "GlobalMaxPool", "LayerNormalization", "InstanceNormalization", "GroupNormalization",
+    "BatchNormalization", "Softmax",
+))
+def reduction_find_kernel(op_data_list, node_info):
+    # 规约类 kernel 的启动参数主要由规约的元素数（输入大小 / 输出大小）决定，作为额外得分
+    candidates = list(op_data_list)
+    reduce_weight = 2
+
+    def reduce_size(info):
+        if "input_shape_0" not in info or "output_shape_0" not in info:
+            return 0.0
+        output_size = math.prod(info["output_shape_0"])
+        return math.prod(info["input_shape_0"]) / output_size if output_size != 0 else 0.0
+
+    testing_reduce = reduce_size(node_info)
+    target_reduce = np.asarray([reduce_size(data) for data in candidates], dtype=np.float64)
+    extra_scores = reduce_weight * _size_ratio(testing_reduce, target_reduce)
+    return _vectorized_find_kernel(candidates, node_info, _shape_keys(node_info, "input_shape_") + _shape_keys(node_info, "output_shape_"),
+                                   extra_scores, reduce_weight)
+
+@register_family("matmul", (
+    "MatMul", "Gemm", "MatMulInteger", "FusedMatMul", "Einsum", "Attention", "MultiHeadAttention",
+))
+def matmul_find_kernel(op_data_list, node_info):
+    # 矩阵乘类 kernel 由 (batch, M, N, K) 决定，M、N 取自输出，K 取自第一个输入的最后一维，
+    # 与转置属性无关；逐维比较后再比较全部输入输出形状
+    candidates = list(op_data_list)
+    gemm_weight = 1
+
+    def gemm_dims(info):
+        output_shape = info.get("output_shape_0") or [1]
+        input_shape = info.get("input_shape_0") or [1]
+        n = output_shape[-1]
+        m = output_shape[-2] if len(output_shape) > 1 else 1
+        batch = math.prod(output_shape[:-2])
+        return [batch, m, n, input_shape[-1]]
+
+    testing_dims = np.asarray(gemm_dims(node_info), dtype=np.float64)
+    target_dims = np.asarray([gemm_dims(data) for data in candidates], dtype=np.float64).reshape(len(candidates), 4)
+    extra_scores = gemm_weight * _size_ratio(testing_dims, target_dims).sum(axis=1)
+    return _vectorized_find_kernel(candidates, node_info, _shape_keys(node_info, "input_shape_") + _shape_keys(node_info, "output_shape_"),
+                                   extra_scores, gemm_weight * 4)
+
+def _resolve_matcher(data, op_name):
+    """
+    选择匹配函数与候选列表，顺序为：专用匹配函数、类别通用匹配函数、逐元素 N 元通用匹配函数。
+    规则库中没有该算子的数据时，若其属于某个类别则使用类别通用匹配函数与同类别其他算子的数据，而不是专用匹配函数。
+
+    Returns:
+        tuple: (匹配函数, 候选列表)，候选列表为 None 表示规则库中没有可用的数据。
+    """
+    op_data_list = data.get(op_name)
+    if op_name in op_func_dict and (op_data_list is not None or op_name not in op_family_dict):
+        return op_func_dict[op_name], op_data_list
+
+    family_name = op_family_dict.get(op_name)
+    if family_name is not None:
+        if op_data_list is None:
+            # 规则库中没有该算子，借用同类别其他算子的数据
+            op_data_list = [entry for other_op, family in op_family_dict.items() if family == family_name for entry in data.get(other_op, [])]
+            warning(f"[data_based_kernel_finder]     {op_name} 无数据，使用 {family_name} 类别其他算子的 {len(op_data_list)} 个条目", 2)
+        return family_func_dict[family_name], op_data_list
+
+    if op_data_list is not None:
+        return elementwise_nary_find_kernel, op_data_list
+    return undefined_find_kernel, op_data_list
+
+"""
+匹配过程的统计，用于判断预测不准是规则库覆盖不足还是打分选择不当。
+启用后每次调用 find_best_match_kernels 都会记录：
+    - 各算子类型的查询次数，以及精确匹配、模糊匹配、空序列、未找到的次数；
+    - 匹配度（得分 / 满分）的分布；
+    - 每次查询扫描的候选条目数；
+    - 各匹配函数的耗时；
+    - 规则库中从未被选中的条目。
+"""
+
+# 不从规则库中选择条目的匹配函数，其算子类型的条目不计入未使用条目
+_NON_SELECTING_MATCHERS = (empty_find_kernel, memory_find_kernel, undefined_find_kernel)
+
+class _ScanCounter:
+    """
+    包装候选列表，统计匹配函数实际遍历的条目数。
+    """
+    __slots__ = ("_entries", "scanned")
+
+    def __init__(self, entries):
+        self._entries = entries
+        self.scanned = 0
 
-    "Mul": simple_binary_find_kernel,
-    "Add": simple_binary_find_kernel,
-    "Div": simple_binary_find_kernel,
-    "Sub": simple_binary_find_kernel,
+    def __iter__(self):
+        for entry in self._entries:
+            self.scanned += 1
+            yield entry
 
-    "Sigmoid": simple_unary_find_kernel,
-    "MaxPool": simple_unary_find_kernel,
-    "Softmax": simple_unary_find_kernel,
-    "Transpose": simple_unary_find_kernel,
+    def __len__(self):
+        return len(self._entries)
 
-    "Reshape": empty_find_kernel,
-    "Resize": empty_find_kernel,
-    "Shape": empty_find_kernel,
-    "Gather": empty_find_kernel,
+    def __getitem__(self, idx):
+        return self._entries[idx]
 
-    "MemcpyFromHost": memory_find_kernel,
-    "MemcpyToHost": memory_find_kernel,
-}
+
+class MatchProfiler:
+    """
+    规则库匹配统计。通过 `enable_profiling` 启用，之后的查询结果写入该对象。
+    """
+
+    # 匹配度直方图的区间数，区间为 [0, 1] 等分
+    HISTOGRAM_BINS = 10
+
+    def __init__(self):
+        self.op_stats = defaultdict(lambda: {
+            "queries": 0, "exact": 0, "fuzzy": 0, "empty": 0, "miss": 0, "scanned": [], "scores": [],
+        })
+        self.matcher_stats = defaultdict(lambda: {"calls": 0, "time": 0.0})
+        self.unregistered_ops = defaultdict(int)
+        self.used_entries = defaultdict(set)
+        self._data = None
+        self._kernels_2_entry = None
+        self._current = None
+
+    def note_score(self, score, exact=False):
+        """
+        由匹配函数记录本次查询的匹配度，`score` 为得分与满分之比，满分未知时为 None。
+        """
+        if self._current is not None:
+            self._current["score"] = score
+            self._current["exact"] = exact
+
+    def _entry_source(self, kernels):
+        """
+        由返回的 kernel 序列找到其所在的规则库条目 (算子类型, 下标)，匹配函数返回的是条目中 "kernels" 列表本身。
+        按类别借用其他算子数据时，条目记在其所属的算子类型下。
+        """
+        if self._kernels_2_entry is None:
+            self._kernels_2_entry = {
+                id(entry["kernels"]): (op_name, idx)
+                for op_name, entries in self._data.items() for idx, entry in enumerate(entries or [])
+            }
+        return self._kernels_2_entry.get(id(kernels))
+
+    def profile_query(self, find_kernel, data, op_data_list, node_info):
+        """
+        执行一次查询并记录统计。
+
+        Args:
+            `find_kernel` (function): 匹配函数。
+            `data` (dict): 规则库数据。
+            `op_data_list` (list): 候选列表，通常为 `data` 中该算子的数据。
+            `node_info` (dict): 输入算子信息。
+
+        Returns:
+            list: 与 `find_kernel` 的返回值相同。
+        """
+        if self._data is not data:
+            self._data = data
+            self._kernels_2_entry = None
+
+        op_name = node_info["op_name"]
+        candidates = _ScanCounter(op_data_list) if op_data_list is not None else None
+
+        self._current = {"score": None, "exact": False}
+        start = time.perf_counter()
+        try:
+            result = find_kernel(candidates, node_info)
+        finally:
+            elapsed = time.perf_counter() - start
+            current, self._current = self._current, None
+            matcher_stats = self.matcher_stats[find_kernel.__name__]
+            matcher_stats["calls"] += 1
+            matcher_stats["time"] += elapsed
+
+        if find_kernel is undefined_find_kernel:
+            self.unregistered_ops[op_name] += 1
+
+        stats = self.op_stats[op_name]
+        stats["queries"] += 1
+        stats["scanned"].append(candidates.scanned if candidates is not None else 0)
+        if result is None:
+            stats["miss"] += 1
+        elif len(result) == 0:
+            stats["empty"] += 1
+        else:
+            stats["exact" if current["exact"] else "fuzzy"] += 1
+            source = self._entry_source(result)
+            if source is not None:
+                self.used_entries[source[0]].add(source[1])
+        if current["score"] is not None:
+            stats["scores"].append(current["score"])
+
+        return result
+
+    def _score_summary(self, scores):
+        if not scores:
+            return None
+        scores = np.asarray(scores, dtype=np.float64)
+        p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+        histogram, _ = np.histogram(np.clip(scores, 0.0, 1.0), bins=self.HISTOGRAM_BINS, range=(0.0, 1.0))
+        return {
+            "count": len(scores),
+            "min": float(scores.min()),
+            "mean": float(scores.mean()),
+            "p10": float(p10),
+            "p50": float(p50),
+            "p90": float(p90),
+            "histogram": histogram.tolist(),
+        }
+
+    def summary(self):
+        """
+        汇总统计。
+
+        Returns:
+            dict: 包含
+                - "queries": 总查询次数；
+                - "ops": {算子类型: {"queries", "exact", "fuzzy", "empty", "miss", "db_entries", "used_entries",
+                         "candidates_scanned": {"total", "mean", "max"}, "score": 匹配度分布（无记录时为 None）}}；
+                - "matchers": {匹配函数名称: {"calls", "total_time", "mean_time"}}，时间单位为秒；
+                - "unregistered_ops": {未注册的算子类型: 查询次数}；
+                - "unused_entries": {算子类型: [{"index", "model", "node_name", "kernel_count"}]}，规则库中从未被选中的条目，
+                  不包含匹配函数不从规则库中选择条目的算子类型（如 Reshape、Memcpy）；按类别借用的条目记在其所属的算子类型下。
+        """
+        data = self._data or {}
+        ops = {}
+        for op_name, stats in sorted(self.op_stats.items()):
+            scanned = stats["scanned"]
+            ops[op_name] = {
+                "queries": stats["queries"],
+                "exact": stats["exact"],
+                "fuzzy": stats["fuzzy"],
+                "empty": stats["empty"],
+                "miss": stats["miss"],
+                "db_entries": len(data.get(op_name) or []),
+                "used_entries": len(self.used_entries[op_name]),
+                "candidates_scanned": {
+                    "total": sum(scanned),
+                    "mean": sum(scanned) / len(scanned),
+                    "max": max(scanned),
+                },
+                "score": self._score_summary(stats["scores"]),
+            }
+
+        unused_entries = {}
+        for op_name, entries in sorted(data.items()):
+            if _resolve_matcher(data, op_name)[0] in _NON_SELECTING_MATCHERS:
+                continue
+            used = self.used_entries.get(op_name, set())
+            unused = [
+                {"index": idx, "model": entry.get("model"), "node_name": entry.get("node_name"), "kernel_count": len(entry["kernels"])}
+                for idx, entry in enumerate(entries) if idx not in used
+            ]
+            if unused:
+                unused_entries[op_name] = unused
+
+        return {
+            "queries": sum(stats["queries"] for stats in self.op_stats.values()),
+            "ops": ops,
+            "matchers": {
+                name: {"calls": stats["calls"], "total_time": stats["time"], "mean_time": stats["time"] / stats["calls"]}
+                for name, stats in sorted(self.matcher_stats.items())
+            },
+            "unregistered_ops": dict(self.unregistered_ops),
+            "unused_entries": unused_entries,
+        }
+
+    def print_report(self, summary=None):
+        """
+        输出统计报告。
+        """
+        if summary is None:
+            summary = self.summary()
+        print(f"[data_based_kernel_finder] 共 {summary['queries']} 次查询")
+        print(f"{'op'.ljust(20)}{'queries'.rjust(8)}{'exact'.rjust(8)}{'fuzzy'.rjust(8)}{'empty'.rjust(8)}{'miss'.rjust(8)}"
+              f"{'used/db'.rjust(12)}{'scan_avg'.rjust(10)}{'score_p50'.rjust(11)}{'score_min'.rjust(11)}")
+        for op_name, stats in summary["ops"].items():
+            score = stats["score"]
+            p50 = f"{score['p50']:.3f}" if score else "-"
+            score_min = f"{score['min']:.3f}" if score else "-"
+            used = f"{stats['used_entries']}/{stats['db_entries']}"
+            print(f"{op_name.ljust(20)}{stats['queries']:>8}{stats['exact']:>8}{stats['fuzzy']:>8}{stats['empty']:>8}{stats['miss']:>8}"
+                  f"{used:>12}{stats['candidates_scanned']['mean']:>10.1f}{p50:>11}{score_min:>11}")
+
+        print("[data_based_kernel_finder] 匹配函数耗时:")
+        for name, stats in summary["matchers"].items():
+            print(f"    {name.ljust(28)} 调用 {stats['calls']} 次，共 {stats['total_time'] * 1e3:.3f} ms，平均 {stats['mean_time'] * 1e6:.1f} us")
+
+        if summary["unregistered_ops"]:
+            wout.simple(f"[data_based_kernel_finder] 未注册的算子类型: {summary['unregistered_ops']}")
+
+        unused_count = sum(len(entries) for entries in summary["unused_entries"].values())
+        print(f"[data_based_kernel_finder] 规则库中从未被选中的条目: {unused_count} 个")
+        for op_name, entries in summary["unused_entries"].items():
+            print(f"    {op_name}: {len(entries)} 个")
+
+    def save_json(self, file_path, summary=None):
+        """
+        将统计结果保存为 Json 文件。
+        """
+        if summary is None:
+            summary = self.summary()
+        with open(file_path, "w") as f:
+            json.dump(summary, f, indent=4)
+        print(f"[data_based_kernel_finder] 匹配统计已保存到 {file_path}")
+
+
+_profiler = None
+
+def enable_profiling(profiler=None):
+    """
+    启用匹配统计。
+
+    Args:
+        `profiler` (MatchProfiler): 记录统计的对象，为 None 时新建。
+
+    Returns:
+        MatchProfiler: 当前使用的统计对象。
+    """
+    global _profiler
+    _profiler = profiler if profiler is not None else MatchProfiler()
+    return _profiler
+
+def disable_profiling():
+    """
+    停用匹配统计。
+
+    Returns:
+        MatchProfiler: 停用前使用的统计对象，未启用时为 None。
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
 
 def find_best_match_kernels(data, node_info):
     """
@@ -455,5 +953,8 @@ def find_best_match_kernels(data, node_info):
         list: 找到的算子列表。空列表标识找到的结果就是空列表，即不真正调用 kernel；为 None 则表示异常或者没有找到。
     """
     op_name = node_info["op_name"]
-    output(f"[data_based_kernel_finder] 寻找 {node_info["op_name"]} {node_info["node_name"]} 算子匹配的 kernel 序列。", 3)
-    return op_func_dict.get(op_name, undefined_find_kernel)(data.get(op_name), node_info)
+    output(f"[data_based_kernel_finder] 寻找 {node_info['op_name']} {node_info['node_name']} 算子匹配的 kernel 序列。", 3)
+    find_kernel, op_data_list = _resolve_matcher(data, op_name)
+    if _profiler is not None:
+        return _profiler.profile_query(find_kernel, data, op_data_list, node_info)
+    return find_kernel(op_data_list, node_info)
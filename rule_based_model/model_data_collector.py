@@ -5,6 +5,7 @@ from utils import trace_file_parser as tfp
 import sys
 from utils import warning_output as wout
 from utils import pairs_ncu_integrator as pni
+from utils.trace_index import TraceIndex
 """
 用于生成基于规则的分析模型使用的数据，目前仅仅基于跟踪文件，目标为 kernel 序列和其 block 和 grid 数，
 后续可能考虑结合 Nsys 或者 Ncu 的数据，进行对应，让 kernel 数据更为完整和丰富。
@@ -33,7 +34,7 @@ def build_data_from_single_trace_file(trace_file_path, batch_size=1, ncu_csv_pat
     node_kernel_pairs = tfp.get_pairs_from_trace_file(trace_file_path)
     if ncu_csv_path is not None:
         node_kernel_pairs = pni.fill_pairs_with_ncu(node_kernel_pairs, ncu_csv_path)
-    op_name_2_pairs_dict = tfp.divide_pairs_by_op_name(node_kernel_pairs)
+    op_name_2_pairs_dict = TraceIndex(node_kernel_pairs).by_op_name
 
     if op_name_2_pairs_dict is None or len(op_name_2_pairs_dict) == 0:
         wout.error("[model_data_collector] No pairs found from trace file {trace_file_path}.")
@@ -66,7 +67,7 @@ def build_data_from_single_trace_file(trace_file_path, batch_size=1, ncu_csv_pat
             
     return data
 
-def save_data_to_json(output_file_path, data, gpu, description, version):
+def save_data_to_json(output_file_path, data, gpu, description, version, conv_algo_search="EXHAUSTIVE"):
     """
     将数据保存到 json 文件中。
 
@@ -80,9 +81,11 @@ def save_data_to_json(output_file_path, data, gpu, description, version):
                     - "output_shape_{idx}": 输出形状，下标始于 0。
         `gpu` (str): GPU 名称。
         `version` (str): 数据版本。
+        `conv_algo_search` (str): 采集时 CUDA EP 的 cudnn_conv_algo_search 设置，默认为 ORT 的默认值 "EXHAUSTIVE"。
     """
     data_save = {
         "gpu": gpu,
+        "conv_algo_search": conv_algo_search,
         "version": version,
         "data": data,
         "description": description,
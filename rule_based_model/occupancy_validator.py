@@ -0,0 +1,171 @@
+import argparse
+import json
+import numpy as np
+import pandas as pd
+from rule_based_model import GPU_performance_calculator as gpc
+from utils import warning_output as wout
+"""
+用 ncu 的 Occupancy 数据验证 GPU_performance_calculator.estimate_occupancy。
+
+对每个 kernel，以 ncu 报告的线程块大小、每线程寄存器数、每线程块共享内存与共享内存配置大小为输入计算理论占用率，
+与 ncu 的 Block Limit SM / Registers / Shared Mem / Warps、Theoretical Active Warps per SM 与 Theoretical Occupancy 逐项比较。
+全部一致时，对预测得到的 kernel 启动参数可以不经 profiling 直接估计占用率。
+
+数据来源：
+    - ncu 导出的 CSV（与 pairs_ncu_integrator 使用的格式相同），设备取自 "CC" 列；
+    - model_data_collector 保存的规则库 Json，kernel 带有 "ncu" 字段，设备取自文件中的 "gpu"。
+"""
+
+# estimate_occupancy 的返回字段 -> ncu 指标名称
+OCCUPANCY_METRICS = {
+    "block_limit_sm": "Block Limit SM",
+    "block_limit_registers": "Block Limit Registers",
+    "block_limit_shared_mem": "Block Limit Shared Mem",
+    "block_limit_warps": "Block Limit Warps",
+    "active_warps": "Theoretical Active Warps per SM",
+    "occupancy": "Theoretical Occupancy",
+}
+
+# 作为输入的 ncu 指标
+INPUT_METRICS = [
+    "Block Size",
+    "Registers Per Thread",
+    "Static Shared Memory Per Block",
+    "Dynamic Shared Memory Per Block",
+    "Shared Memory Configuration Size",
+]
+
+def _make_table(rows):
+    """
+    由 [{"id", "kernel_name", "device", 指标名称: 数值, ...}] 构造验证用的表格，共享内存已转换为字节。
+    """
+    table = pd.DataFrame(rows)
+    table["shared_mem_per_block"] = table["Static Shared Memory Per Block"] + table["Dynamic Shared Memory Per Block"]
+    return table
+
+
+def load_ncu_csv(ncu_csv_path):
+    """
+    读取 ncu CSV 中验证所需的指标，每个 kernel 一行。
+
+    Returns:
+        pandas.DataFrame: 列为 "id"、"kernel_name"、"device" 与 INPUT_METRICS、OCCUPANCY_METRICS 中的指标。
+    """
+    df = pd.read_csv(ncu_csv_path)
+    metric_names = INPUT_METRICS + list(OCCUPANCY_METRICS.values())
+    df = df[df["Metric Name"].isin(metric_names)]
+
+    rows = {}
+    for kernel_id, kernel_name, cc, metric_name, metric_value, metric_unit in zip(
+        df["ID"].tolist(), df["Kernel Name"].tolist(), df["CC"].tolist(),
+        df["Metric Name"].tolist(), df["Metric Value"].tolist(), df["Metric Unit"].tolist()
+    ):
+        row = rows.setdefault(kernel_id, {"id": kernel_id, "kernel_name": kernel_name, "device": str(cc)})
+        if "Shared Mem" in metric_name and "Block Limit" not in metric_name:
+            row[metric_name] = gpc.parse_ncu_bytes(metric_name, metric_value, metric_unit)
+        else:
+            row[metric_name] = gpc.parse_ncu_number(metric_value)
+
+    incomplete = [kernel_id for kernel_id, row in rows.items() if any(name not in row for name in metric_names)]
+    if incomplete:
+        wout.simple(f"[occupancy_validator] {len(incomplete)} 个 kernel 缺少 LaunchStats 或 Occupancy 指标，已跳过")
+    return _make_table([row for kernel_id, row in rows.items() if kernel_id not in incomplete])
+
+
+def load_rule_data(rule_data_path):
+    """
+    读取规则库 Json 中带有 ncu 数据的 kernel，每个 kernel 一行，格式同 load_ncu_csv。
+    """
+    with open(rule_data_path, 'r') as f:
+        raw = json.load(f)
+
+    rows = []
+    metric_names = INPUT_METRICS[1:] + list(OCCUPANCY_METRICS.values())
+    for entries in raw["data"].values():
+        for entry in entries:
+            for kernel in entry["kernels"]:
+                ncu = kernel.get("ncu")
+                if not ncu or any(f"{name} Value" not in ncu for name in metric_names):
+                    continue
+                row = {"id": kernel["Index"], "kernel_name": kernel["name"], "device": raw["gpu"],
+                       "Block Size": gpc.get_kernel_block_size(kernel)}
+                for name in metric_names:
+                    if "Shared Mem" in name and "Block Limit" not in name:
+                        row[name] = gpc.parse_ncu_bytes(name, ncu[f"{name} Value"], ncu[f"{name} Unit"])
+                    else:
+                        row[name] = gpc.parse_ncu_number(ncu[f"{name} Value"])
+                rows.append(row)
+    return _make_table(rows)
+
+
+def validate_occupancy(table):
+    """
+    对表格中的全部 kernel 一次计算理论占用率并与 ncu 比较。
+
+    Args:
+        `table` (pandas.DataFrame): load_ncu_csv 或 load_rule_data 的返回值。
+
+    Returns:
+        tuple: (summary, mismatches)
+            - summary (dict): {"kernels", "all_match", "metrics": {ncu 指标名称: 一致的比例}}；
+            - mismatches (pandas.DataFrame): 存在不一致的 kernel，包含输入、ncu 值与计算值（以 "calc_" 为前缀）。
+    """
+    spec = gpc.stack_occupancy_specs(table["device"].tolist())
+    if spec is None:
+        wout.error("[occupancy_validator] 存在未知设备，无法计算占用率")
+
+    result = gpc.estimate_occupancy(
+        table["Block Size"].to_numpy(), table["Registers Per Thread"].to_numpy(),
+        table["shared_mem_per_block"].to_numpy(), spec, table["Shared Memory Configuration Size"].to_numpy())
+
+    matched = np.ones(len(table), dtype=bool)
+    metrics = {}
+    table = table.copy()
+    for key, metric_name in OCCUPANCY_METRICS.items():
+        calculated = result[key] * 100 if key == "occupancy" else result[key]
+        # ncu 的占用率保留两位小数
+        match = np.isclose(calculated, table[metric_name].to_numpy(), atol=0.01)
+        table[f"calc_{metric_name}"] = calculated
+        metrics[metric_name] = float(match.mean()) if len(table) else 1.0
+        matched &= match
+
+    summary = {"kernels": len(table), "all_match": float(matched.mean()) if len(table) else 1.0, "metrics": metrics}
+    return summary, table[~matched]
+
+
+def print_validation_report(summary, mismatches, max_rows=10):
+    print(f"[occupancy_validator] 共 {summary['kernels']} 个 kernel，全部指标一致的比例 {summary['all_match']:.2%}")
+    for metric_name, rate in summary["metrics"].items():
+        print(f"    {metric_name.ljust(36)} {rate:.2%}")
+    if len(mismatches) == 0:
+        return
+    wout.simple(f"[occupancy_validator] {len(mismatches)} 个 kernel 不一致，前 {min(max_rows, len(mismatches))} 个:")
+    for _, row in mismatches.head(max_rows).iterrows():
+        print(f"    ID {row['id']} {str(row['kernel_name'])[:60]} (device {row['device']}, block {int(row['Block Size'])}, "
+              f"reg {int(row['Registers Per Thread'])}, smem {int(row['shared_mem_per_block'])}, config {int(row['Shared Memory Configuration Size'])})")
+        for metric_name in OCCUPANCY_METRICS.values():
+            if not np.isclose(row[metric_name], row[f"calc_{metric_name}"], atol=0.01):
+                print(f"        {metric_name.ljust(36)} ncu {row[metric_name]:g}  calc {row[f'calc_{metric_name}']:g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate the theoretical occupancy calculator against ncu Occupancy metrics.')
+    parser.add_argument('--csv', type=str, nargs='*', default=[], help='ncu CSV files with LaunchStats and Occupancy sections')
+    parser.add_argument('--rule-data', type=str, nargs='*', default=[], help='Rule data json files whose kernels carry ncu data')
+    parser.add_argument('--max-rows', type=int, default=10, help='Maximum mismatching kernels to print')
+    args = parser.parse_args()
+
+    tables = [load_ncu_csv(path) for path in args.csv] + [load_rule_data(path) for path in args.rule_data]
+    if not tables:
+        parser.error("at least one of --csv and --rule-data is required")
+    summary, mismatches = validate_occupancy(pd.concat(tables, ignore_index=True))
+    print_validation_report(summary, mismatches, args.max_rows)
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python3 ./rule_based_model/occupancy_validator.py --rule-data ./rule_based_model/data/yolov8n-orto0-ncu.json
+        python3 ./rule_based_model/occupancy_validator.py --csv ./results/ncu/ultralytics-yolov8/yolov8n-orto0-ncu-basic.csv
+    """
+    main()
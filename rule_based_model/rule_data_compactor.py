@@ -0,0 +1,314 @@
+import argparse
+import json
+import time
+from collections import defaultdict
+from rule_based_model import data_based_kernel_finder as dbkf
+from rule_based_model import model_data_collector as mdc
+from utils import warning_output as wout
+"""
+规则库压缩。由多个模型合并得到的规则库（如 n_m、m_l_x）中有大量 kernel 序列相同、形状相近的条目，
+匹配函数每次查询都要全部扫描。
+
+压缩过程：
+    1. 按算子类型，以 (kernel 名称序列, 各 kernel 的 grid 与 block) 为签名对条目聚类，每类先保留第一个条目作为代表；
+    2. 用保留的条目查询其余条目（条目本身的形状作为待测算子），预测签名错误的条目加入代表，重复直到没有新增
+       （condensed nearest neighbor）；
+    3. 留一模型验证：依次去掉一个模型的条目，分别用完整规则库与压缩后的规则库预测该模型的条目，
+       若压缩后的精确匹配率比完整规则库低出 `tolerance` 以上，则对完整规则库预测正确、压缩后预测错误的条目，
+       把完整规则库中匹配到的条目加入代表，重新验证。
+
+精确匹配要求 kernel 名称序列与 grid、block 全部一致，序列匹配只要求名称序列一致，与 trace_file_based_tester 相同。
+"""
+
+# 不参与预测的算子类型，ONNX 算子集之外由 ORT 插入
+SKIPPED_OPS = ("MemcpyFromHost", "MemcpyToHost")
+
+
+def kernel_signature(kernels):
+    """
+    条目的签名：((kernel 名称, (grid_x, grid_y, grid_z), (block_x, block_y, block_z)), ...)。
+    """
+    return tuple(
+        (kernel["name"],
+         tuple(int(kernel["args"][key]) for key in ("grid_x", "grid_y", "grid_z")),
+         tuple(int(kernel["args"][key]) for key in ("block_x", "block_y", "block_z")))
+        for kernel in kernels
+    )
+
+
+def _node_info(op_name, entry):
+    """
+    以条目本身的形状构造待测算子信息。
+    """
+    node_info = {"op_name": op_name, "node_name": entry["node_name"]}
+    for key, value in entry.items():
+        if key.startswith("input_shape_") or key.startswith("output_shape_"):
+            node_info[key] = list(value)
+    return node_info
+
+
+def _copy_for_query(data):
+    """
+    复制条目用于查询。匹配函数会改写候选条目的形状（如 simple_binary_find_kernel 将空形状视为 [1]），
+    在副本上查询使写出的规则库仍是输入的子集；kernel 列表不复制，以便由查询结果找回条目。
+    """
+    return {
+        op_name: [{key: list(value) if key.startswith(("input_shape_", "output_shape_")) else value for key, value in entry.items()}
+                  for entry in entries]
+        for op_name, entries in data.items()
+    }
+
+
+class _Evaluator:
+    """
+    在规则库的子集上查询条目。子集以条目下标集合表示，查询结果为命中的条目下标，未找到时为 None。
+    """
+
+    def __init__(self, data):
+        self.data = _copy_for_query(data)
+        self.signatures = {op_name: [kernel_signature(entry["kernels"]) for entry in entries] for op_name, entries in data.items()}
+        self._kernels_2_entry = {
+            op_name: {id(entry["kernels"]): idx for idx, entry in enumerate(entries)} for op_name, entries in data.items()
+        }
+
+    def predict(self, op_name, query_idx, subset):
+        """
+        用 `subset` 中的条目预测 `query_idx` 条目的 kernel 序列。
+
+        Returns:
+            tuple: (预测的签名, 命中的条目下标)，未找到时为 (None, None)，预测结果为空序列时为 ((), None)。
+        """
+        if not subset:
+            return None, None
+        entries = self.data[op_name]
+        sub_data = {op_name: [entries[idx] for idx in sorted(subset)]}
+        result = dbkf.find_best_match_kernels(sub_data, _node_info(op_name, entries[query_idx]))
+        if result is None:
+            return None, None
+        return kernel_signature(result), self._kernels_2_entry[op_name].get(id(result))
+
+
+def _silent(func):
+    """
+    评估时关闭 data_based_kernel_finder 的逐 kernel 输出。
+    """
+    def wrapper(*args, **kwargs):
+        output_value = dbkf.output_value
+        dbkf.output_value = 0
+        try:
+            return func(*args, **kwargs)
+        finally:
+            dbkf.output_value = output_value
+    return wrapper
+
+
+def cluster_entries(data):
+    """
+    按签名聚类。
+
+    Returns:
+        dict: {算子类型: {签名: [条目下标, ...]}}
+    """
+    clusters = {}
+    for op_name, entries in data.items():
+        op_clusters = defaultdict(list)
+        for idx, entry in enumerate(entries):
+            op_clusters[kernel_signature(entry["kernels"])].append(idx)
+        clusters[op_name] = dict(op_clusters)
+    return clusters
+
+
+def _condense(evaluator, op_name, indices, max_passes):
+    """
+    在 `indices` 范围内选择代表条目，使其余条目都能被预测为正确的签名。
+    """
+    signatures = evaluator.signatures[op_name]
+    kept = set()
+    seen = set()
+    for idx in indices:
+        if signatures[idx] not in seen:
+            seen.add(signatures[idx])
+            kept.add(idx)
+
+    for _ in range(max_passes):
+        added = False
+        for idx in indices:
+            if idx in kept:
+                continue
+            predicted, _ = evaluator.predict(op_name, idx, kept)
+            if predicted != signatures[idx]:
+                kept.add(idx)
+                added = True
+        if not added:
+            break
+    return kept
+
+
+def _leave_one_model_out(evaluator, op_name, kept):
+    """
+    留一模型验证。
+
+    Returns:
+        tuple: ({"queries", "full_exact", "full_sequence", "compact_exact", "compact_sequence"}, 需要补充的条目下标集合)
+    """
+    entries = evaluator.data[op_name]
+    signatures = evaluator.signatures[op_name]
+    model_2_indices = defaultdict(list)
+    for idx, entry in enumerate(entries):
+        model_2_indices[entry.get("model")].append(idx)
+
+    stats = {"queries": 0, "full_exact": 0, "full_sequence": 0, "compact_exact": 0, "compact_sequence": 0}
+    missing = set()
+    if len(model_2_indices) < 2:
+        return stats, missing
+
+    for model, query_indices in model_2_indices.items():
+        train = set(range(len(entries))) - set(query_indices)
+        compact_train = train & kept
+        for idx in query_indices:
+            truth = signatures[idx]
+            truth_names = tuple(kernel[0] for kernel in truth)
+            full_predicted, full_hit = evaluator.predict(op_name, idx, train)
+            compact_predicted, _ = evaluator.predict(op_name, idx, compact_train)
+
+            stats["queries"] += 1
+            full_exact = full_predicted == truth
+            stats["full_exact"] += full_exact
+            stats["full_sequence"] += full_predicted is not None and tuple(kernel[0] for kernel in full_predicted) == truth_names
+            compact_exact = compact_predicted == truth
+            stats["compact_exact"] += compact_exact
+            stats["compact_sequence"] += compact_predicted is not None and tuple(kernel[0] for kernel in compact_predicted) == truth_names
+
+            if full_exact and not compact_exact:
+                if full_hit is None:
+                    # 如空 kernel 序列的算子，匹配函数返回的不是条目本身，补充任一签名相同的条目
+                    full_hit = next((train_idx for train_idx in sorted(train) if signatures[train_idx] == truth), None)
+                if full_hit is not None:
+                    missing.add(full_hit)
+    return stats, missing
+
+
+@_silent
+def compact_data(data, tolerance=0.0, max_passes=5):
+    """
+    压缩规则库。
+
+    Args:
+        `data` (dict): 规则库数据，data_based_kernel_finder.load_json_data 的返回值。
+        `tolerance` (float): 留一模型验证中每种算子压缩后精确匹配率允许的下降，取值 [0, 1]。
+        `max_passes` (int): 选择代表条目以及补充条目的最大轮数。
+
+    Returns:
+        tuple: (压缩后的规则库数据, 报告)，报告为 {算子类型: {"entries", "clusters", "kept", "lomo"}}，
+               "lomo" 为留一模型验证的统计，只有一个模型时查询数为 0。
+    """
+    evaluator = _Evaluator(data)
+    clusters = cluster_entries(data)
+    compacted = {}
+    report = {}
+
+    for op_name, entries in data.items():
+        indices = list(range(len(entries)))
+        if op_name in SKIPPED_OPS:
+            kept = {op_indices[0] for op_indices in clusters[op_name].values()}
+        else:
+            kept = _condense(evaluator, op_name, indices, max_passes)
+
+        lomo = None
+        if op_name not in SKIPPED_OPS:
+            # 补充条目后重新验证，报告中为最后一次验证的结果
+            for pass_idx in range(max_passes + 1):
+                lomo, missing = _leave_one_model_out(evaluator, op_name, kept)
+                if lomo["queries"] == 0 or pass_idx == max_passes:
+                    break
+                delta = (lomo["full_exact"] - lomo["compact_exact"]) / lomo["queries"]
+                if delta <= tolerance or not (missing - kept):
+                    break
+                kept |= missing
+
+        compacted[op_name] = [entries[idx] for idx in sorted(kept)]
+        report[op_name] = {"entries": len(entries), "clusters": len(clusters[op_name]), "kept": len(kept), "lomo": lomo}
+        print(f"[rule_data_compactor] {op_name}: {len(entries)} -> {len(kept)} 个条目，{len(clusters[op_name])} 个签名")
+
+    return compacted, report
+
+
+@_silent
+def time_queries(data, query_data, repeat=3):
+    """
+    以 `query_data` 中每个条目的形状为待测算子，在 `data` 上查询，返回最短的一轮耗时（秒）。
+    """
+    data = _copy_for_query(data)
+    queries = [
+        _node_info(op_name, entry)
+        for op_name, entries in query_data.items() if op_name not in SKIPPED_OPS
+        for entry in entries
+    ]
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for node_info in queries:
+            dbkf.find_best_match_kernels(data, dict(node_info))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def print_report(report, full_time, compact_time):
+    """
+    输出压缩报告：条目数、留一模型验证的准确率变化与查询加速比。
+    """
+    total = {"entries": 0, "kept": 0, "queries": 0, "full_exact": 0, "compact_exact": 0, "full_sequence": 0, "compact_sequence": 0}
+    print(f"{'op'.ljust(20)}{'entries'.rjust(9)}{'clusters'.rjust(10)}{'kept'.rjust(7)}{'lomo_full'.rjust(11)}{'lomo_compact'.rjust(14)}")
+    for op_name, stats in report.items():
+        total["entries"] += stats["entries"]
+        total["kept"] += stats["kept"]
+        lomo = stats["lomo"]
+        if lomo is not None and lomo["queries"]:
+            for key in ("queries", "full_exact", "compact_exact", "full_sequence", "compact_sequence"):
+                total[key] += lomo[key]
+            full = f"{lomo['full_exact']}/{lomo['queries']}"
+            compact = f"{lomo['compact_exact']}/{lomo['queries']}"
+        else:
+            full = compact = "-"
+        print(f"{op_name.ljust(20)}{stats['entries']:>9}{stats['clusters']:>10}{stats['kept']:>7}{full:>11}{compact:>14}")
+
+    print(f"[rule_data_compactor] 条目数: {total['entries']} -> {total['kept']}")
+    if total["queries"]:
+        queries = total["queries"]
+        print(f"[rule_data_compactor] 留一模型精确匹配率: {total['full_exact'] / queries:.2%} -> {total['compact_exact'] / queries:.2%}，"
+              f"序列匹配率: {total['full_sequence'] / queries:.2%} -> {total['compact_sequence'] / queries:.2%}")
+    else:
+        wout.simple("[rule_data_compactor] 规则库只包含一个模型，无法进行留一模型验证")
+    print(f"[rule_data_compactor] 查询耗时: {full_time * 1e3:.2f} ms -> {compact_time * 1e3:.2f} ms，"
+          f"加速比 {full_time / compact_time if compact_time > 0 else float('inf'):.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact a rule database by clustering redundant entries.')
+    parser.add_argument('input', type=str, help='Path to the rule database json')
+    parser.add_argument('output', type=str, help='Path to the compacted rule database json')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='Allowed drop of leave-one-model-out exact match rate')
+    parser.add_argument('--max-passes', type=int, default=5, help='Maximum passes when selecting representative entries')
+    args = parser.parse_args()
+
+    with open(args.input, 'r') as f:
+        raw = json.load(f)
+    data = dbkf.load_json_data(args.input)
+
+    compacted, report = compact_data(data, args.tolerance, args.max_passes)
+    full_time = time_queries(data, data)
+    compact_time = time_queries(compacted, data)
+    print_report(report, full_time, compact_time)
+
+    description = f"{raw.get('description', '')} compacted from {args.input} with tolerance {args.tolerance}."
+    mdc.save_data_to_json(args.output, compacted, raw.get("gpu"), description.strip(), raw["version"],
+                          raw.get("conv_algo_search", "EXHAUSTIVE"))
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python3 ./rule_based_model/rule_data_compactor.py ./rule_based_model/data/multi-yolov8/yolov8m_l_x-orto0-ncu.json ./rule_based_model/data/multi-yolov8/yolov8m_l_x-orto0-ncu-compact.json --tolerance 0.01
+    """
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+from collections import defaultdict
+from rule_based_model import data_based_kernel_finder as dbkf
+from rule_based_model import GPU_performance_calculator as gpc
+from rule_based_model import model_data_collector as mdc
+from utils import warning_output as wout
+"""
+跨 GPU 的规则库。不同 GPU 以及不同的 cudnn_conv_algo_search 设置下，同一 Conv 算子选择的 kernel 序列不同
+（见 plotter/conv_search_across_gpu.py），因此规则库按 (GPU 型号, 算法搜索模式) 分区保存。
+
+规则库为一个目录：
+    - manifest.json：分区清单，每个分区记录 GPU 名称、型号、架构、计算能力、算法搜索模式、文件名与各算子条目数；
+    - 每个分区一个 Json 文件，格式与 model_data_collector.save_data_to_json 相同，可以单独使用。
+
+打开规则库时只读取清单，分区在第一次查询时才加载。查询时给出目标 GPU 与算法搜索模式，没有对应分区时，
+在同一模式的分区中选择计算能力最接近的 GPU（相同时优先同一主版本、其次较低版本），仍没有时忽略模式。
+"""
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = "1.0"
+
+# cudnn_conv_algo_search 的取值，ORT 默认为 EXHAUSTIVE
+CONV_ALGO_SEARCH_MODES = ("EXHAUSTIVE", "HEURISTIC", "DEFAULT")
+
+
+def _compute_capability_value(compute_capability):
+    major, minor = compute_capability
+    return major * 10 + minor
+
+
+class PartitionedRuleData:
+    """
+    按 GPU 型号与算法搜索模式分区的规则库。
+
+    Args:
+        `db_dir` (str): 规则库目录，不存在时视为空规则库。
+    """
+
+    def __init__(self, db_dir):
+        self.db_dir = db_dir
+        self.partitions = []
+        self._loaded = {}
+
+        manifest_path = os.path.join(db_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            for partition in manifest["partitions"]:
+                partition["compute_capability"] = tuple(partition["compute_capability"])
+                self.partitions.append(partition)
+
+    def save_manifest(self):
+        os.makedirs(self.db_dir, exist_ok=True)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "partitions": [dict(partition, compute_capability=list(partition["compute_capability"])) for partition in self.partitions],
+        }
+        with open(os.path.join(self.db_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=4)
+
+    def _find_partition(self, gpu_model, conv_algo_search):
+        for partition in self.partitions:
+            if partition["gpu_model"] == gpu_model and partition["conv_algo_search"] == conv_algo_search:
+                return partition
+        return None
+
+    def resolve(self, gpu, conv_algo_search="EXHAUSTIVE", compute_capability=None):
+        """
+        选择与目标设备最匹配的分区。
+
+        Args:
+            `gpu` (str): 目标 GPU 名称，如 "Tesla T4"。
+            `conv_algo_search` (str): 目标的 cudnn_conv_algo_search 设置。
+            `compute_capability` (tuple): 目标的计算能力，如 (7, 5)，为 None 时从 GPU 规格表获取。
+
+        Returns:
+            dict: 分区信息，规则库为空或无法确定目标计算能力且没有完全一致的分区时返回 None。
+        """
+        gpu_model = gpc.get_gpu_model(gpu)
+        partition = self._find_partition(gpu_model, conv_algo_search)
+        if partition is not None:
+            return partition
+
+        if compute_capability is None:
+            spec = gpc.get_gpu_spec(gpu)
+            if spec is None:
+                wout.simple(f"[rule_data_partitions] 无法确定 {gpu} 的计算能力，请指定 compute_capability")
+                return None
+            compute_capability = spec["compute_capability"]
+        target = _compute_capability_value(compute_capability)
+
+        def distance(partition):
+            value = _compute_capability_value(partition["compute_capability"])
+            return abs(value - target), partition["compute_capability"][0] != compute_capability[0], value > target
+
+        candidates = [partition for partition in self.partitions if partition["conv_algo_search"] == conv_algo_search]
+        if not candidates:
+            candidates = self.partitions
+            if candidates:
+                wout.simple(f"[rule_data_partitions] 规则库中没有 {conv_algo_search} 模式的分区，忽略算法搜索模式")
+        if not candidates:
+            wout.simple(f"[rule_data_partitions] 规则库 {self.db_dir} 为空")
+            return None
+
+        partition = min(candidates, key=distance)
+        wout.simple(f"[rule_data_partitions] 没有 {gpu} {conv_algo_search} 的分区，使用计算能力最接近的 "
+                    f"{partition['gpu']} {partition['conv_algo_search']}")
+        return partition
+
+    def load_partition(self, partition):
+        """
+        加载分区数据，已加载的分区直接返回。
+        """
+        file_name = partition["file"]
+        if file_name not in self._loaded:
+            self._loaded[file_name] = dbkf.load_json_data(os.path.join(self.db_dir, file_name))
+        return self._loaded[file_name]
+
+    def get_data(self, gpu, conv_algo_search="EXHAUSTIVE", compute_capability=None):
+        """
+        获取目标设备对应分区的数据，格式与 data_based_kernel_finder.load_json_data 的返回值相同，没有可用分区时返回 None。
+        """
+        partition = self.resolve(gpu, conv_algo_search, compute_capability)
+        if partition is None:
+            return None
+        return self.load_partition(partition)
+
+    def find_best_match_kernels(self, node_info, gpu, conv_algo_search="EXHAUSTIVE", compute_capability=None):
+        """
+        在目标设备对应的分区中寻找算子最为匹配的 kernel 序列，参数与返回值见 data_based_kernel_finder.find_best_match_kernels。
+        """
+        data = self.get_data(gpu, conv_algo_search, compute_capability)
+        if data is None:
+            return None
+        return dbkf.find_best_match_kernels(data, node_info)
+
+    def add_data_file(self, data_file_path, conv_algo_search=None):
+        """
+        将 model_data_collector 保存的 Json 文件加入规则库，已有相同 (GPU 型号, 算法搜索模式) 的分区时合并条目。
+
+        Args:
+            `data_file_path` (str): Json 文件路径。
+            `conv_algo_search` (str): 算法搜索模式，为 None 时取文件中的记录，没有记录时为 "EXHAUSTIVE"。
+
+        Returns:
+            dict: 写入的分区信息。
+        """
+        with open(data_file_path, 'r') as f:
+            raw = json.load(f)
+        data = dbkf.load_json_data(data_file_path)
+
+        gpu = raw.get("gpu")
+        if conv_algo_search is None:
+            conv_algo_search = raw.get("conv_algo_search", "EXHAUSTIVE")
+        if conv_algo_search not in CONV_ALGO_SEARCH_MODES:
+            wout.error(f"[rule_data_partitions] 未知的算法搜索模式: {conv_algo_search}")
+        spec = gpc.get_gpu_spec(gpu)
+        if spec is None:
+            wout.error(f"[rule_data_partitions] {data_file_path} 的 GPU {gpu} 不在规格表中，无法确定计算能力")
+        gpu_model = gpc.get_gpu_model(gpu)
+
+        partition = self._find_partition(gpu_model, conv_algo_search)
+        if partition is None:
+            partition = {
+                "gpu": gpu,
+                "gpu_model": gpu_model,
+                "architecture": spec["architecture"],
+                "compute_capability": spec["compute_capability"],
+                "conv_algo_search": conv_algo_search,
+                "file": f"{gpu_model.replace(' ', '_')}-{conv_algo_search.lower()}.json",
+                "version": raw["version"],
+                "description": raw.get("description", ""),
+            }
+            self.partitions.append(partition)
+            merged = defaultdict(list)
+        else:
+            print(f"[rule_data_partitions] 合并到已有分区 {partition['file']}")
+            merged = defaultdict(list, self.load_partition(partition))
+            partition["description"] = f"{partition['description']} {raw.get('description', '')}".strip()
+
+        for op_name, entries in data.items():
+            merged[op_name].extend(entries)
+        merged = dict(merged)
+        partition["ops"] = {op_name: len(entries) for op_name, entries in merged.items()}
+
+        os.makedirs(self.db_dir, exist_ok=True)
+        mdc.save_data_to_json(os.path.join(self.db_dir, partition["file"]), merged, gpu, partition["description"],
+                              partition["version"], conv_algo_search)
+        self._loaded[partition["file"]] = merged
+        self.save_manifest()
+        return partition
+
+    def print_partitions(self):
+        print(f"[rule_data_partitions] 规则库 {self.db_dir} 共 {len(self.partitions)} 个分区")
+        for partition in self.partitions:
+            major, minor = partition["compute_capability"]
+            entries = sum(partition.get("ops", {}).values())
+            print(f"    {partition['gpu'].ljust(28)} {partition['architecture'].ljust(8)} sm_{major}{minor} "
+                  f"{partition['conv_algo_search'].ljust(10)} {entries} 个条目  {partition['file']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage a rule database partitioned by GPU and cuDNN conv algo search mode.')
+    parser.add_argument('db_dir', type=str, help='Directory of the partitioned rule database')
+    parser.add_argument('--add', type=str, nargs='+', default=[], help='Rule data json files to add')
+    parser.add_argument('--conv-algo-search', type=str, choices=CONV_ALGO_SEARCH_MODES, default=None,
+                        help='Conv algo search mode of the added files, defaults to the one recorded in each file')
+    parser.add_argument('--resolve', type=str, default=None, help='Show the partition used for the given GPU name')
+    args = parser.parse_args()
+
+    db = PartitionedRuleData(args.db_dir)
+    for data_file_path in args.add:
+        db.add_data_file(data_file_path, args.conv_algo_search)
+    db.print_partitions()
+
+    if args.resolve is not None:
+        partition = db.resolve(args.resolve, args.conv_algo_search or "EXHAUSTIVE")
+        if partition is not None:
+            print(f"[rule_data_partitions] {args.resolve} -> {partition['file']}")
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python3 ./rule_based_model/rule_data_partitions.py ./rule_based_model/data/partitioned --add ./rule_based_model/data/yolov8n-orto0-ncu.json
+        python3 ./rule_based_model/rule_data_partitions.py ./rule_based_model/data/partitioned --resolve "Tesla T4" --conv-algo-search HEURISTIC
+    """
+    main()
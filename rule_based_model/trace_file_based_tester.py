@@ -1,4 +1,6 @@
+import os
 from rule_based_model import data_based_kernel_finder as dbkf
+from rule_based_model.rule_data_partitions import PartitionedRuleData
 from utils import warning_output as wout
 from utils import trace_file_parser as tfp
 
@@ -76,18 +78,31 @@ def judge_kernel_match_verbose(result_kernels, real_kernels):
 
     
 
-def trace_file_based_test(predicting_trace_file_path, rule_model_data_path, op_list=None):
+def trace_file_based_test(predicting_trace_file_path, rule_model_data_path, op_list=None, profile_json_path=None,
+                          gpu=None, conv_algo_search="EXHAUSTIVE"):
     """
     使用跟踪文件来测试基于规则的分析模型，并给出详细输出。
 
     Args:
         `predicting_trace_file_path` (str): 预测的跟踪文件路径。
-        `rule_model_data_path` (str): 规则模型数据路径。
+        `rule_model_data_path` (str): 规则模型数据路径，为目录时视为按 GPU 分区的规则库（见 rule_data_partitions）。
         `op_list` (list): 运算符列表，默认为 None，表示使用所有运算符（除内存操作）。
+        `profile_json_path` (str): 非空时统计规则库的匹配情况，输出报告并保存到该 Json 文件。
+        `gpu` (str): 目标 GPU 名称，使用分区规则库时必须指定。
+        `conv_algo_search` (str): 目标的 cudnn_conv_algo_search 设置，仅用于分区规则库。
     """
 
     predicting_node_kernel_pairs = tfp.get_pairs_from_trace_file(predicting_trace_file_path)
-    rule_model_data = dbkf.load_json_data(rule_model_data_path)
+    if os.path.isdir(rule_model_data_path):
+        if gpu is None:
+            wout.error("[trace_file_based_tester] 使用分区规则库时需要指定目标 GPU")
+        rule_model_data = PartitionedRuleData(rule_model_data_path).get_data(gpu, conv_algo_search)
+        if rule_model_data is None:
+            wout.error(f"[trace_file_based_tester] 规则库 {rule_model_data_path} 中没有可用于 {gpu} 的分区")
+    else:
+        rule_model_data = dbkf.load_json_data(rule_model_data_path)
+    if profile_json_path is not None:
+        profiler = dbkf.enable_profiling()
 
     # 准确率计数器
     total_node_cnt = 0
@@ -142,6 +157,12 @@ def trace_file_based_test(predicting_trace_file_path, rule_model_data_path, op_l
     print(f"精确匹配: {exact_match_node_cnt} / {total_node_cnt}")
     print(f"序列匹配: {sequence_match_node_cnt} / {total_node_cnt}")
 
+    if profile_json_path is not None:
+        dbkf.disable_profiling()
+        summary = profiler.summary()
+        profiler.print_report(summary)
+        profiler.save_json(profile_json_path, summary)
+
     return f"{exact_match_node_cnt}/{total_node_cnt}", f"{sequence_match_node_cnt}/{total_node_cnt}"
 
 if __name__ == "__main__":
@@ -169,4 +190,5 @@ if __name__ == "__main__":
     rule_model_data_path = "./rule_based_model/data/single-yolov8/yolov8n-orto0-ncu.json"
     op_list = ['Reshape', 'Resize', 'Shape', 'Gather']
 
+    # 统计规则库的覆盖与命中情况，可追加参数 profile_json_path="./results/rule_db_profile.json"
     trace_file_based_test(predicting_trace_file_path, rule_model_data_path, op_list=None)
\ No newline at end of file
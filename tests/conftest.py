@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试以仓库根目录为工作目录导入 utils 等模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
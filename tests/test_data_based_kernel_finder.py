@@ -0,0 +1,44 @@
+import pytest
+from rule_based_model import data_based_kernel_finder as dbkf
+
+"""
+data_based_kernel_finder 在规则库缺少数据时的匹配函数选择与返回值。
+"""
+
+SHAPE = [1, 16, 8, 8]
+
+SELECTING_OP_NAMES = sorted(
+    {op_name for op_name, func in dbkf.op_func_dict.items() if func not in dbkf._NON_SELECTING_MATCHERS} | set(dbkf.op_family_dict)
+)
+
+
+def _node_info(op_name):
+    node_info = {"op_name": op_name, "node_name": f"/{op_name}", "output_shape_0": list(SHAPE)}
+    for idx in range(4):
+        node_info[f"input_shape_{idx}"] = list(SHAPE)
+    return node_info
+
+
+def _entry(op_name, kernel_name):
+    entry = _node_info(op_name)
+    del entry["op_name"]
+    entry.update(model="m", kernels=[{"name": kernel_name}])
+    return entry
+
+
+@pytest.mark.parametrize("op_name", SELECTING_OP_NAMES)
+def test_empty_data_returns_none(op_name):
+    assert dbkf.find_best_match_kernels({}, _node_info(op_name)) is None
+
+
+def test_dedicated_matcher_borrows_family_data():
+    # Add 有专用匹配函数，规则库中没有 Add 时使用逐元素类别中其他算子的数据
+    data = {"Mul": [_entry("Mul", "mul_kernel")]}
+    find_kernel, op_data_list = dbkf._resolve_matcher(data, "Add")
+    assert find_kernel is dbkf.elementwise_nary_find_kernel
+    assert dbkf.find_best_match_kernels(data, _node_info("Add")) == [{"name": "mul_kernel"}]
+
+
+def test_dedicated_matcher_without_family_keeps_matcher():
+    assert dbkf._resolve_matcher({}, "Concat") == (dbkf.concat_find_kernel, None)
+    assert dbkf._resolve_matcher({}, "Reshape") == (dbkf.empty_find_kernel, None)
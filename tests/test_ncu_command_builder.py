@@ -0,0 +1,71 @@
+import os
+from utils import ncu_command_builder as ncb
+
+"""
+ncu_command_builder 的命令构建、kernel ID 分段与 section 选择。
+"""
+
+
+def _option_values(command, option):
+    return [command[idx + 1] for idx, arg in enumerate(command) if arg == option]
+
+
+def test_default_command():
+    command = ncb.build_ncu_command("./models/yolov8n.onnx")
+    assert command == ["ncu", "--csv", "python3", ncb.DEFAULT_INFERENCE_SCRIPT, "--model", "./models/yolov8n.onnx"]
+
+
+def test_ncu_with_arguments_is_split():
+    command = ncb.build_ncu_command("m.onnx", ncu="python3 ./profile/fake_ncu.py", script="infer.py")
+    assert command[:3] == ["python3", "./profile/fake_ncu.py", "--csv"]
+    assert command[-4:] == ["python3", "infer.py", "--model", "m.onnx"]
+
+
+def test_filter_args_precede_program():
+    ncu_args = ncb.build_filter_args(launch_skip=5, launch_count=3, sections=["LaunchStats"])
+    command = ncb.build_ncu_command("m.onnx", ncu_args=ncu_args)
+    program_start = command.index("python3")
+    assert _option_values(command, "--launch-skip") == ["5"]
+    assert _option_values(command, "--launch-count") == ["3"]
+    assert _option_values(command, "--section") == ["LaunchStats"]
+    assert command.index("--launch-skip") < program_start
+    assert command.index("--section") < program_start
+
+
+def test_output_path_is_absolute_log_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    command = ncb.build_ncu_command("m.onnx", output_path="results dir/out.csv.raw.tmp")
+    assert _option_values(command, "--log-file") == [os.path.join(str(tmp_path), "results dir", "out.csv.raw.tmp")]
+    assert command.index("--log-file") < command.index("python3")
+    # 没有指定输出路径时 ncu 输出到标准输出
+    assert "--log-file" not in ncb.build_ncu_command("m.onnx")
+
+
+def test_filter_args_omit_zero_skip():
+    assert ncb.build_filter_args() == []
+    assert ncb.build_filter_args(launch_skip=0, launch_count=4) == ["--launch-count", "4"]
+
+
+def test_group_kernel_ids():
+    assert ncb.group_kernel_ids([]) == []
+    assert ncb.group_kernel_ids([3, 0, 1, 2]) == [(0, 4)]
+    assert ncb.group_kernel_ids([0, 2, 3, 7]) == [(0, 1), (2, 2), (7, 1)]
+    assert ncb.group_kernel_ids([0, 2, 3, 7], max_gap=1) == [(0, 4), (7, 1)]
+    assert ncb.group_kernel_ids([5, 5, 6]) == [(5, 2)]
+
+
+def test_metric_sections():
+    assert ncb.get_metric_sections(["Duration", "Registers Per Thread", "Memory Throughput"]) == ["SpeedOfLight", "LaunchStats"]
+    # 未知指标时不限制 section
+    assert ncb.get_metric_sections(["Duration", "Unknown Metric"]) is None
+
+
+def test_plan_invocations():
+    assert ncb.plan_invocations() == [([], 0)]
+    assert ncb.plan_invocations(metric_list=["Theoretical Occupancy"]) == [(["--section", "Occupancy"], 0)]
+
+    invocations = ncb.plan_invocations([0, 1, 10], ["Duration"])
+    assert invocations == [
+        (["--launch-count", "2", "--section", "SpeedOfLight"], 0),
+        (["--launch-skip", "10", "--launch-count", "1", "--section", "SpeedOfLight"], 10),
+    ]
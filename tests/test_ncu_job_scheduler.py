@@ -0,0 +1,123 @@
+import json
+import os
+import sys
+import pytest
+from utils import ncu_job_scheduler as njs
+
+"""
+用 profile/fake_ncu.py 代替 ncu 测试 ncu_job_scheduler，不需要 GPU。
+"""
+
+FAKE_NCU = f"{sys.executable} {os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'profile', 'fake_ncu.py')}"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_NCU_KERNELS", "4")
+    for name in ("FAKE_NCU_FAIL", "FAKE_NCU_NO_CSV"):
+        monkeypatch.delenv(name, raising=False)
+    return tmp_path
+
+
+def make_scheduler(workdir, **kwargs):
+    return njs.NcuJobScheduler(str(workdir / "manifest.json"), ncu=FAKE_NCU, **kwargs)
+
+
+def make_jobs(workdir, models=("yolov8n", "yolov8s")):
+    return [njs.make_job(f"./models/{model}.onnx", str(workdir / f"{model}.csv")) for model in models]
+
+
+def read_manifest(workdir):
+    with open(workdir / "manifest.json") as f:
+        return json.load(f)
+
+
+def test_output_preamble_trimmed(workdir):
+    job = make_jobs(workdir, ("yolov8n",))[0]
+    entry = make_scheduler(workdir).run([job])["yolov8n"]
+
+    assert entry["status"] == "done"
+    assert entry["kernels"] == 4
+    with open(job["output"]) as f:
+        lines = f.readlines()
+    assert lines[0].startswith(njs.CSV_HEADER_PREFIX)
+    assert all(line.startswith('"') for line in lines)
+    assert entry["sha256"] == njs.file_sha256(job["output"])
+
+
+def test_resume_skips_done_jobs(workdir):
+    jobs = make_jobs(workdir)
+    assert set(make_scheduler(workdir).run(jobs)) == {"yolov8n", "yolov8s"}
+
+    # 清单与输出一致时全部跳过
+    assert make_scheduler(workdir).run(jobs) == {}
+
+    # 输出被修改后校验和不一致，只重新执行该任务
+    with open(jobs[1]["output"], 'a') as f:
+        f.write('"garbage"\n')
+    assert set(make_scheduler(workdir).run(jobs)) == {"yolov8s"}
+
+
+def test_resume_retries_failed_jobs(workdir, monkeypatch):
+    jobs = make_jobs(workdir)
+    monkeypatch.setenv("FAKE_NCU_FAIL", "1")
+    entries = make_scheduler(workdir).run(jobs)
+    assert all(entry["status"] == "failed" for entry in entries.values())
+
+    monkeypatch.delenv("FAKE_NCU_FAIL")
+    entries = make_scheduler(workdir, concurrency=2).run(jobs)
+    assert all(entry["status"] == "done" for entry in entries.values())
+    assert all(entry["status"] == "done" for entry in read_manifest(workdir).values())
+
+
+def test_unmanifested_output_is_not_adopted(workdir):
+    job = make_jobs(workdir, ("yolov8x",))[0]
+    # 中断的 shell 重定向留下的结果：可以解析，但缺少最后的 kernel
+    with open(job["output"], 'w') as f:
+        f.write("==PROF== Connected to process 1234\n")
+        f.write(",".join(f'"{column}"' for column in ["ID", "Kernel Name", "Metric Name", "Metric Value"]) + "\n")
+        f.write('"0","fake_kernel_0","Duration","1.00"\n')
+
+    entry = make_scheduler(workdir).run([job])["yolov8x"]
+    assert entry["status"] == "done"
+    assert entry["kernels"] == 4
+
+
+def test_failed_job_keeps_previous_output(workdir, monkeypatch):
+    job = make_jobs(workdir, ("yolov8n",))[0]
+    make_scheduler(workdir).run([job])
+    with open(job["output"], 'rb') as f:
+        previous = f.read()
+
+    # 修改过滤条件使任务重新执行，ncu 崩溃时原输出不被覆盖，也不留下临时文件
+    monkeypatch.setenv("FAKE_NCU_FAIL", "1")
+    job = njs.make_job(job["model"], job["output"], metrics=["Duration"])
+    entry = make_scheduler(workdir).run([job])["yolov8n"]
+
+    assert entry["status"] == "failed"
+    assert "fake ncu failure" in entry["error"]
+    with open(entry["log"]) as f:
+        assert "fake ncu failure" in f.read()
+    with open(job["output"], 'rb') as f:
+        assert f.read() == previous
+    assert sorted(os.listdir(workdir)) == ["manifest.json", "yolov8n.csv", "yolov8n.csv.log"]
+
+
+def test_truncated_output_is_failed(workdir, monkeypatch):
+    monkeypatch.setenv("FAKE_NCU_NO_CSV", "1")
+    job = make_jobs(workdir, ("yolov8n",))[0]
+    entry = make_scheduler(workdir).run([job])["yolov8n"]
+
+    assert entry["status"] == "failed"
+    assert not os.path.exists(job["output"])
+
+
+def test_kernel_filter_restores_ids(workdir):
+    job = njs.make_job("./models/yolov8n.onnx", str(workdir / "yolov8n.csv"), kernel_ids=[0, 2, 3], metrics=["Duration"])
+    entry = make_scheduler(workdir).run([job])["yolov8n"]
+
+    assert entry["status"] == "done"
+    assert len(entry["commands"]) == 2
+    with open(job["output"]) as f:
+        rows = f.readlines()[1:]
+    assert [row.split(",")[0] for row in rows] == ['"0"', '"2"', '"3"']
@@ -0,0 +1,77 @@
+import json
+import os
+import pytest
+from utils import trace_file_parser as tfp
+
+"""
+trace_file_parser 的流式读取、kernel 归属与编号。
+"""
+
+TRACE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "yolov8n-orto0.json")
+
+
+def _write_trace(path, events):
+    path.write_text("[\n" + ",\n".join(json.dumps(event) for event in events) + "\n]\n")
+    return str(path)
+
+
+def _node(name, ts, op_name="Add"):
+    return {"cat": "Node", "name": name, "ts": ts, "dur": 1, "args": {"op_name": op_name}}
+
+
+def _kernel(name, ts, parent_name=None, op_name="Add", stream=7):
+    args = {"stream": stream, "grid_x": "1", "grid_y": "1", "grid_z": "1", "block_x": "32", "block_y": "1", "block_z": "1"}
+    if parent_name is not None:
+        args.update(parent_name=parent_name, op_name=op_name)
+    return {"cat": "Kernel", "name": name, "ts": ts, "dur": 1, "args": args}
+
+
+@pytest.mark.parametrize("chunk_size", [64, 4096, tfp.READ_CHUNK_SIZE])
+def test_streamed_events_match_json_load(chunk_size):
+    with open(TRACE_FILE, "r") as f:
+        expected = json.load(f)
+    assert list(tfp.iter_trace_events(TRACE_FILE, chunk_size=chunk_size)) == expected
+
+
+@pytest.mark.parametrize("content", ["", "{}", "[{\"cat\": \"Node\"},", "[{\"cat\": "])
+def test_malformed_trace_raises(tmp_path, content):
+    path = tmp_path / "bad.json"
+    path.write_text(content)
+    with pytest.raises(json.JSONDecodeError):
+        list(tfp.iter_trace_events(str(path), chunk_size=4))
+
+
+def test_typed_and_dict_pairs_agree():
+    pairs = tfp.get_pairs_from_trace_file(TRACE_FILE)
+    typed_pairs = tfp.get_pairs_from_trace_file(TRACE_FILE, typed=True)
+    assert [(pair["Node"]["Index"], [kernel["Index"] for kernel in pair["Kernels"]]) for pair in pairs] == \
+        [(pair.node.index, [kernel.index for kernel in pair.kernels]) for pair in typed_pairs]
+
+    node = typed_pairs[0]["Node"]
+    assert dict(node["args"]) == node.to_dict()["args"]
+    assert node.to_dict()["cat"] == "Node"
+
+
+def test_kernel_index_skips_memcpy_and_counts_dropped(tmp_path):
+    path = _write_trace(tmp_path / "trace.json", [
+        _kernel("orphan", 0),
+        _node("a", 10),
+        _kernel("k0", 11, "a"),
+        _kernel("Memcpy", 12),
+        _kernel("k1", 13, "a"),
+    ])
+    (pair,) = tfp.get_pairs_from_trace_file(path)
+    assert [(kernel["name"], kernel["Index"]) for kernel in pair["Kernels"]] == [("k0", 1), ("Memcpy", -1), ("k1", 2)]
+
+
+def test_interleaved_kernels_follow_parent_name(tmp_path):
+    path = _write_trace(tmp_path / "trace.json", [
+        _node("a", 10),
+        _node("b", 11, "Mul"),
+        _kernel("ka", 12, "a"),
+        _kernel("kb", 13, "b", "Mul"),
+        _node("a", 20),
+        _kernel("ka2", 21, "a"),
+    ])
+    pairs = tfp.get_pairs_from_trace_file(path, typed=True)
+    assert [pair.kernel_names for pair in pairs] == [("ka",), ("kb",), ("ka2",)]
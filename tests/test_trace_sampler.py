@@ -0,0 +1,50 @@
+import pytest
+from utils.trace_sampler import IterationSampler, OpTypeSampler
+
+"""
+trace_sampler 的流式采样：`offer` 的保留与释放、`finish` 的结果与 `sample` 一致。
+"""
+
+# 3 种算子，每次推理 6 个节点
+ITERATION = [("conv0", "Conv"), ("relu0", "Relu"), ("conv1", "Conv"), ("relu1", "Relu"), ("conv2", "Conv"), ("add", "Add")]
+
+
+def _stream(sampler, iterations):
+    """
+    模拟 trace_file_parser：逐个提交节点，只保存被保留的节点，并按 `offer` 的返回释放。
+    """
+    held = {}
+    sampler.begin()
+    for position, (name, op_name) in enumerate(ITERATION * iterations):
+        keep, evicted = sampler.offer(position, name, op_name)
+        for dropped in evicted:
+            del held[dropped]
+        if keep:
+            held[position] = op_name
+    positions, sample_info = sampler.finish()
+    assert set(positions) <= set(held)
+    return positions, sample_info
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_iteration_sampler_keeps_whole_iterations(seed):
+    positions, sample_info = _stream(IterationSampler(2, seed=seed), 10)
+    assert sample_info["total_iterations"] == 10
+    assert len(positions) == 2 * len(ITERATION)
+    iterations = sorted({position // len(ITERATION) for position in positions})
+    assert positions == [idx * len(ITERATION) + offset for idx in iterations for offset in range(len(ITERATION))]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_op_type_sampler_keeps_min_per_op(seed):
+    positions, sample_info = _stream(OpTypeSampler(0.01, seed=seed, min_per_op=2), 20)
+    assert sample_info["population"] == {"Conv": 60, "Relu": 40, "Add": 20}
+    assert all(sample_info["kept"][op_name] >= 2 for op_name in sample_info["population"])
+    assert sample_info["weights"]["Add"] == 20 / sample_info["kept"]["Add"]
+
+
+def test_sample_matches_streaming():
+    pairs = [{"Node": {"name": name, "args": {"op_name": op_name}}, "Kernels": []} for name, op_name in ITERATION * 8]
+    for make_sampler in (lambda: IterationSampler(3, seed=1), lambda: OpTypeSampler(0.3, seed=1)):
+        positions, _ = _stream(make_sampler(), 8)
+        assert make_sampler().sample(pairs) == [pairs[position] for position in positions]
@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils import warning_output as wout
+"""
+推理脚本使用的异步图片流水线。
+图片的读取、解码与预处理在线程池中进行，并通过有界队列提前送入推理循环；结果图片的绘制与保存在单独的写线程中完成，
+使吞吐测量反映流水线本身，而不是串行的磁盘 I/O。
+"""
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# 队列结束标记
+_END = object()
+
+
+def list_images(image_dir):
+    """
+    列出目录下所有图片文件，按文件名排序，保证多次运行的顺序一致。
+
+    Args:
+        `image_dir` (str): 图片目录。
+
+    Returns:
+        list: 图片路径列表。
+    """
+    if not os.path.isdir(image_dir):
+        wout.error(f"[image_pipeline] 目录 {image_dir} 不存在或不是有效目录。")
+
+    return [
+        os.path.join(image_dir, file_name)
+        for file_name in sorted(os.listdir(image_dir))
+        if file_name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+class ImagePrefetcher:
+    """
+    在线程池中读取并预处理图片，按输入顺序将结果放入有界队列，供推理循环迭代。
+
+    迭代得到的每个元素为 `(path, item)`，其中 `item` 为 `load_func(path)` 的返回值。
+    预处理失败的图片会给出警告并跳过，不会中断整个流水线。
+    """
+
+    def __init__(self, image_paths, load_func, num_workers=4, queue_size=8):
+        """
+        Args:
+            `image_paths` (iterable): 图片路径，可以是列表，也可以是持续产生路径的生成器（流式输入）。
+            `load_func` (callable): 读取并预处理单张图片的函数，在工作线程中调用。
+            `num_workers` (int): 线程池大小。
+            `queue_size` (int): 队列容量，同时也是提前预处理的最大图片数，限制内存占用。
+        """
+        self.image_paths = image_paths
+        self.load_func = load_func
+        self.num_workers = max(1, num_workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self._producer = None
+
+    def _produce(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+                # 已提交但未入队的任务数与队列容量共同限制在途图片数量
+                pending = []
+                for path in self.image_paths:
+                    pending.append((path, executor.submit(self.load_func, path)))
+                    if len(pending) >= self.num_workers:
+                        self._put(*pending.pop(0))
+                for path, future in pending:
+                    self._put(path, future)
+        finally:
+            # 输入源出错时也要结束迭代，避免推理循环一直阻塞
+            self.queue.put(_END)
+
+    def _put(self, path, future):
+        try:
+            self.queue.put((path, future.result()))
+        except Exception as e:
+            wout.simple(f"[image_pipeline] 预处理图片 {path} 失败，跳过：{e}")
+
+    def __iter__(self):
+        self._producer = threading.Thread(target=self._produce, daemon=True)
+        self._producer.start()
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                break
+            yield item
+        self._producer.join()
+
+
+class AsyncImageWriter:
+    """
+    在单独线程中完成结果图片的后处理（绘制）与保存，推理循环只负责提交任务。
+    """
+
+    def __init__(self, write_func, queue_size=8):
+        """
+        Args:
+            `write_func` (callable): 处理单个任务的函数，参数为 `submit` 时传入的参数。
+            `queue_size` (int): 队列容量，写线程跟不上时推理循环会在 `submit` 处阻塞。
+        """
+        self.write_func = write_func
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            args = self.queue.get()
+            if args is _END:
+                break
+            try:
+                self.write_func(*args)
+                self.written += 1
+            except Exception as e:
+                wout.simple(f"[image_pipeline] 写出结果失败：{e}")
+
+    def submit(self, *args):
+        self.queue.put(args)
+
+    def close(self):
+        """
+        等待所有已提交的任务完成并结束写线程。
+        """
+        self.queue.put(_END)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
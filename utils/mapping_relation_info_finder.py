@@ -1,6 +1,7 @@
 from collections import defaultdict
 import sys
 from utils import trace_file_parser as tfp
+from utils.trace_index import TraceIndex
 
 def get_relationship_dict(node_kernel_pairs):
     """
@@ -11,6 +12,7 @@ def get_relationship_dict(node_kernel_pairs):
         node_kernel_pairs: 一个列表，列表中的每个元素是一个字典，字典包含两个字段：
                         - "Node": 表示一个算子（Node）的 JSON 对象，其中包含算子的相关信息，如名称、参数大小、输入输出类型和形状等。
                         - "Kernels": 一个列表，包含该算子对应的所有 kernel 的 JSON 对象，这些 kernel 是按顺序排列的，包含 kernel 的名称、运行时长、网格和块大小等信息。
+                        也可以是已建立的 `TraceIndex`，直接使用其中缓存的关联关系分组。
 
     Returns:
         dict: 关联字典，键为三元组 `(op_name, provider, kernel_sequence)`，其中：
@@ -26,19 +28,12 @@ def get_relationship_dict(node_kernel_pairs):
         print(f"[mapping_relation_info_finder] node_kernel_pairs 为空")
         return None
 
-    relation_2_instance_dict = defaultdict(lambda: {'count': 0, 'instances': []})
-
-    for pair in node_kernel_pairs:
-        current_node = pair["Node"]
-        current_kernels = pair["Kernels"]
+    if not isinstance(node_kernel_pairs, TraceIndex):
+        node_kernel_pairs = TraceIndex(node_kernel_pairs)
 
-        op_name = current_node['args']['op_name']
-        provider = current_node['args']['provider']
-        kernel_sequence = [kernel['name'] for kernel in current_kernels]
-
-        key = (op_name, provider, tuple(kernel_sequence))
-        relation_2_instance_dict[key]['count'] += 1
-        relation_2_instance_dict[key]['instances'].append(pair)
+    relation_2_instance_dict = defaultdict(lambda: {'count': 0, 'instances': []})
+    for key, pairs in node_kernel_pairs.by_relation.items():
+        relation_2_instance_dict[key] = {'count': len(pairs), 'instances': pairs}
 
     return relation_2_instance_dict
 
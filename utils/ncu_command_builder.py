@@ -0,0 +1,155 @@
+import os
+import shlex
+from utils import warning_output as wout
+"""
+构建 Nsight Compute 命令行，根据需要的 kernel ID 与指标生成过滤参数，只分析需要的 kernel 与 section。
+
+ncu 的 CSV 中 ID 为被分析 kernel 的序号，与 trace_file_parser 中不计 Memcpy 的 kernel "Index" 一致。
+`--launch-skip` / `--launch-count` 只能指定一段连续的 kernel，因此不连续的 ID 会被分为若干段，每段运行一次 ncu，
+每段输出的 ID 从 0 开始，需要加上该段的 launch-skip 还原为原始 ID。
+"""
+
+DEFAULT_INFERENCE_SCRIPT = './inference/detection/yolo_ort_nopf.py'
+
+# 指标名称（CSV 中的 "Metric Name"）所属的 ncu section 标识
+METRIC_SECTIONS = {
+    # GPU Speed Of Light Throughput
+    "Compute (SM) Throughput": "SpeedOfLight",
+    "Memory Throughput": "SpeedOfLight",
+    "SM Active Cycles": "SpeedOfLight",
+    "Elapsed Cycles": "SpeedOfLight",
+    "Duration": "SpeedOfLight",
+    "SM Frequency": "SpeedOfLight",
+    "DRAM Frequency": "SpeedOfLight",
+    "DRAM Throughput": "SpeedOfLight",
+    "L1/TEX Cache Throughput": "SpeedOfLight",
+    "L2 Cache Throughput": "SpeedOfLight",
+
+    # Launch Statistics
+    "Block Size": "LaunchStats",
+    "Grid Size": "LaunchStats",
+    "Threads": "LaunchStats",
+    "Waves Per SM": "LaunchStats",
+    "Registers Per Thread": "LaunchStats",
+    "# SMs": "LaunchStats",
+    "Shared Memory Configuration Size": "LaunchStats",
+    "Driver Shared Memory Per Block": "LaunchStats",
+    "Dynamic Shared Memory Per Block": "LaunchStats",
+    "Static Shared Memory Per Block": "LaunchStats",
+
+    # Occupancy
+    "Block Limit SM": "Occupancy",
+    "Block Limit Registers": "Occupancy",
+    "Block Limit Shared Mem": "Occupancy",
+    "Block Limit Warps": "Occupancy",
+    "Theoretical Active Warps per SM": "Occupancy",
+    "Theoretical Occupancy": "Occupancy",
+    "Achieved Occupancy": "Occupancy",
+    "Achieved Active Warps Per SM": "Occupancy",
+}
+
+
+def build_ncu_command(model_path, ncu="ncu", script=DEFAULT_INFERENCE_SCRIPT, ncu_args=None, output_path=None):
+    """
+    构建分析命令，返回参数列表，不经过 shell。
+
+    Args:
+        `model_path` (str): ONNX 模型路径。
+        `ncu` (str): ncu 可执行程序，可以包含参数，如 "python3 ./profile/fake_ncu.py"。
+        `script` (str): 被分析的推理脚本。
+        `ncu_args` (list): 额外的 ncu 参数。
+        `output_path` (str): ncu 输出（==PROF== 信息与 CSV）的保存路径，通过 `--log-file` 传入并转换为绝对路径，
+                             被分析程序自身的输出仍在标准输出中。为 None 时 ncu 输出到标准输出。
+
+    Returns:
+        list: 命令参数列表。
+    """
+    command = shlex.split(ncu) + ["--csv"]
+    if output_path is not None:
+        command += ["--log-file", os.path.abspath(output_path)]
+    return command + list(ncu_args or []) + ["python3", script, "--model", model_path]
+
+
+def group_kernel_ids(kernel_ids, max_gap=0):
+    """
+    将 kernel ID 分为若干连续段，相邻 ID 的间隔不超过 `max_gap` 时合并到同一段。
+    合并会多分析间隔中的 kernel，但少启动一次被分析程序，模型加载耗时较长时可适当调大。
+
+    Args:
+        `kernel_ids` (iterable): kernel ID。
+        `max_gap` (int): 段内允许跳过的最大 kernel 数。
+
+    Returns:
+        list: `(launch_skip, launch_count)` 元组列表，按 ID 升序。
+    """
+    ranges = []
+    for kernel_id in sorted(set(kernel_ids)):
+        if kernel_id < 0:
+            wout.error(f"[ncu_command_builder] kernel ID 不能为负数: {kernel_id}")
+        if ranges and kernel_id - (ranges[-1][0] + ranges[-1][1]) <= max_gap:
+            ranges[-1][1] = kernel_id - ranges[-1][0] + 1
+        else:
+            ranges.append([kernel_id, 1])
+    return [tuple(r) for r in ranges]
+
+
+def get_metric_sections(metric_list):
+    """
+    获取指标所属的 section，有未知指标时返回 None，表示不限制 section（使用 ncu 默认的 basic 集合）。
+
+    Returns:
+        list: section 标识列表，保持首次出现的顺序。
+    """
+    sections = []
+    for metric_name in metric_list:
+        section = METRIC_SECTIONS.get(metric_name)
+        if section is None:
+            wout.simple(f"[ncu_command_builder] 未知指标 {metric_name} 所属的 section，不限制 section")
+            return None
+        if section not in sections:
+            sections.append(section)
+    return sections
+
+
+def build_filter_args(launch_skip=None, launch_count=None, sections=None):
+    """
+    构建 ncu 过滤参数。
+
+    Args:
+        `launch_skip` (int): 跳过的 kernel 数。
+        `launch_count` (int): 分析的 kernel 数。
+        `sections` (list): 分析的 section 标识。
+
+    Returns:
+        list: 参数列表。
+    """
+    args = []
+    if launch_skip:
+        args += ["--launch-skip", str(launch_skip)]
+    if launch_count is not None:
+        args += ["--launch-count", str(launch_count)]
+    for section in sections or []:
+        args += ["--section", section]
+    return args
+
+
+def plan_invocations(kernel_ids=None, metric_list=None, max_gap=0):
+    """
+    根据需要的 kernel ID 与指标规划 ncu 调用。
+
+    Args:
+        `kernel_ids` (list): 需要的 kernel ID，None 表示全部。
+        `metric_list` (list): 需要的指标名称，None 表示全部。
+        `max_gap` (int): 见 `group_kernel_ids`。
+
+    Returns:
+        list: 每次调用为一个元组 `(ncu_args, id_offset)`，`id_offset` 为输出 ID 需要加上的偏移。
+    """
+    sections = get_metric_sections(metric_list) if metric_list else None
+    if kernel_ids is None:
+        return [(build_filter_args(sections=sections), 0)]
+
+    return [
+        (build_filter_args(launch_skip, launch_count, sections), launch_skip)
+        for launch_skip, launch_count in group_kernel_ids(kernel_ids, max_gap)
+    ]
@@ -0,0 +1,329 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils import warning_output as wout
+from utils import ncu_command_builder as ncb
+"""
+Nsight Compute 批量分析任务调度。
+以 (模型, 运行编号) 为单位组织任务，支持并发执行、断点续跑（根据清单中记录的输出校验和跳过已完成任务）、
+原子写出结果，并在写出时直接去除 ncu CSV 输出前的非 CSV 内容（被分析程序与 ncu 自身的输出），记录每个任务的耗时。
+
+清单文件为 JSON，键为任务 ID，值包含：
+    - "model": 模型路径。
+    - "run": 运行编号，单次分析时为 None。
+    - "output": CSV 输出路径。
+    - "status": "done" 或 "failed"。
+    - "sha256": 输出文件校验和，仅 "done" 时存在。
+    - "kernels": 输出中的 kernel 数量，仅 "done" 时存在。
+    - "start" / "end" / "elapsed": 开始、结束时间与耗时（秒）。
+    - "kernel_ids" / "metrics": 任务限定的 kernel ID 与指标，None 表示全部。
+    - "log": 被分析程序输出与标准错误的保存路径（输出路径加 ".log"），失败时 "error" 中附带其最后几行。
+"""
+
+# 失败时写入清单的日志行数
+ERROR_LOG_LINES = 5
+
+# ncu CSV 表头行的开头
+CSV_HEADER_PREFIX = '"ID",'
+
+DEFAULT_INFERENCE_SCRIPT = ncb.DEFAULT_INFERENCE_SCRIPT
+
+
+def make_job(model_path, output_path, run=None, kernel_ids=None, metrics=None):
+    """
+    创建一个分析任务。
+
+    Args:
+        `model_path` (str): ONNX 模型路径。
+        `output_path` (str): CSV 输出路径。
+        `run` (int): 运行编号，重复分析时使用，单次分析为 None。
+        `kernel_ids` (list): 只分析这些 kernel ID，None 表示全部。
+        `metrics` (list): 只保留这些指标，None 表示全部。
+
+    Returns:
+        dict: 任务，包含 "id"、"model"、"run"、"output"、"kernel_ids"、"metrics"。
+    """
+    model_name = os.path.splitext(os.path.basename(model_path))[0]
+    job_id = model_name if run is None else f"{model_name}-run{run}"
+    return {
+        "id": job_id, "model": model_path, "run": run, "output": output_path,
+        "kernel_ids": sorted(set(kernel_ids)) if kernel_ids is not None else None,
+        "metrics": list(metrics) if metrics is not None else None,
+    }
+
+
+def file_sha256(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def append_csv_rows(src_path, dst, sha256, write_header=True, kernel_ids=None, metrics=None, id_offset=0):
+    """
+    流式读取 ncu 原始输出，跳过 CSV 表头之前的内容，将数据行追加到 `dst`，同时更新校验和。
+    指定了过滤条件时逐行解析，ID 加上 `id_offset` 后只保留需要的 kernel 与指标。
+
+    Args:
+        `src_path` (str): ncu 原始输出。
+        `dst` (file): 已打开的目标文件。
+        `sha256` (hashlib._Hash): 校验和对象。
+        `write_header` (bool): 是否写出表头，多段输出合并时只有第一段写出。
+        `kernel_ids` (set): 保留的 kernel ID（偏移后），None 表示全部。
+        `metrics` (set): 保留的指标名称，None 表示全部。
+        `id_offset` (int): 输出 ID 需要加上的偏移。
+
+    Returns:
+        tuple: (是否找到表头, kernel 数量, 数据行数)。
+    """
+    header_found = False
+    filtering = kernel_ids is not None or metrics is not None or id_offset != 0
+    id_col = metric_col = None
+    row_count = 0
+    kernel_count = 0
+    last_id = None
+
+    def write(line):
+        dst.write(line)
+        sha256.update(line.encode('utf-8'))
+
+    with open(src_path, 'r', encoding='utf-8', errors='replace') as src:
+        for line in src:
+            if not header_found:
+                if line.startswith(CSV_HEADER_PREFIX):
+                    header_found = True
+                    header = next(csv.reader([line]))
+                    id_col = header.index("ID")
+                    metric_col = header.index("Metric Name") if "Metric Name" in header else None
+                    if write_header:
+                        write(line)
+                continue
+            if not line.startswith('"'):
+                # 表头之后的非 CSV 行（被分析程序退出时的输出）
+                continue
+
+            if filtering:
+                row = next(csv.reader([line]))
+                kernel_id = int(row[id_col]) + id_offset
+                if kernel_ids is not None and kernel_id not in kernel_ids:
+                    continue
+                if metrics is not None and metric_col is not None and row[metric_col] not in metrics:
+                    continue
+                row[id_col] = str(kernel_id)
+                buffer = io.StringIO()
+                csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator='\n').writerow(row)
+                line = buffer.getvalue()
+            else:
+                # 同一 kernel 的指标行连续出现，首列为 ID
+                kernel_id = line[:line.find('",')]
+
+            row_count += 1
+            if kernel_id != last_id:
+                kernel_count += 1
+                last_id = kernel_id
+            write(line)
+
+    return header_found, kernel_count, row_count
+
+
+def _read_tail(file_path, line_count):
+    """
+    读取文本文件的最后 `line_count` 行（不含命令回显），文件不存在时返回空字符串。
+    """
+    if not os.path.exists(file_path):
+        return ""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        lines = [line.rstrip('\n') for line in f if line.strip() and not line.startswith("$ ")]
+    return " | ".join(lines[-line_count:])
+
+
+class NcuJobScheduler:
+    """
+    执行一组 ncu 分析任务，清单在每个任务结束后原子写回，中断后重新运行会跳过已完成的任务。
+    """
+
+    def __init__(self, manifest_path, concurrency=1, ncu="ncu", script=DEFAULT_INFERENCE_SCRIPT, ncu_args=None, max_gap=0):
+        """
+        Args:
+            `manifest_path` (str): 清单文件路径。
+            `concurrency` (int): 同时运行的任务数。ncu 会串行化 kernel 回放，同一块 GPU 上并发多个任务会互相干扰计时类指标，
+                                 请仅在多 GPU 或只关心启动参数时调大。
+            `ncu` (str): ncu 可执行程序，测试时可替换为 fake_ncu。
+            `script` (str): 被分析的推理脚本。
+            `ncu_args` (list): 额外的 ncu 参数。
+            `max_gap` (int): 任务限定了 kernel ID 时，合并为同一次 ncu 调用的最大 ID 间隔，见 ncu_command_builder.group_kernel_ids。
+        """
+        self.manifest_path = manifest_path
+        self.concurrency = max(1, concurrency)
+        self.ncu = ncu
+        self.script = script
+        self.ncu_args = list(ncu_args or [])
+        self.max_gap = max_gap
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            wout.simple(f"[ncu_job_scheduler] 清单 {self.manifest_path} 损坏，重新开始。")
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _record(self, job_id, entry):
+        with self._lock:
+            self.manifest[job_id] = entry
+            self._save_manifest()
+
+    def is_done(self, job):
+        """
+        判断任务是否已完成：清单中记录为完成，过滤条件一致，且输出文件存在、校验和一致。
+        清单中没有记录的输出文件（如清单引入之前或 shell 重定向中断后留下的结果）可能不完整，不予采用，任务会重新执行。
+        """
+        output_path = job["output"]
+        if not os.path.exists(output_path):
+            return False
+
+        entry = self.manifest.get(job["id"])
+        if entry is None or entry.get("status") != "done":
+            wout.simple(f"[ncu_job_scheduler] {output_path} 已存在但清单中没有完成记录，重新分析 {job['id']}")
+            return False
+        # 过滤条件变化后需要重新分析
+        if entry.get("kernel_ids") != job.get("kernel_ids") or entry.get("metrics") != job.get("metrics"):
+            return False
+        return entry.get("sha256") == file_sha256(output_path)
+
+    def run_job(self, job):
+        """
+        执行单个任务，输出先写入临时文件，校验并去除前导内容后原子重命名为目标文件。
+        任务限定了不连续的 kernel ID 时会分段调用 ncu，各段输出还原 ID 后合并为一个文件。
+        ncu 的输出通过 `--log-file` 写入临时文件，被分析程序的输出与标准错误保存到输出路径加 ".log" 的文件中，各段依次追加。
+
+        Returns:
+            dict: 清单条目。
+        """
+        output_path = job["output"]
+        raw_path = f"{output_path}.raw.tmp"
+        trimmed_path = f"{output_path}.tmp"
+        log_path = f"{output_path}.log"
+        kernel_ids = job.get("kernel_ids")
+        metrics = job.get("metrics")
+        invocations = ncb.plan_invocations(kernel_ids, metrics, self.max_gap)
+        commands = [
+            ncb.build_ncu_command(job["model"], self.ncu, self.script, self.ncu_args + ncu_args, output_path=raw_path)
+            for ncu_args, _ in invocations
+        ]
+
+        entry = {
+            "model": job["model"], "run": job["run"], "output": output_path,
+            "kernel_ids": kernel_ids, "metrics": metrics,
+            "commands": [shlex.join(command) for command in commands],
+            "log": log_path,
+        }
+        start_time = time.time()
+        entry["start"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
+        print(f"[ncu_job_scheduler] 开始 {job['id']}，ncu 调用次数 {len(commands)}，开始时间: {entry['start']}")
+
+        try:
+            sha256 = hashlib.sha256()
+            kernel_count = 0
+            row_count = 0
+            error = None
+            with open(trimmed_path, 'w', encoding='utf-8') as dst, open(log_path, 'w') as log:
+                for idx, (command, (_, id_offset)) in enumerate(zip(commands, invocations)):
+                    if os.path.exists(raw_path):
+                        os.remove(raw_path)
+                    log.write(f"$ {shlex.join(command)}\n")
+                    log.flush()
+                    subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, check=True)
+                    if not os.path.exists(raw_path):
+                        error = f"ncu wrote no output in invocation {idx}"
+                        break
+                    header_found, kernels, rows = append_csv_rows(
+                        raw_path, dst, sha256, write_header=(idx == 0),
+                        kernel_ids=set(kernel_ids) if kernel_ids is not None else None,
+                        metrics=set(metrics) if metrics is not None else None,
+                        id_offset=id_offset,
+                    )
+                    if not header_found or rows == 0:
+                        error = f"no CSV header or no data rows in ncu output of invocation {idx}"
+                        break
+                    kernel_count += kernels
+                    row_count += rows
+
+            if error is not None:
+                entry["status"] = "failed"
+                entry["error"] = error
+            else:
+                os.replace(trimmed_path, output_path)
+                entry["status"] = "done"
+                entry["sha256"] = sha256.hexdigest()
+                entry["kernels"] = kernel_count
+                if kernel_ids is not None and kernel_count != len(kernel_ids):
+                    wout.simple(f"[ncu_job_scheduler] {job['id']} 需要 {len(kernel_ids)} 个 kernel，输出中只有 {kernel_count} 个")
+        except (subprocess.CalledProcessError, OSError) as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            log_tail = _read_tail(log_path, ERROR_LOG_LINES)
+            if log_tail:
+                entry["error"] += f"; log: {log_tail}"
+        finally:
+            for tmp_path in (raw_path, trimmed_path):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        end_time = time.time()
+        entry["end"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
+        entry["elapsed"] = round(end_time - start_time, 3)
+
+        if entry["status"] == "done":
+            print(f"[ncu_job_scheduler] 已完成 {job['id']}，kernel 数 {entry['kernels']}，结果保存到 {output_path}，耗时: {entry['elapsed']:.2f} 秒")
+        else:
+            wout.simple(f"[ncu_job_scheduler] {job['id']} 分析失败: {entry['error']}，耗时: {entry['elapsed']:.2f} 秒")
+
+        self._record(job["id"], entry)
+        return entry
+
+    def run(self, jobs):
+        """
+        执行所有未完成的任务。
+
+        Args:
+            `jobs` (list): `make_job` 创建的任务列表。
+
+        Returns:
+            dict: 本次执行的任务 ID 到清单条目的映射，不包含被跳过的任务。
+        """
+        pending_jobs = []
+        for job in jobs:
+            if self.is_done(job):
+                print(f"[ncu_job_scheduler] 跳过已完成的任务 {job['id']}")
+            else:
+                os.makedirs(os.path.dirname(job["output"]) or '.', exist_ok=True)
+                pending_jobs.append(job)
+
+        print(f"[ncu_job_scheduler] 共 {len(jobs)} 个任务，待执行 {len(pending_jobs)} 个，并发数 {self.concurrency}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            entries = list(executor.map(self.run_job, pending_jobs))
+
+        failed = [job["id"] for job, entry in zip(pending_jobs, entries) if entry["status"] != "done"]
+        if failed:
+            wout.simple(f"[ncu_job_scheduler] 失败的任务: {failed}，重新运行即可只重试这些任务")
+        return {job["id"]: entry for job, entry in zip(pending_jobs, entries)}
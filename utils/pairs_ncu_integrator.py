@@ -1,38 +1,103 @@
 from utils import warning_output as wout
 from utils import trace_file_parser as tfp
 import pandas as pd
+import re
+
+# 填充到 kernel 中的指标
+NCU_METRICS = [
+    # GPU Speed Of Light Throughput
+    "Compute (SM) Throughput",
+    "Memory Throughput",
+    "SM Active Cycles",
+    "Elapsed Cycles",
+    "Duration",
+
+    # Launch Statistics
+    "Registers Per Thread",
+    "# SMs",
+    "Shared Memory Configuration Size",  # "Shared Memory executed" in Nsys
+    "Driver Shared Memory Per Block",
+    "Dynamic Shared Memory Per Block",
+    "Static Shared Memory Per Block",
+
+    # Occupancy
+    "Block Limit SM",
+    "Block Limit Registers",
+    "Block Limit Shared Mem",
+    "Block Limit Warps",
+    "Theoretical Active Warps per SM",
+    "Theoretical Occupancy",
+    "Achieved Occupancy",
+    "Achieved Active Warps Per SM",
+]
+
+
+def ncu_column_name(metric_name):
+    """
+    ncu 指标在导出的表格列与 kernel 节点属性中使用的名称，如 "Compute (SM) Throughput" -> "ncu_compute_sm_throughput"。
+    """
+    return "ncu_" + re.sub(r"[^0-9a-z]+", "_", metric_name.lower()).strip("_")
+
 
-def _fill_kernel_metric(kernel, id_df, metric_name):
+def build_ncu_lookup(df, metric_names=NCU_METRICS):
+    """
+    将 ncu 的 CSV 数据整理为以 kernel ID 为键的哈希表，只需遍历一次数据。
+
+    Args:
+        `df` (pandas.DataFrame): ncu 生成的 CSV 数据。
+        `metric_names` (list): 需要的指标名称。
+
+    Returns:
+        tuple: (lookup, duplicated)
+            - lookup (dict): {ID: {指标名称: (值, 单位)}}，包含 CSV 中所有的 ID；
+            - duplicated (set): 同一 ID 中出现多次的 (ID, 指标名称)。
+    """
+    lookup = {kernel_id: {} for kernel_id in df["ID"].unique().tolist()}
+    metric_df = df[df["Metric Name"].isin(metric_names)]
+
+    duplicated_mask = metric_df.duplicated(subset=["ID", "Metric Name"], keep=False)
+    duplicated = set(zip(metric_df.loc[duplicated_mask, "ID"].tolist(), metric_df.loc[duplicated_mask, "Metric Name"].tolist()))
+
+    unique_df = metric_df[~duplicated_mask]
+    for kernel_id, metric_name, metric_value, metric_unit in zip(
+        unique_df["ID"].tolist(), unique_df["Metric Name"].tolist(),
+        unique_df["Metric Value"].tolist(), unique_df["Metric Unit"].tolist()
+    ):
+        lookup[kernel_id][metric_name] = (metric_value, metric_unit)
+
+    return lookup, duplicated
+
+
+def _fill_kernel_metric(kernel, id_metrics, metric_name, duplicated):
     """
     填充 kernel 的 ncu 数据
 
     Args:
         `kernel` (dict): kernel 字典，被填充的目标数据结构
-        `id_df` (pandas.DataFrame): 包含 kernel 对应数据的数据框，来自 ncu 生成的 CSV，已根据 ID 过滤
+        `id_metrics` (dict): 该 kernel 的 {指标名称: (值, 单位)}，来自 `build_ncu_lookup`
         `metric_name` (str): 需要填充的指标名称
+        `duplicated` (set): 出现多次的 (ID, 指标名称)
     """
-    filtered_df = id_df[id_df['Metric Name'] == metric_name]
-
     # 检查结果数量
-    if len(filtered_df) == 0:
-        wout.simple(f"[pairs_ncu_integrator] Kernel ID: {kernel['Index']} 中未找到 {metric_name} 的数据。")
-        return 
-    elif len(filtered_df) > 1:
+    if (kernel["Index"], metric_name) in duplicated:
         wout.simple(f"[pairs_ncu_integrator] Kernel ID: {kernel['Index']} 中找到多条 {metric_name} 的数据。")
         return
+    if metric_name not in id_metrics:
+        wout.simple(f"[pairs_ncu_integrator] Kernel ID: {kernel['Index']} 中未找到 {metric_name} 的数据。")
+        return
 
     # 获取 "Metric Value" 和 "Metric Unit" 两列的值
-    metric_value = filtered_df['Metric Value'].values[0]
-    metric_unit = filtered_df['Metric Unit'].values[0]
+    metric_value, metric_unit = id_metrics[metric_name]
 
     kernel["ncu"][metric_name + " Value"] = metric_value
     kernel["ncu"][metric_name + " Unit"] = metric_unit
 
 
 
-def fill_pairs_with_ncu(node_kernel_pairs, ncu_csv_path):
+def fill_pairs_with_ncu(node_kernel_pairs, ncu_csv_path, metric_names=NCU_METRICS):
     """
-    使用来自 ncu 的 csv 数据填充 node_kernel_pairs 中的 kernel 数据
+    使用来自 ncu 的 csv 数据填充 node_kernel_pairs 中的 kernel 数据。
+    CSV 只读取一次并按 ID 建立哈希表，每个 kernel 的查找为常数时间。
 
     Args:
         `node_kernel_pairs` (list): 节点与 kernel 对的列表，列表中的每个元素是一个字典，字典包含两个字段：
@@ -40,6 +105,7 @@ def fill_pairs_with_ncu(node_kernel_pairs, ncu_csv_path):
             - "Kernels": 一个列表，包含该算子对应的所有 kernel 的 JSON 对象，这些 kernel 是按顺序排列的，包含 kernel 的名称、运行时长、网格和块大小等信息。需要包含：
                 - "Index": kernel 的索引，在分析 trace 文件时由 trace_file_parser 添加，从 0 开始，不计算 Memcpy 类型的 kernel，用于在 ncu 数据中查找对应的数据。
         `ncu_csv_path` (str): ncu 生成的 csv 文件的路径
+        `metric_names` (list): 需要填充的指标名称，默认为 `NCU_METRICS`
     
     Returns:
         `node_kernel_pairs` (list): 填充了 ncu 数据的 node_kernel_pairs
@@ -53,6 +119,8 @@ def fill_pairs_with_ncu(node_kernel_pairs, ncu_csv_path):
         df = pd.read_csv(ncu_csv_path)
     except FileNotFoundError:
         wout.error("[pairs_ncu_integrator]NCU CSV file not found.")
+
+    lookup, duplicated = build_ncu_lookup(df, metric_names)
     
     kernel_idx = 0
     
@@ -63,39 +131,15 @@ def fill_pairs_with_ncu(node_kernel_pairs, ncu_csv_path):
             if kernel_idx < 0:
                 continue
 
-
-            # 从 csv 中找到对应 ID 的数据并校验 name
-            id_df = df[df["ID"] == kernel_idx]
-            if id_df.empty:
+            # 从 csv 中找到对应 ID 的数据
+            id_metrics = lookup.get(kernel_idx)
+            if id_metrics is None:
                 wout.error(f"[pairs_ncu_integrator] Kernel ID {kernel_idx} not found in NCU CSV.")
             
             # 将数据填入 pair
             kernel["ncu"] = {}
-            
-            # GPU Speed Of Light Throughput
-            _fill_kernel_metric(kernel, id_df, "Compute (SM) Throughput")
-            _fill_kernel_metric(kernel, id_df, "Memory Throughput")
-            _fill_kernel_metric(kernel, id_df, "SM Active Cycles")
-            _fill_kernel_metric(kernel, id_df, "Elapsed Cycles")
-            _fill_kernel_metric(kernel, id_df, "Duration")
-
-            # Launch Statistics
-            _fill_kernel_metric(kernel, id_df, "Registers Per Thread")
-            _fill_kernel_metric(kernel, id_df, "# SMs")
-            _fill_kernel_metric(kernel, id_df, "Shared Memory Configuration Size")  # "Shared Memory executed" in Nsys
-            _fill_kernel_metric(kernel, id_df, "Driver Shared Memory Per Block")
-            _fill_kernel_metric(kernel, id_df, "Dynamic Shared Memory Per Block")
-            _fill_kernel_metric(kernel, id_df, "Static Shared Memory Per Block")
-
-            # Occupancy
-            _fill_kernel_metric(kernel, id_df, "Block Limit SM")
-            _fill_kernel_metric(kernel, id_df, "Block Limit Registers")
-            _fill_kernel_metric(kernel, id_df, "Block Limit Shared Mem")
-            _fill_kernel_metric(kernel, id_df, "Block Limit Warps")
-            _fill_kernel_metric(kernel, id_df, "Theoretical Active Warps per SM")
-            _fill_kernel_metric(kernel, id_df, "Theoretical Occupancy")
-            _fill_kernel_metric(kernel, id_df, "Achieved Occupancy")
-            _fill_kernel_metric(kernel, id_df, "Achieved Active Warps Per SM")
+            for metric_name in metric_names:
+                _fill_kernel_metric(kernel, id_metrics, metric_name, duplicated)
 
     print(f"[pairs_ncu_integrator] Processed kernel count: {kernel_idx + 1}")
     if kernel_idx != df["ID"].max():
@@ -1,23 +1,233 @@
+from bisect import bisect_right, insort
 from collections import defaultdict
+from operator import itemgetter
 import json
+import re
 import sys
 from utils import warning_output as wout
+from utils.trace_model import Node, Kernel, Pair
+from utils.trace_sampler import SampledPairs
 """
 用于解析 ONNX Profiler 跟踪文件并生成算子与 kernel 的对应关系。
-仅适用于开启 GPU Profiling 的 ONNX Profiler 跟踪文件，且模型必须以默认的串行方式执行。
+仅适用于开启 GPU Profiling 的 ONNX Profiler 跟踪文件。
+
+跟踪文件按块流式读取、逐个事件解析，节点、kernel 的构造与 kernel 的归属、编号在同一次遍历中完成，
+类型化输出时原始事件在转换后即被丢弃，峰值内存不随文件大小线性增长。
+
+kernel 优先根据其 args 中的 parent_name（发射它的节点名称）与 op_name 归属到对应节点，同名节点（多次推理）取开始时间
+不晚于 kernel 的最后一个，因此 ORT_PARALLEL 执行模式或多 stream 时 Kernel 事件与 Node 事件交错也能正确对应。
+kernel 事件在跟踪文件中紧随发射它的节点之后，每个名称只需保留最近的 `PARENT_WINDOW` 个同名节点。
+缺少这些字段或无法匹配时，回退为按事件顺序归属到最近的节点；若该节点已在其他 stream 上发射 kernel，
+则归属到同一 stream 上最近发射 kernel 的节点。串行执行时两种方式的结果一致。
 """
 
-def get_pairs_from_trace_file(trace_file_path):
+# 流式读取时每次读取的字符数
+READ_CHUNK_SIZE = 1 << 20
+
+# 每个节点名称保留的最近同名节点数
+PARENT_WINDOW = 16
+
+# 事件之间的空白与逗号
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def _intern_keys(pairs):
+    return {sys.intern(key): value for key, value in pairs}
+
+
+def iter_trace_events(trace_file_path, chunk_size=READ_CHUNK_SIZE, intern_keys=False):
+    """
+    流式读取跟踪文件（事件的 JSON 数组），逐个生成事件字典，内存中只保留当前块。
+
+    Args:
+        `trace_file_path` (str): 跟踪文件路径。
+        `chunk_size` (int): 每次读取的字符数。
+        `intern_keys` (bool): 驻留事件字典的键。逐个解析时各事件的键不再像 `json.load` 那样共享，
+                              需要保留全部事件时应开启，否则每个事件各持有一份键字符串。
+
+    Raises:
+        json.JSONDecodeError: 文件不是事件的 JSON 数组或被截断。
+    """
+    decoder = json.JSONDecoder(object_pairs_hook=_intern_keys if intern_keys else None)
+    with open(trace_file_path, 'r') as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos == len(buffer):
+                if eof:
+                    raise json.JSONDecodeError("Expecting ']'" if started else "Expecting '['", buffer, pos)
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+                continue
+
+            if not started:
+                if buffer[pos] != '[':
+                    raise json.JSONDecodeError("Expecting '['", buffer, pos)
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+
+            try:
+                event, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 事件跨越了块的边界，读入下一块后重新解析
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield event
+
+
+def _remember_node(window, ts, position, op_name):
+    """
+    将节点加入同名节点窗口，窗口按开始时间升序，超过 `PARENT_WINDOW` 时丢弃最早的。
+    """
+    insort(window, (ts, position, op_name), key=itemgetter(0))
+    if len(window) > PARENT_WINDOW:
+        del window[0]
+
+
+def _find_parent_node(kernel_event, name_2_window):
+    """
+    根据 parent_name 与 op_name 查找 kernel 所属节点的位置，无法匹配时返回 None。
+    `name_2_window` 为每个名称最近的同名节点 [(开始时间, 位置, op_name), ...]，按开始时间升序。
+    """
+    args = kernel_event.get("args", {})
+    window = name_2_window.get(args.get("parent_name"))
+    if not window:
+        return None
+
+    if len(window) == 1:
+        _, position, node_op_name = window[0]
+    else:
+        # 取开始时间不晚于 kernel 的最后一个
+        _, position, node_op_name = window[max(bisect_right(window, kernel_event.get("ts", 0), key=itemgetter(0)) - 1, 0)]
+
+    op_name = args.get("op_name")
+    if op_name and op_name != node_op_name:
+        return None
+    return position
+
+
+def assign_kernels_to_nodes(events, typed=False, sampler=None):
+    """
+    单次遍历事件，构造节点与 kernel，将 kernel 归属到节点并编号。
+
+    Args:
+        `events` (iterable): 按文件顺序的事件，可以是 `iter_trace_events` 的生成器。
+        `typed` (bool): 为 True 时构造 trace_model 的 `Node` 与 `Kernel`，原始事件在转换后即被丢弃；
+                        否则保留原始事件字典，并写入 "Index"。
+        `sampler`: trace_sampler 中的采样器，非空时在读到每个节点时决定是否保留，未保留的节点及其 kernel 不构造、不保留。
+
+    Returns:
+        tuple: (节点, 每个节点的 kernel 列表, 统计)，前两者均为以节点序号为键、按序号升序的字典，只包含保留的节点。
+               统计为 {"nodes": 节点数, "kernels": 不计 Memcpy 的 kernel 数, "matched": 按 parent_name 匹配的 kernel 数,
+               "fallback": 按顺序回退的 kernel 数}，采样时另有 "sample_info"。
+               节点的 "Index" 为其在 Node 事件中的序号，kernel 的 "Index" 为不计 Memcpy 的 kernel 在跟踪文件中的序号，
+               与 ncu 中的 ID 对应，Memcpy 为 -1。第一个节点之前且无法匹配的 kernel 被丢弃，但仍参与编号。
+    """
+    nodes = {}
+    node_kernels = {}
+    name_2_window = defaultdict(list)
+    last_position = -1
+    last_streams = set()
+    stream_owner = {}
+    stats = {"nodes": 0, "kernels": 0, "matched": 0, "fallback": 0}
+    if sampler is not None:
+        sampler.begin()
+
+    for event in events:
+        cat = event.get("cat")
+        if cat == "Node":
+            position = stats["nodes"]
+            stats["nodes"] += 1
+            op_name = event.get("args", {}).get("op_name")
+            _remember_node(name_2_window[event["name"]], event.get("ts", 0), position, op_name)
+            last_position = position
+            last_streams = set()
+
+            if sampler is not None:
+                keep, evicted = sampler.offer(position, event["name"], op_name)
+                for dropped in evicted:
+                    del nodes[dropped]
+                    del node_kernels[dropped]
+                if not keep:
+                    continue
+            if typed:
+                node = Node(event, position)
+            else:
+                node = event
+                node["Index"] = position
+            nodes[position] = node
+            node_kernels[position] = []
+
+        elif cat == "Kernel":
+            # 判断名称中是否包含 “Memcpy”，适配 ncu 中的 ID
+            if "Memcpy" not in event["name"]:
+                index = stats["kernels"]
+                stats["kernels"] += 1
+            else:
+                index = -1
+
+            stream = event.get("args", {}).get("stream")
+            position = _find_parent_node(event, name_2_window)
+            if position is not None:
+                stats["matched"] += 1
+            elif last_position >= 0:
+                stats["fallback"] += 1
+                position = last_position
+                owner = stream_owner.get(stream)
+                if owner is not None and last_streams and stream not in last_streams:
+                    position = owner
+            else:
+                continue
+
+            if position == last_position:
+                last_streams.add(stream)
+            stream_owner[stream] = position
+
+            kernels = node_kernels.get(position)
+            if kernels is None:
+                # 所属节点未被采样
+                continue
+            if typed:
+                kernel = Kernel(event, index)
+            else:
+                kernel = event
+                kernel["Index"] = index
+            kernels.append(kernel)
+
+    if sampler is not None:
+        positions, stats["sample_info"] = sampler.finish()
+        nodes = {position: nodes[position] for position in positions}
+        node_kernels = {position: node_kernels[position] for position in positions}
+
+    return nodes, node_kernels, stats
+
+
+def get_pairs_from_trace_file(trace_file_path, typed=False, sampler=None):
     """
     从指定的 ONNX Profiler 跟踪文件中解析出每个算子（Node）及其对应的 kernel 序列。
 
     Args:
         trace_file_path (str): 包含 ONNX Profiler 输出的跟踪文件的路径，该文件为 JSON 格式。
+        typed (bool): 为 True 时返回 trace_model 中的 `Pair` 对象（形状为 int 元组、名称被驻留），由解析过程直接构造，
+                      内存占用更小、属性访问更快，同时兼容下述字典访问方式；需要序列化为 JSON 时保持默认的 False。
+        sampler: trace_sampler 中的采样器，非空时在流式读取中只构造被选中的节点及其 kernel，返回带有 `sample_info` 的
+                 `SampledPairs`；节点与 kernel 的 "Index" 仍为其在完整跟踪文件中的序号。
 
     Returns:
         list: 一个列表，列表中的每个元素是一个字典，字典包含两个字段：
             - "Node": 表示一个算子（Node）的 JSON 对象，其中包含算子的相关信息，如名称、参数大小、输入输出类型和形状等。
             - "Kernels": 一个列表，包含该算子对应的所有 kernel 的 JSON 对象，这些 kernel 是按顺序排列的，包含 kernel 的名称、运行时长、网格和块大小等信息。
+            节点按事件顺序排列；kernel 的 "Index" 为不计 Memcpy 的 kernel 在跟踪文件中的顺序，与 ncu 中的 ID 对应。
 
     Raises:
         FileNotFoundError: 如果指定的文件路径不存在，会打印错误信息。
@@ -25,37 +235,21 @@ def get_pairs_from_trace_file(trace_file_path):
         Exception: 如果发生其他未知错误，会打印相应的错误信息。
     """
     try:
-        with open(trace_file_path, 'r') as file:
-            data = json.load(file)
-
-        node_kernel_pairs = []
-        current_node = None
-        current_kernels = []
-        node_idx = 0
-        kernel_idx = 0
-
-        for item in data:
-            if item["cat"] == "Node":
-                if current_node is not None:
-                    node_kernel_pairs.append({"Node": current_node, "Kernels": current_kernels})
-                current_node = item
-                current_node["Index"] = node_idx
-                node_idx += 1
-                current_kernels = []
-            elif item["cat"] == "Kernel":
-                if current_node is not None:
-                    # 判断名称中是否包含 “Memcpy”，适配 ncu 中的 ID
-                    if "Memcpy" not in item["name"]:
-                        item["Index"] = kernel_idx
-                        kernel_idx += 1
-                    else:
-                        item["Index"] = -1
-                    current_kernels.append(item)
-
-        if current_node is not None:
-            node_kernel_pairs.append({"Node": current_node, "Kernels": current_kernels})
-        
-        print(f"[trace_file_parser] Kernel count: {kernel_idx}")
+        events = iter_trace_events(trace_file_path, intern_keys=not typed)
+        nodes, node_kernels, stats = assign_kernels_to_nodes(events, typed, sampler)
+
+        if typed:
+            node_kernel_pairs = [Pair(node, node_kernels[position]) for position, node in nodes.items()]
+        else:
+            node_kernel_pairs = [{"Node": node, "Kernels": node_kernels[position]} for position, node in nodes.items()]
+
+        print(f"[trace_file_parser] Kernel count: {stats['kernels']}")
+        if stats["fallback"] and stats["matched"]:
+            print(f"[trace_file_parser] {stats['fallback']} 个 kernel 缺少可匹配的 parent_name（如 session_initialization 中发射的），按事件顺序归属")
+        if sampler is not None:
+            sample_info = stats["sample_info"]
+            print(f"[trace_file_parser] 采样（{sample_info['method']}, seed={sample_info['seed']}）保留 {len(node_kernel_pairs)}/{stats['nodes']} 个节点")
+            return SampledPairs(node_kernel_pairs, sample_info)
 
         return node_kernel_pairs
     except FileNotFoundError:
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from functools import cached_property
+from utils import trace_file_parser as tfp
+from utils.trace_model import Pair
+"""
+跟踪文件的倒排索引。对同一跟踪文件的 pairs 只建立一次，各索引在第一次访问时生成并缓存，
+之后按算子类型、执行提供者、kernel 名称、kernel 序列或节点名称查询时只需返回结果，不再遍历全部 pairs。
+
+pairs 可以是 trace_file_parser 返回的字典，也可以是 trace_model 中的 `Pair` 对象。
+索引中保存的是原始 pair 的引用，对其修改（如填充 "ncu"）对所有索引可见。
+"""
+
+
+def _pair_fields(pair):
+    """
+    获取 pair 的 (node_name, op_name, provider, kernel_sequence)。
+    """
+    if isinstance(pair, Pair):
+        node = pair.node
+        return node.name, node.op_name, node.provider, pair.kernel_names
+    node = pair["Node"]
+    args = node["args"]
+    return node["name"], args["op_name"], args["provider"], tuple(kernel["name"] for kernel in pair["Kernels"])
+
+
+class TraceIndex:
+    """
+    单个跟踪文件的倒排索引。
+
+    Args:
+        `node_kernel_pairs` (list): trace_file_parser.get_pairs_from_trace_file 返回的列表。
+    """
+
+    def __init__(self, node_kernel_pairs):
+        self.pairs = node_kernel_pairs
+
+    @classmethod
+    def from_trace_file(cls, trace_file_path, typed=True, sampler=None):
+        """
+        解析跟踪文件并建立索引，解析失败时返回 None。`sampler` 见 trace_file_parser.get_pairs_from_trace_file。
+        """
+        node_kernel_pairs = tfp.get_pairs_from_trace_file(trace_file_path, typed=typed, sampler=sampler)
+        if node_kernel_pairs is None:
+            return None
+        return cls(node_kernel_pairs)
+
+    @property
+    def sample_info(self):
+        """
+        采样信息，未采样时为 None。
+        """
+        return getattr(self.pairs, "sample_info", None)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __iter__(self):
+        return iter(self.pairs)
+
+    @cached_property
+    def _fields(self):
+        return [_pair_fields(pair) for pair in self.pairs]
+
+    @cached_property
+    def by_op_name(self):
+        """
+        dict: 算子类型 -> pairs 列表，保持在跟踪文件中的顺序。
+        """
+        index = defaultdict(list)
+        for pair, (_, op_name, _, _) in zip(self.pairs, self._fields):
+            index[op_name].append(pair)
+        return dict(index)
+
+    @cached_property
+    def by_provider(self):
+        """
+        dict: 执行提供者 -> pairs 列表。
+        """
+        index = defaultdict(list)
+        for pair, (_, _, provider, _) in zip(self.pairs, self._fields):
+            index[provider].append(pair)
+        return dict(index)
+
+    @cached_property
+    def by_kernel_name(self):
+        """
+        dict: kernel 名称 -> `(pair, position)` 列表，`position` 为该 kernel 在算子 kernel 序列中的位置。
+        """
+        index = defaultdict(list)
+        for pair, (_, _, _, kernel_sequence) in zip(self.pairs, self._fields):
+            for position, kernel_name in enumerate(kernel_sequence):
+                index[kernel_name].append((pair, position))
+        return dict(index)
+
+    @cached_property
+    def by_sequence(self):
+        """
+        dict: kernel 名称序列（元组）-> pairs 列表，不区分算子类型。
+        """
+        index = defaultdict(list)
+        for pair, (_, _, _, kernel_sequence) in zip(self.pairs, self._fields):
+            index[kernel_sequence].append(pair)
+        return dict(index)
+
+    @cached_property
+    def by_relation(self):
+        """
+        dict: `(op_name, provider, kernel_sequence)` -> pairs 列表，与 mapping_relation_info_finder 中的关联关系一致。
+        """
+        index = defaultdict(list)
+        for pair, (_, op_name, provider, kernel_sequence) in zip(self.pairs, self._fields):
+            index[(op_name, provider, kernel_sequence)].append(pair)
+        return dict(index)
+
+    @cached_property
+    def by_node_name(self):
+        """
+        dict: 节点名称 -> pair，名称重复时保留最后一个，与 get_node_kernel_mapping 一致。
+        """
+        return {node_name: pair for pair, (node_name, _, _, _) in zip(self.pairs, self._fields)}
+
+    def pairs_of_op(self, op_name):
+        return self.by_op_name.get(op_name, [])
+
+    def pairs_of_provider(self, provider):
+        return self.by_provider.get(provider, [])
+
+    def kernel_occurrences(self, kernel_name):
+        return self.by_kernel_name.get(kernel_name, [])
+
+    def pairs_of_sequence(self, kernel_sequence):
+        return self.by_sequence.get(tuple(kernel_sequence), [])
+
+    def pairs_of_relation(self, op_name, provider, kernel_sequence):
+        return self.by_relation.get((op_name, provider, tuple(kernel_sequence)), [])
+
+    def get_pair(self, node_name):
+        return self.by_node_name.get(node_name)
+
+    def op_names(self):
+        return list(self.by_op_name)
@@ -0,0 +1,234 @@
+import sys
+"""
+跟踪文件中算子与 kernel 的类型化内存模型。
+
+ONNX Profiler 的原始事件是嵌套字典：形状为单键字典的列表，grid/block 等启动参数为字符串，节点还带有体积很大的
+thread_scheduling_stats。trace_file_parser 在读取每个事件时直接构造带 `__slots__` 的对象：形状为 int 元组，kernel 名称与类型字符串被驻留，
+丢弃不使用的调度统计，内存占用显著降低，访问属性也无需重复解析与 `int()`。
+
+为兼容原有以字典方式访问的代码，对象支持 `pair["Node"]["args"]["op_name"]`、`kernel["args"]["grid_x"]`、
+`kernel["Index"]`、`kernel["ncu"]` 等写法，返回值的类型与原始 JSON 一致（如 grid_x 仍为字符串）。
+需要序列化为 JSON 时使用 `to_dict()`。
+"""
+
+
+def _intern(text):
+    return sys.intern(text) if isinstance(text, str) else text
+
+
+def _parse_type_shapes(type_shape_list):
+    """
+    将 `[{"float": [1, 3, 640, 640]}, ...]` 转换为类型元组与形状元组。
+    """
+    types = []
+    shapes = []
+    for type_shape in type_shape_list:
+        ((elem_type, shape),) = type_shape.items()
+        types.append(_intern(elem_type))
+        shapes.append(tuple(int(dim) for dim in shape))
+    return tuple(types), tuple(shapes)
+
+
+def _to_int(value, default=-1):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class _DictCompatible:
+    """
+    为 `__slots__` 对象提供与原始事件字典兼容的访问方式。
+    子类定义 `_KEY_ATTRS`（字典键到属性名的映射）、`_CAT`（事件的 "cat"）与 `_ARG_KEYS`，有 `_ARG_KEYS` 的子类需要 `_args` 槽。
+    `["args"]` 在首次访问时由属性生成与原始 JSON 相同的字典并缓存，之后的访问与原始字典一样快；该字典只是副本，修改不会写回属性。
+    """
+    __slots__ = ()
+    _KEY_ATTRS = {}
+    _CAT = None
+    _ARG_KEYS = ()
+
+    def _get_args(self):
+        if self._args is None:
+            self._args = {key: self._get_arg(key) for key in self._ARG_KEYS}
+        return self._args
+
+    def __getitem__(self, key):
+        if key == "args" and self._ARG_KEYS:
+            return self._args if self._args is not None else self._get_args()
+        attr = self._KEY_ATTRS.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if key == "cat" and self._CAT is not None:
+            return self._CAT
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        attr = self._KEY_ATTRS.get(key)
+        if attr is None:
+            raise KeyError(key)
+        setattr(self, attr, value)
+
+    def __contains__(self, key):
+        return (key == "args" and bool(self._ARG_KEYS)) or (key == "cat" and self._CAT is not None) or key in self._KEY_ATTRS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        data = {key: getattr(self, attr) for key, attr in self._KEY_ATTRS.items() if getattr(self, attr) is not None}
+        if self._CAT is not None:
+            data["cat"] = self._CAT
+        if self._ARG_KEYS:
+            data["args"] = dict(self._get_args())
+        return data
+
+
+class Node(_DictCompatible):
+    """
+    算子（Node 事件）。
+    """
+    __slots__ = (
+        'name', 'op_name', 'provider', 'node_index', 'index', 'ts', 'dur', 'pid', 'tid',
+        'input_types', 'input_shapes', 'output_types', 'output_shapes',
+        'output_size', 'parameter_size', 'activation_size', '_args',
+    )
+    _KEY_ATTRS = {"name": "name", "ts": "ts", "dur": "dur", "pid": "pid", "tid": "tid", "Index": "index"}
+    _CAT = "Node"
+    _ARG_KEYS = (
+        "op_name", "provider", "node_index", "input_type_shape", "output_type_shape",
+        "output_size", "parameter_size", "activation_size",
+    )
+
+    def __init__(self, event, index=-1):
+        args = event.get("args", {})
+        self.name = _intern(event["name"])
+        self.op_name = _intern(args.get("op_name", ""))
+        self.provider = _intern(args.get("provider", ""))
+        self.node_index = _to_int(args.get("node_index"))
+        self.index = index
+        self.ts = event.get("ts", 0)
+        self.dur = event.get("dur", 0)
+        self.pid = event.get("pid")
+        self.tid = event.get("tid")
+        self.input_types, self.input_shapes = _parse_type_shapes(args.get("input_type_shape", []))
+        self.output_types, self.output_shapes = _parse_type_shapes(args.get("output_type_shape", []))
+        self.output_size = _to_int(args.get("output_size"), 0)
+        self.parameter_size = _to_int(args.get("parameter_size"), 0)
+        self.activation_size = _to_int(args.get("activation_size"), 0)
+        self._args = None
+
+    def _get_arg(self, key):
+        if key == "op_name":
+            return self.op_name
+        if key == "provider":
+            return self.provider
+        if key == "node_index":
+            return str(self.node_index)
+        if key == "input_type_shape":
+            return [{elem_type: list(shape)} for elem_type, shape in zip(self.input_types, self.input_shapes)]
+        if key == "output_type_shape":
+            return [{elem_type: list(shape)} for elem_type, shape in zip(self.output_types, self.output_shapes)]
+        if key == "output_size":
+            return str(self.output_size)
+        if key == "parameter_size":
+            return str(self.parameter_size)
+        if key == "activation_size":
+            return str(self.activation_size)
+        raise KeyError(key)
+
+    def __repr__(self):
+        return f"Node({self.name!r}, op={self.op_name!r}, index={self.index})"
+
+
+class Kernel(_DictCompatible):
+    """
+    kernel（Kernel 事件），`index` 为不计 Memcpy 的序号，与 ncu 中的 ID 对应，Memcpy 为 -1。
+    """
+    __slots__ = (
+        'name', 'index', 'ts', 'dur', 'grid', 'block', 'stream', 'parent_name', 'op_name', 'ncu', '_args',
+    )
+    _KEY_ATTRS = {"name": "name", "ts": "ts", "dur": "dur", "Index": "index", "ncu": "ncu"}
+    _CAT = "Kernel"
+    _ARG_KEYS = (
+        "grid_x", "grid_y", "grid_z", "block_x", "block_y", "block_z", "stream", "parent_name", "op_name",
+    )
+
+    def __init__(self, event, index=-1):
+        args = event.get("args", {})
+        self.name = _intern(event["name"])
+        self.index = index
+        self.ts = event.get("ts", 0)
+        self.dur = event.get("dur", 0)
+        self.grid = (_to_int(args.get("grid_x")), _to_int(args.get("grid_y")), _to_int(args.get("grid_z")))
+        self.block = (_to_int(args.get("block_x")), _to_int(args.get("block_y")), _to_int(args.get("block_z")))
+        self.stream = _to_int(args.get("stream"))
+        self.parent_name = _intern(args.get("parent_name", ""))
+        self.op_name = _intern(args.get("op_name", ""))
+        self.ncu = None
+        self._args = None
+
+    @property
+    def is_memcpy(self):
+        return "Memcpy" in self.name
+
+    @property
+    def grid_size(self):
+        return self.grid[0] * self.grid[1] * self.grid[2]
+
+    @property
+    def block_size(self):
+        return self.block[0] * self.block[1] * self.block[2]
+
+    def _get_arg(self, key):
+        if key in ("grid_x", "grid_y", "grid_z"):
+            return str(self.grid["xyz".index(key[-1])])
+        if key in ("block_x", "block_y", "block_z"):
+            return str(self.block["xyz".index(key[-1])])
+        if key == "stream":
+            return str(self.stream)
+        if key == "parent_name":
+            return self.parent_name
+        if key == "op_name":
+            return self.op_name
+        raise KeyError(key)
+
+    def __repr__(self):
+        return f"Kernel({self.name[:40]!r}, index={self.index})"
+
+
+class Pair(_DictCompatible):
+    """
+    一个算子及其按顺序发射的 kernel 序列，`timeline` 由 trace_timeline 填充。
+    """
+    __slots__ = ('node', 'kernels', 'timeline')
+    _KEY_ATTRS = {"Node": "node", "Kernels": "kernels", "Timeline": "timeline"}
+
+    def __init__(self, node, kernels):
+        self.node = node
+        self.kernels = kernels
+        self.timeline = None
+
+    def __getitem__(self, key):
+        # pairs["Node"] 与 pairs["Kernels"] 是最常见的访问，跳过通用的查找
+        if key == "Node":
+            return self.node
+        if key == "Kernels":
+            return self.kernels
+        return super().__getitem__(key)
+
+    @property
+    def kernel_names(self):
+        return tuple(kernel.name for kernel in self.kernels)
+
+    def to_dict(self):
+        data = {"Node": self.node.to_dict(), "Kernels": [kernel.to_dict() for kernel in self.kernels]}
+        if self.timeline is not None:
+            data["Timeline"] = self.timeline
+        return data
+
+    def __repr__(self):
+        return f"Pair({self.node!r}, kernels={len(self.kernels)})"
+
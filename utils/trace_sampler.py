@@ -0,0 +1,239 @@
+import random
+from abc import ABC, abstractmethod
+from collections import defaultdict
+"""
+大型跟踪文件的采样，用于探索性分析：trace_file_parser 流式读取跟踪文件时对每个 Node 事件调用采样器的 `offer`，
+立即决定是否保留，未被选中的节点及其 kernel 不会构造对象，也不会保留原始事件。
+
+    - `IterationSampler`：以整次推理为单位做蓄水池采样，保留 k 次推理的全部节点；
+    - `OpTypeSampler`：按算子类型分层，每个节点以概率 `fraction` 保留，每种算子至少保留 `min_per_op` 个节点。
+
+kernel 的归属与编号仍遍历全部事件，"Index" 与未采样时一致；峰值内存只与保留的节点数有关。
+
+随机数只由 `seed` 决定，同一跟踪文件的采样结果可复现。采样结果为 `SampledPairs`，其 `sample_info` 记录采样方式、
+各算子类型采样前后的节点数与权重（总体数 / 保留数），统计量乘以对应权重即可还原为全量的估计值。
+"""
+
+
+def _node_fields(node):
+    """
+    返回 Node 事件（字典或 trace_model.Node）的 (name, op_name)。
+    """
+    if isinstance(node, dict):
+        return node["name"], node["args"]["op_name"]
+    return node.name, node.op_name
+
+
+class SampledPairs(list):
+    """
+    采样得到的 pairs 列表，`sample_info` 包含：
+        - "method": 采样方式；
+        - "seed": 随机种子；
+        - "population": {算子类型: 采样前节点数}；
+        - "kept": {算子类型: 保留节点数}；
+        - "weights": {算子类型: 权重}；
+    以及各采样方式特有的参数。
+    """
+
+    def __init__(self, pairs, sample_info):
+        super().__init__(pairs)
+        self.sampled = True
+        self.sample_info = sample_info
+
+    def get_weight(self, op_name):
+        return self.sample_info["weights"].get(op_name, 0.0)
+
+
+class _Sampler(ABC):
+    """
+    流式采样器基类：`begin` 开始一次采样，按事件顺序对每个节点调用 `offer`，最后由 `finish` 得到保留的节点。
+    子类实现 `_reset`（重置状态）与 `_offer`（决定是否保留），需要在结束时丢弃候补节点的子类实现 `_finish`。
+    """
+    method = None
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def begin(self):
+        """
+        开始一次新的采样，重置随机数与状态。
+        """
+        self._rng = random.Random(self.seed)
+        self._population = defaultdict(int)
+        self._kept = {}
+        self._reset()
+
+    def offer(self, position, name, op_name):
+        """
+        提交一个节点，决定是否保留。
+
+        Args:
+            `position` (int): 节点在 Node 事件中的序号，按事件顺序递增。
+            `name` (str): 节点名称。
+            `op_name` (str): 算子类型。
+
+        Returns:
+            tuple: (是否保留该节点, 此前保留、现已不再保留的节点序号列表)，调用方应释放后者。
+        """
+        self._population[op_name] += 1
+        keep, evicted = self._offer(position, name, op_name)
+        for dropped in evicted:
+            del self._kept[dropped]
+        if keep:
+            self._kept[position] = op_name
+        return keep, evicted
+
+    def finish(self):
+        """
+        结束采样。
+
+        Returns:
+            tuple: (保留的节点序号列表（升序）, sample_info 字典)，列表之外的节点即使曾被保留也应丢弃。
+        """
+        for dropped in self._finish():
+            del self._kept[dropped]
+
+        kept = defaultdict(int)
+        for op_name in self._kept.values():
+            kept[op_name] += 1
+
+        sample_info = {
+            "method": self.method,
+            "seed": self.seed,
+            "population": dict(self._population),
+            "kept": dict(kept),
+            "weights": {op_name: count / kept[op_name] for op_name, count in self._population.items() if kept[op_name]},
+        }
+        sample_info.update(self._info())
+        return sorted(self._kept), sample_info
+
+    @abstractmethod
+    def _reset(self):
+        pass
+
+    @abstractmethod
+    def _offer(self, position, name, op_name):
+        pass
+
+    def _finish(self):
+        return []
+
+    def _info(self):
+        return {}
+
+    def sample(self, node_kernel_pairs):
+        """
+        对已生成的 pairs 采样。
+
+        Returns:
+            SampledPairs: 采样结果。
+        """
+        self.begin()
+        for position, pair in enumerate(node_kernel_pairs):
+            self.offer(position, *_node_fields(pair["Node"]))
+        positions, sample_info = self.finish()
+        return SampledPairs([node_kernel_pairs[position] for position in positions], sample_info)
+
+
+class IterationSampler(_Sampler):
+    """
+    蓄水池采样保留 `iterations` 次完整推理，保持原有顺序。
+    一次推理中每个节点只执行一次，节点名称重复出现时开始新的一次推理，在其开始时即决定是否保留。
+    """
+    method = "iteration"
+
+    def __init__(self, iterations, seed=0):
+        super().__init__(seed)
+        self.iterations = iterations
+        self.total_iterations = None
+
+    def _reset(self):
+        self.total_iterations = 0
+        self._seen = set()
+        # 每个槽位保留的一次推理的节点序号，`_current` 为当前推理所在的槽位，不保留时为 None
+        self._slots = []
+        self._current = None
+
+    def _offer(self, position, name, op_name):
+        evicted = []
+        if self.total_iterations == 0 or name in self._seen:
+            iteration_idx = self.total_iterations
+            self.total_iterations += 1
+            self._seen = set()
+            if len(self._slots) < self.iterations:
+                self._slots.append([])
+                self._current = len(self._slots) - 1
+            else:
+                slot = self._rng.randrange(iteration_idx + 1)
+                if slot < self.iterations:
+                    evicted = self._slots[slot]
+                    self._slots[slot] = []
+                    self._current = slot
+                else:
+                    self._current = None
+        self._seen.add(name)
+
+        if self._current is None:
+            return False, evicted
+        self._slots[self._current].append(position)
+        return True, evicted
+
+    def _info(self):
+        return {"iterations": self.iterations, "total_iterations": self.total_iterations}
+
+
+class OpTypeSampler(_Sampler):
+    """
+    按算子类型分层采样，每个节点以概率 `fraction` 独立保留（流式读取时无法预知各算子的节点数，保留数的期望为
+    `fraction * 节点数`）。某种算子保留的节点不足 `min_per_op` 个时，由其未被选中的节点中蓄水池采样的候补补足，
+    候补在该算子保留足够的节点后即被释放。
+    """
+    method = "op_type"
+
+    def __init__(self, fraction, seed=0, min_per_op=1):
+        super().__init__(seed)
+        if not 0 < fraction <= 1:
+            raise ValueError(f"fraction 应在 (0, 1] 内: {fraction}")
+        self.fraction = fraction
+        self.min_per_op = min_per_op
+
+    def _reset(self):
+        self._selected = defaultdict(int)
+        self._rejected = defaultdict(int)
+        self._backups = defaultdict(list)
+
+    def _offer(self, position, name, op_name):
+        backups = self._backups[op_name]
+        if self._rng.random() < self.fraction:
+            self._selected[op_name] += 1
+            if self._selected[op_name] >= self.min_per_op and backups:
+                self._backups[op_name] = []
+                return True, backups
+            return True, []
+
+        if self._selected[op_name] >= self.min_per_op:
+            return False, []
+        self._rejected[op_name] += 1
+        if len(backups) < self.min_per_op:
+            backups.append(position)
+            return True, []
+        slot = self._rng.randrange(self._rejected[op_name])
+        if slot < self.min_per_op:
+            evicted = [backups[slot]]
+            backups[slot] = position
+            return True, evicted
+        return False, []
+
+    def _finish(self):
+        dropped = []
+        # 按算子类型排序遍历，使随机数的消耗顺序与字典顺序无关
+        for op_name in sorted(self._backups):
+            backups = self._backups[op_name]
+            needed = max(self.min_per_op - self._selected[op_name], 0)
+            if len(backups) > needed:
+                chosen = set(self._rng.sample(backups, needed))
+                dropped.extend(position for position in backups if position not in chosen)
+        return dropped
+
+    def _info(self):
+        return {"fraction": self.fraction, "min_per_op": self.min_per_op}
@@ -0,0 +1,155 @@
+import sys
+import numpy as np
+from utils import trace_file_parser as tfp
+from utils.trace_model import Pair
+"""
+基于 Node 与 Kernel 事件的 `ts` 与 `dur` 分析执行时间线。
+
+对每个 stream 上按开始时间排序的 kernel 做一次扫描（向量化实现）：
+    - GPU 忙碌时间：kernel 区间的并集长度；
+    - 发射间隙：kernel 开始时间与此前同一 stream 上所有 kernel 最晚结束时间之差，重叠时为 0；
+    - 算子的主机端开销：算子 dur 减去其 kernel 的总耗时，小模型中每次发射的开销往往占主导。
+每个 pair 的结果保存在 pair["Timeline"] 中（类型化的 `Pair` 为 `pair.timeline`）。时间单位与跟踪文件一致，为微秒。
+"""
+
+
+def _pair_events(pair):
+    """
+    返回 (node_ts, node_dur, [(kernel_ts, kernel_dur, stream), ...])。
+    """
+    if isinstance(pair, Pair):
+        return pair.node.ts, pair.node.dur, [(kernel.ts, kernel.dur, kernel.stream) for kernel in pair.kernels]
+    node = pair["Node"]
+    return node["ts"], node["dur"], [(kernel["ts"], kernel["dur"], int(kernel["args"]["stream"])) for kernel in pair["Kernels"]]
+
+
+def _node_name(pair):
+    return pair.node.name if isinstance(pair, Pair) else pair["Node"]["name"]
+
+
+def _sweep_stream(starts, ends):
+    """
+    对单个 stream 上已按开始时间排序的 kernel 计算发射间隙与忙碌时间。
+
+    Returns:
+        tuple: (每个 kernel 之前的间隙数组（第一个为 0）, 忙碌时间)
+    """
+    latest_end = np.maximum.accumulate(ends)
+    gaps = np.zeros_like(starts)
+    gaps[1:] = np.maximum(starts[1:] - latest_end[:-1], 0)
+    span = latest_end[-1] - starts[0]
+    return gaps, span - gaps.sum()
+
+
+def analyze_timeline(node_kernel_pairs, top_n=10):
+    """
+    分析时间线，并把每个 pair 的结果写入 pair["Timeline"]。
+
+    Args:
+        `node_kernel_pairs` (list): trace_file_parser.get_pairs_from_trace_file 返回的列表，字典或 `Pair` 对象均可。
+        `top_n` (int): 输出发射间隙最大的节点数。
+
+    Returns:
+        dict: 整体统计，包含
+            - "wall_time": 第一个算子开始到最后一个算子结束的时间；
+            - "node_time": 算子 dur 之和；
+            - "kernel_time": kernel dur 之和；
+            - "host_overhead": 各算子主机端开销之和；
+            - "streams": {stream: {"kernels", "busy_time", "span", "gap_time", "utilization"}}；
+            - "top_gap_nodes": 发射间隙之和最大的 `top_n` 个节点，元素为 (节点名称, 间隙, 主机端开销)。
+    """
+    pair_count = len(node_kernel_pairs)
+    node_ts = np.zeros(pair_count, dtype=np.int64)
+    node_dur = np.zeros(pair_count, dtype=np.int64)
+    kernel_pair, kernel_ts, kernel_dur, kernel_stream = [], [], [], []
+
+    for pair_idx, pair in enumerate(node_kernel_pairs):
+        node_ts[pair_idx], node_dur[pair_idx], kernels = _pair_events(pair)
+        for ts, dur, stream in kernels:
+            kernel_pair.append(pair_idx)
+            kernel_ts.append(ts)
+            kernel_dur.append(dur)
+            kernel_stream.append(stream)
+
+    kernel_pair = np.asarray(kernel_pair, dtype=np.int64)
+    kernel_ts = np.asarray(kernel_ts, dtype=np.int64)
+    kernel_dur = np.asarray(kernel_dur, dtype=np.int64)
+    kernel_stream = np.asarray(kernel_stream, dtype=np.int64)
+    kernel_gap = np.zeros_like(kernel_ts)
+
+    streams = {}
+    for stream in np.unique(kernel_stream):
+        positions = np.flatnonzero(kernel_stream == stream)
+        positions = positions[np.argsort(kernel_ts[positions], kind='stable')]
+        starts = kernel_ts[positions]
+        ends = starts + kernel_dur[positions]
+        gaps, busy_time = _sweep_stream(starts, ends)
+        kernel_gap[positions] = gaps
+        span = int(ends.max() - starts[0])
+        streams[int(stream)] = {
+            "kernels": len(positions),
+            "busy_time": int(busy_time),
+            "span": span,
+            "gap_time": int(gaps.sum()),
+            "utilization": busy_time / span if span > 0 else 0.0,
+        }
+
+    pair_kernel_time = np.bincount(kernel_pair, weights=kernel_dur, minlength=pair_count).astype(np.int64)
+    pair_gap = np.bincount(kernel_pair, weights=kernel_gap, minlength=pair_count).astype(np.int64)
+    pair_kernel_count = np.bincount(kernel_pair, minlength=pair_count)
+    first_kernel_ts = np.full(pair_count, -1, dtype=np.int64)
+    # kernel 按 pair 顺序收集，反向赋值使每个 pair 保留其第一个 kernel 的开始时间
+    first_kernel_ts[kernel_pair[::-1]] = kernel_ts[::-1]
+    host_overhead = node_dur - pair_kernel_time
+
+    for pair_idx, pair in enumerate(node_kernel_pairs):
+        timeline = {
+            "kernel_count": int(pair_kernel_count[pair_idx]),
+            "kernel_time": int(pair_kernel_time[pair_idx]),
+            "launch_gap": int(pair_gap[pair_idx]),
+            "host_overhead": int(host_overhead[pair_idx]),
+            "first_kernel_delay": int(first_kernel_ts[pair_idx] - node_ts[pair_idx]) if pair_kernel_count[pair_idx] else None,
+        }
+        if isinstance(pair, Pair):
+            pair.timeline = timeline
+        else:
+            pair["Timeline"] = timeline
+
+    top_rows = np.argsort(-pair_gap, kind='stable')[:top_n]
+    wall_time = int((node_ts + node_dur).max() - node_ts.min()) if pair_count else 0
+
+    return {
+        "wall_time": wall_time,
+        "node_time": int(node_dur.sum()),
+        "kernel_time": int(kernel_dur.sum()),
+        "host_overhead": int(host_overhead.sum()),
+        "streams": streams,
+        "top_gap_nodes": [
+            (_node_name(node_kernel_pairs[row]), int(pair_gap[row]), int(host_overhead[row]))
+            for row in top_rows if pair_gap[row] > 0
+        ],
+    }
+
+
+def print_timeline_report(summary):
+    """
+    输出时间线统计。
+    """
+    print(f"[trace_timeline] 墙钟时间: {summary['wall_time']} us, 算子总耗时: {summary['node_time']} us, "
+          f"kernel 总耗时: {summary['kernel_time']} us, 主机端开销: {summary['host_overhead']} us")
+    for stream, stats in summary["streams"].items():
+        print(f"[trace_timeline] stream {stream}: kernel {stats['kernels']} 个, 忙碌 {stats['busy_time']} us, "
+              f"跨度 {stats['span']} us, 间隙 {stats['gap_time']} us, 利用率 {stats['utilization']:.2%}")
+    print("[trace_timeline] 发射间隙最大的节点:")
+    for node_name, gap, overhead in summary["top_gap_nodes"]:
+        print(f"    {node_name}: 间隙 {gap} us, 主机端开销 {overhead} us")
+
+
+if __name__ == "__main__":
+    """
+    Usage: python3 ./utils/trace_timeline.py ./examples/yolov8n-orto0.json [top_n]
+    """
+    trace_file_path = sys.argv[1] if len(sys.argv) > 1 else "./examples/yolov8n-orto0.json"
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    node_kernel_pairs = tfp.get_pairs_from_trace_file(trace_file_path, typed=True)
+    print_timeline_report(analyze_timeline(node_kernel_pairs, top_n))